@@ -0,0 +1,87 @@
+"""Compara o pico de memória da carga do export: `response.json()` vs leitura em streaming.
+
+Uso (a partir de `backend/`):
+    python3 bench/bench_ingest_memory.py --users 1000000
+
+Cada modo roda em um subprocesso novo e o pico é lido de `ru_maxrss`, então os
+números incluem o snapshot indexado construído depois da decodificação.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from synthetic import generate_export  # noqa: E402
+
+_CHUNK_SIZE = 1 << 16
+
+
+def _measure(mode: str, path: Path) -> None:
+    from data_store import Snapshot
+    from json_stream import load_export
+    from records import compact
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if mode == "json":
+        # Equivalente ao `response.json()` anterior: bytes + texto + árvore completa.
+        content = path.read_bytes()
+        snapshot = Snapshot(json.loads(content.decode("utf-8")))
+        del content
+    else:
+        with path.open("rb") as handle:
+            snapshot = Snapshot(load_export(iter(lambda: handle.read(_CHUNK_SIZE), b""), compact))
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "mode": mode,
+        "notifications": len(snapshot.notifications),
+        "seconds": round(elapsed, 2),
+        # ru_maxrss é em KiB no Linux.
+        "peak_mib": round(peak / 1024, 1),
+        "delta_mib": round((peak - baseline) / 1024, 1),
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--file", type=Path, help="export existente; se omitido, um sintético é gerado")
+    parser.add_argument("--measure", choices=["json", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure(args.measure, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = Path(tmp) / "export.json"
+            generate_export(path, args.users)
+        print(f"export: {path} ({os.path.getsize(path) / 2 ** 20:.1f} MiB)")
+        results = []
+        for mode in ("json", "stream"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--file", str(path)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output))
+            print(output.strip())
+        saved = results[0]["delta_mib"] - results[1]["delta_mib"]
+        print(f"pico reduzido em {saved:.1f} MiB ({saved / results[0]['delta_mib']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Bytes por registro de usuário e de notificação: dicionários vs registros compactos.
+
+Uso (a partir de `backend/`):
+    python3 bench/bench_record_memory.py --users 200000
+
+Para cada tipo de registro, o export é lido em streaming guardando só os itens desse
+tipo e a memória retida é medida com `tracemalloc` (registros + valores + a lista).
+"antes" reproduz a leitura anterior: um dicionário por item, com as chaves e os valores
+repetidos internados; "depois" é `records.compact`, usado por `data_store`.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from synthetic import generate_export  # noqa: E402
+from json_stream import iter_export  # noqa: E402
+from records import compact  # noqa: E402
+
+_CHUNK_SIZE = 1 << 16
+_LEGACY_INTERNED = frozenset({'type', 'inviter_uid', 'inviter_code', 'invited_by_code'})
+
+
+def _legacy_dict(kind: str, record: Any) -> Any:
+    if not isinstance(record, dict):
+        return record
+    intern = sys.intern
+    return {
+        intern(key): intern(value) if key in _LEGACY_INTERNED and isinstance(value, str) else value
+        for key, value in record.items()
+    }
+
+
+def _retained(path: Path, kind: str, hook: Callable[[str, Any], Any]) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    with path.open("rb") as handle:
+        items = [
+            hook(key, value)
+            for key, value, is_item in iter_export(iter(lambda: handle.read(_CHUNK_SIZE), b""))
+            if is_item and key == kind
+        ]
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"records": len(items), "bytes_per_record": round(retained / max(len(items), 1), 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--file", type=Path, help="export existente; se omitido, um sintético é gerado")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = Path(tmp) / "export.json"
+            generate_export(path, args.users)
+        for kind in ("users", "notifications"):
+            before = _retained(path, kind, _legacy_dict)
+            after = _retained(path, kind, compact)
+            saved = 1 - after["bytes_per_record"] / before["bytes_per_record"]
+            print(json.dumps({"kind": kind, "antes": before, "depois": after, "reducao": f"{saved:.0%}"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compara as etapas sem LLM de `generate_report`: passadas separadas vs agregação única.
+
+Uso (a partir de `backend/`):
+    python3 bench/bench_report.py --users 20000
+
+"antes" reproduz os helpers originais (filtro por data com parse de cada registro,
+cinco percursos das listas e busca linear de usuários); "depois" é
+`report_engine.aggregate_period` sobre um snapshot já indexado.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from synthetic import generate_export  # noqa: E402
+from data_store import Snapshot, _parse_iso8601, _to_int  # noqa: E402
+from report_engine import aggregate_period  # noqa: E402
+
+
+def _legacy_filter(items: List[Dict[str, Any]], start: Optional[datetime], end: Optional[datetime]) -> List[Dict[str, Any]]:
+    filtered = []
+    for item in items:
+        candidate = _parse_iso8601(item.get('created_at'))
+        if candidate is None:
+            continue
+        if start and candidate < start:
+            continue
+        if end and candidate > end:
+            continue
+        filtered.append(item)
+    return filtered
+
+
+def _legacy_report(payload: Dict[str, Any], start: datetime, end: datetime) -> Dict[str, Any]:
+    users = list(payload['users'])
+    notifications = list(payload['notifications'])
+    filtered_users = _legacy_filter(users, start, end)
+    filtered_notifications = _legacy_filter(notifications, start, end)
+
+    summary = {'points_total_period': 0, 'points_from_conversions': 0, 'points_from_bonus': 0}
+    for notification in filtered_notifications:
+        points = _to_int(notification.get('points_awarded'))
+        summary['points_total_period'] += points
+        notif_type = (notification.get('type') or '').lower()
+        if notif_type == 'conversion':
+            summary['points_from_conversions'] += points
+        elif notif_type == 'bonus':
+            summary['points_from_bonus'] += points
+
+    counts: Dict[str, int] = {}
+    for notification in filtered_notifications:
+        if (notification.get('type') or '').lower() == 'conversion' and notification.get('inviter_uid'):
+            counts[notification['inviter_uid']] = counts.get(notification['inviter_uid'], 0) + 1
+    ranked = []
+    for uid, conversions in counts.items():
+        user = next((u for u in users if u.get('uid') == uid), None)
+        if user:
+            ranked.append({'uid': uid, 'conversions': conversions, 'points_total': _to_int(user.get('points_total'))})
+    ranked.sort(key=lambda item: (item['conversions'], item['points_total']), reverse=True)
+
+    cutoff = end - timedelta(days=7)
+    at_risk = [
+        user for user in filtered_users
+        if user.get('invited_by_code')
+        and _to_int(user.get('points_total')) == 0
+        and _parse_iso8601(user.get('created_at')) <= cutoff
+    ]
+    return {'points_summary': summary, 'top_referrers': ranked[:5], 'churn': len(at_risk)}
+
+
+def _timed(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "export.json"
+        generate_export(path, args.users)
+        payload = json.loads(path.read_text(encoding="utf-8"))
+
+    started = time.perf_counter()
+    snapshot = Snapshot(payload)
+    print(f"snapshot: {time.perf_counter() - started:.2f}s (uma vez por carga)")
+
+    year_start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    windows = {
+        "mês": (year_start, year_start + timedelta(days=31)),
+        "trimestre": (year_start, year_start + timedelta(days=91)),
+        "ano": (year_start, year_start + timedelta(days=366)),
+    }
+    for label, (start, end) in windows.items():
+        before = _timed(_legacy_report, payload, start, end)
+        after = _timed(aggregate_period, snapshot, start, end, end)
+        print(f"{label:>10}: antes {before * 1000:9.1f} ms | depois {after * 1000:8.1f} ms | {before / after:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
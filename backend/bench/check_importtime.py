@@ -0,0 +1,109 @@
+"""Verifica o tempo de import a frio dos módulos do backend com `python -X importtime`.
+
+Uso (a partir de `backend/`):
+    python3 bench/check_importtime.py
+    python3 bench/check_importtime.py --repeat 5 --scale 1.5   # máquina mais lenta
+
+Cada alvo roda em um interpretador novo (`--repeat` vezes, vale o menor tempo) e é
+comparado com o orçamento em milissegundos. `DATA_URL` aponta para uma porta fechada:
+um import que tente carregar os dados falha em vez de medir a rede. Também confere que
+o import não carrega módulos proibidos (`langchain_openai`/`langchain.agents` indicariam
+que o lado pesado do LangChain deixou de ser tardio). Sai com código 1 se algum alvo
+estourar o orçamento ou importar o que não devia.
+"""
+
+import argparse
+import os
+from pathlib import Path
+import subprocess
+import sys
+from typing import List, NamedTuple, Set, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+
+
+class Target(NamedTuple):
+    name: str
+    code: str
+    budget_ms: float
+    forbidden: Tuple[str, ...] = ()
+
+
+TARGETS: List[Target] = [
+    Target("data_store", "import data_store", 600, ("requests", "langchain_openai")),
+    Target("relatorio_agent", "import relatorio_agent", 900, ("chatagent", "langchain_openai", "langchain.agents")),
+    Target("chatagent", "import chatagent", 1500, ("streamlit", "langchain_openai", "langchain.agents")),
+    # Início do Streamlit: os imports de `main.py`, antes de criar o agente.
+    Target(
+        "streamlit (imports de main.py)",
+        "import streamlit, chatagent, data_store, metrics, relatorio_agent, streaming",
+        2500,
+        ("langchain_openai", "langchain.agents"),
+    ),
+    # Início da CLI: imports mais a criação do agente (sem chamar a API).
+    Target("cli (criar_agent)", "import chatagent; chatagent.criar_agent()", 4000),
+]
+
+
+def _run(code: str) -> Tuple[float, Set[str]]:
+    """Tempo total de import (ms) e os módulos importados, a partir da saída do `-X importtime`."""
+    env = {
+        **os.environ,
+        "DATA_URL": "http://127.0.0.1:9/export",
+        "DATA_REFRESH_INTERVAL": "0",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-importtime"),
+        "PYTHONPATH": str(SRC_DIR),
+    }
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"falha ao executar {code!r}:\n{completed.stderr[-2000:]}")
+
+    total_us = 0
+    modules: Set[str] = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        stripped = name.strip()
+        modules.add(stripped)
+        # Só os imports de primeiro nível: os aninhados já estão no cumulativo do pai.
+        if name.startswith(" ") and not name[1:2].isspace():
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica todos os orçamentos")
+    args = parser.parse_args()
+
+    failed = False
+    for target in TARGETS:
+        runs = [_run(target.code) for _ in range(max(1, args.repeat))]
+        elapsed = min(ms for ms, _ in runs)
+        imported = runs[0][1]
+        budget = target.budget_ms * args.scale
+        leaked = [name for name in target.forbidden if name in imported]
+
+        status = "ok"
+        if elapsed > budget:
+            status = "ACIMA DO ORÇAMENTO"
+        if leaked:
+            status = f"IMPORTA {', '.join(leaked)}"
+        failed = failed or status != "ok"
+        print(f"{target.name:<34} {elapsed:8.0f} ms  (orçamento {budget:.0f} ms)  {status}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
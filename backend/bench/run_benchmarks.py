@@ -0,0 +1,214 @@
+"""Mede as tools do agente e as etapas sem LLM do relatório sobre um export sintético.
+
+Uso (a partir de `backend/`):
+    python3 bench/run_benchmarks.py --users 100000 --output bench/results/atual.json
+    python3 bench/run_benchmarks.py --users 100000 --baseline bench/results/atual.json
+
+Gera o export com `synthetic.py` (ou usa `--export`), sobe o `stub_server.py` como
+`DATA_URL` e mede cada caso `--repeat` vezes (mediana, p95, mínimo). O pico de
+memória alocada vem de uma execução extra sob `tracemalloc`, fora da medição de tempo.
+Com `--baseline`, compara as medianas e sai com código 1 se algum caso ficar mais
+lento que `--tolerance` vezes a referência.
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from stub_server import start_stub_server  # noqa: E402
+from synthetic import generate_export  # noqa: E402
+
+Case = Tuple[str, Callable[[], Any]]
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    func()  # aquecimento: caches de import, JIT do NumPy, etc.
+    times: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        "min_ms": round(times[0], 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat().replace("+00:00", "Z")
+
+
+def _cases(snapshot: Any) -> List[Case]:
+    """Casos com argumentos tirados dos próprios dados (usuários e datas que existem)."""
+
+    import chatagent
+    from cohorts import CohortColumns
+    from report_engine import aggregate_period, top_referrers
+    from report_prompt import build_report_prompt
+
+    first = snapshot.user_timeline.items[0]
+    middle = snapshot.user_timeline.items[len(snapshot.users) // 2]
+    last = snapshot.user_timeline.items[-1]
+    hub = top_referrers(snapshot, None, None, 1)[0]
+    origin = datetime.fromisoformat(first["created_at"].replace("Z", "+00:00"))
+    windows = {
+        "mes": (origin, origin + timedelta(days=31)),
+        "trimestre": (origin, origin + timedelta(days=91)),
+        "ano": (origin, origin + timedelta(days=366)),
+    }
+
+    def tool(name: str, **kwargs: Any) -> Callable[[], Any]:
+        return lambda: getattr(chatagent, name).invoke(kwargs)
+
+    def window(label: str) -> Dict[str, str]:
+        start, end = windows[label]
+        return {"start": _iso(start), "end": _iso(end)}
+
+    cases: List[Case] = [
+        ("tool.search_user[nome]", tool("search_user", query=middle["name"])),
+        ("tool.search_user[email]", tool("search_user", query=middle["email"])),
+        ("tool.search_user[codigo]", tool("search_user", query=middle["my_code"])),
+        ("tool.search_user[data]", tool("search_user", query=middle["created_at"][:10])),
+        ("tool.search_user[parcial]", tool("search_user", query=middle["name"].split()[0][:4])),
+        ("tool.search_user[uid]", tool("search_user", query=middle["uid"])),
+        ("tool.get_notifications_by_date[mes]", tool("get_notifications_by_date", **window("mes"))),
+        ("tool.get_notifications_by_date[hub]", tool("get_notifications_by_date", inviter_uid=hub["uid"])),
+        ("tool.get_points_summary[ano]", tool("get_points_summary", **window("ano"))),
+        ("tool.get_points_summary[mes,hub]", tool("get_points_summary", inviter_uid=hub["uid"], **window("mes"))),
+        ("tool.top_referrers[ano]", tool("top_referrers", limit=10, **window("ano"))),
+        ("tool.largest_networks", tool("largest_networks", limit=10)),
+        ("tool.get_downline[hub]", tool("get_downline", user=hub["uid"])),
+        ("tool.churn_risk", tool("churn_risk", days=7)),
+        ("tool.cohort_retention[mes]", tool("cohort_retention", granularity="month", reference_date=last["created_at"])),
+        ("tool.cohort_retention[semana,trimestre]", tool("cohort_retention", granularity="week", reference_date=last["created_at"], **window("trimestre"))),
+        ("tool.inviter_activation", tool("inviter_activation", reference_date=last["created_at"])),
+        ("cohorts.build", lambda: CohortColumns(snapshot)),
+        ("tool.total_points_given_per_time[trimestre]", tool("total_points_given_per_time", **window("trimestre"))),
+    ]
+    for label, (start, end) in windows.items():
+        cases.append((
+            f"report.aggregate_period[{label}]",
+            lambda start=start, end=end: aggregate_period(snapshot, start, end, end),
+        ))
+    for label in ("mes", "ano"):
+        start, end = windows[label]
+        notifications = aggregate_period(snapshot, start, end, end)["notifications"]
+        cases.append((
+            f"report.build_report_prompt[{label}]",
+            # Resumo fixo no lugar do LLM: mede só a montagem, a contagem de tokens e o map-reduce.
+            lambda notifications=notifications: build_report_prompt(
+                "Relatório de Indicações", notifications, summarize=lambda chunk: "resumo do bloco"
+            ),
+        ))
+    return cases
+
+
+def _compare(results: Dict[str, Dict[str, float]], baseline_path: Path, tolerance: float) -> bool:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    regressed = False
+    print(f"\ncomparação com {baseline_path} (tolerância {tolerance:.2f}x):")
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"  {name:<48} sem referência")
+            continue
+        ratio = current["median_ms"] / reference["median_ms"] if reference["median_ms"] else float("inf")
+        flag = "REGRESSÃO" if ratio > tolerance else ""
+        regressed = regressed or ratio > tolerance
+        print(f"  {name:<48} {reference['median_ms']:10.2f} → {current['median_ms']:10.2f} ms  {ratio:5.2f}x {flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--export", type=Path, help="export existente; se omitido, um sintético é gerado")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=BENCH_DIR / "results" / "latest.json")
+    parser.add_argument("--baseline", type=Path, help="resultado anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export = args.export
+        counts = None
+        if export is None:
+            export = Path(tmp) / "export.json"
+            counts = generate_export(export, args.users, seed=args.seed)
+        server = start_stub_server(export)
+
+        # Precisa vir antes do import do data_store, que lê as variáveis uma vez.
+        os.environ["DATA_URL"] = server.url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+        os.environ["DATA_CACHE_TTL"] = "86400"
+        os.environ["DATA_REFRESH_INTERVAL"] = "0"
+        # Cada repetição precisa executar a tool de verdade, não devolver o resultado memorizado.
+        os.environ["TOOL_MEMO_SIZE"] = "0"
+        from data_store import refresh_data
+
+        results: Dict[str, Dict[str, float]] = {}
+        ingest: Case = ("ingest.refresh_data", lambda: refresh_data(force=True))
+        snapshot = refresh_data(force=True)
+        for name, func in [ingest, *_cases(snapshot)]:
+            # A carga completa é cara: poucas repetições bastam.
+            repeat = max(1, min(args.repeat, 3)) if name == ingest[0] else args.repeat
+            results[name] = _measure(func, repeat)
+            print(
+                f"{name:<48} {results[name]['median_ms']:10.2f} ms  "
+                f"(p95 {results[name]['p95_ms']:.2f}, pico {results[name]['peak_kib']:.0f} KiB)"
+            )
+        server.shutdown()
+
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "users": len(snapshot.users),
+            "notifications": len(snapshot.notifications),
+            "seed": args.seed if counts else None,
+            "export": str(args.export) if args.export else None,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "numpy": numpy_version,
+        },
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nresultados em {args.output}")
+
+    if args.baseline and _compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Servidor HTTP local que entrega um export em disco como `DATA_URL`.
+
+Uso (a partir de `backend/`):
+    python3 bench/stub_server.py /tmp/export.json --port 8090
+    DATA_URL=http://127.0.0.1:8090/export streamlit run src/main.py
+
+Imita o `mgm_app/bin/export_server.dart` no que o backend usa: `ETag` e
+`Last-Modified` com respostas 304, e o parâmetro `since`/`since_id` devolvendo só os
+registros novos com `"delta": true`. O arquivo completo é enviado em pedaços, sem ser
+carregado; para deltas, o export é lido uma vez e mantido em memória. Fala HTTP/1.1
+(keep-alive) e, com `--gzip`, comprime a resposta quando o cliente aceita.
+"""
+
+import argparse
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import gzip
+import json
+import os
+from pathlib import Path
+import shutil
+import sys
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+_CHUNK_SIZE = 1 << 16
+
+
+def _parse_time(raw: Any) -> Optional[datetime]:
+    if not isinstance(raw, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """Responde qualquer GET com o export de `server.export_path`."""
+
+    server: "ExportServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 - nome exigido pelo http.server
+        self.server.requests += 1
+        etag, modified = self.server.validators()
+        query = parse_qs(urlparse(self.path).query)
+        since = query.get("since", [None])[0]
+
+        if since is None and self._not_modified(etag, modified):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        if since is not None:
+            since_date = _parse_time(since)
+            if since_date is None:
+                self.send_error(400, "since inválido")
+                return
+            body = json.dumps(self.server.delta(since_date, query.get("since_id", [None])[0])).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        compressed = self.server.gzip and "gzip" in self.headers.get("Accept-Encoding", "")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(modified, usegmt=True))
+        if compressed:
+            body = self.server.compressed()
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_header("Content-Length", str(self.server.export_path.stat().st_size))
+        self.end_headers()
+        with self.server.export_path.open("rb") as handle:
+            shutil.copyfileobj(handle, self.wfile, _CHUNK_SIZE)
+
+    def _not_modified(self, etag: str, modified: float) -> bool:
+        if self.headers.get("If-None-Match") is not None:
+            return self.headers["If-None-Match"] == etag
+        since = self.headers.get("If-Modified-Since")
+        if since:
+            try:
+                return int(modified) <= parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ExportServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        export_path: Path,
+        address: Tuple[str, int],
+        verbose: bool = False,
+        gzip: bool = False,
+    ) -> None:
+        super().__init__(address, ExportHandler)
+        self.export_path = Path(export_path)
+        self.verbose = verbose
+        self.gzip = gzip
+        self.requests = 0
+        self._compressed: Optional[bytes] = None
+        self._compressed_key: Optional[Tuple[float, int]] = None
+        self._payload: Optional[Dict[str, Any]] = None
+        self._payload_key: Optional[Tuple[float, int]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/export"
+
+    def validators(self) -> Tuple[str, float]:
+        """ETag e data de modificação derivados do arquivo (trocá-lo invalida o cache do cliente)."""
+        stat = self.export_path.stat()
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', stat.st_mtime
+
+    def delta(self, since: datetime, since_id: Optional[str]) -> Dict[str, Any]:
+        """Mesmo recorte do `_deltaSince` do servidor Dart."""
+
+        def is_recent(raw: Any) -> bool:
+            parsed = _parse_time(raw)
+            return parsed is not None and parsed >= since
+
+        payload = self._load()
+        return {
+            **payload,
+            "delta": True,
+            "since": since.astimezone(timezone.utc).isoformat(),
+            "users": [
+                user for user in payload.get("users", [])
+                if is_recent(user.get("updated_at") or user.get("created_at"))
+            ],
+            "notifications": [
+                notification for notification in payload.get("notifications", [])
+                if notification.get("id") != since_id and is_recent(notification.get("created_at"))
+            ],
+        }
+
+    def compressed(self) -> bytes:
+        """Export comprimido com gzip, refeito só quando o arquivo muda."""
+        stat = self.export_path.stat()
+        key = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            if self._compressed_key != key:
+                self._compressed = gzip.compress(self.export_path.read_bytes(), compresslevel=6)
+                self._compressed_key = key
+            return self._compressed
+
+    def _load(self) -> Dict[str, Any]:
+        stat = self.export_path.stat()
+        key = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            if self._payload_key != key:
+                self._payload = json.loads(self.export_path.read_text(encoding="utf-8"))
+                self._payload_key = key
+            return self._payload
+
+
+def start_stub_server(
+    export_path: Path,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    gzip: bool = False,
+) -> ExportServer:
+    """Sobe o servidor em uma thread daemon; `port=0` escolhe uma porta livre."""
+    server = ExportServer(export_path, (host, port), gzip=gzip)
+    threading.Thread(target=server.serve_forever, name="stub-export-server", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("export", type=Path, help="arquivo JSON do export (ver bench/synthetic.py)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--verbose", action="store_true", help="registra cada requisição")
+    parser.add_argument("--gzip", action="store_true", help="comprime a resposta com gzip quando aceito")
+    args = parser.parse_args()
+
+    if not args.export.exists():
+        sys.exit(f"export não encontrado: {args.export}")
+    server = ExportServer(args.export, (args.host, args.port), verbose=args.verbose, gzip=args.gzip)
+    print(f"servindo {args.export} ({os.path.getsize(args.export) / 2 ** 20:.1f} MiB) em {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
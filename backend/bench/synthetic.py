@@ -0,0 +1,191 @@
+"""Gerador determinístico de exports sintéticos no formato de `DATA_URL`.
+
+Uso (a partir de `backend/`):
+    python3 bench/synthetic.py --users 100000 --out /tmp/export.json
+
+Segue as regras do app (`mgm_app/lib/services/data_repository.dart`): cada usuário
+cadastrado com um código gera uma notificação `conversion` de 50 pontos para quem o
+convidou e, a cada `bonus_every` conversões, uma notificação `bonus` de
+`bonus_points`. `points_total` e `updated_at` batem com as notificações emitidas.
+
+Os convidadores são sempre usuários anteriores, com viés para os mais antigos:
+surgem cadeias de indicação longas e alguns convidadores concentram muitas
+conversões. Usuários e notificações saem em ordem de `created_at`, gravados registro
+a registro, então 10M de registros cabem em memória (só arrays de inteiros/floats).
+"""
+
+import argparse
+from array import array
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import random
+import time
+from typing import Dict, Optional
+import uuid
+
+CONVERSION_POINTS = 50
+_FIRST_NAMES = (
+    "Maria", "João", "Ana", "José", "Francisca", "Antônio", "Adriana", "Carlos", "Juliana",
+    "Paulo", "Márcia", "Lucas", "Fernanda", "Luís", "Patrícia", "Gabriel", "Aline", "Rafael",
+    "Sandra", "Bruno", "Camila", "Mateus", "Letícia", "Diego", "Bianca", "Thiago", "Júlia",
+)
+_LAST_NAMES = (
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+    "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Araújo", "Melo", "Barbosa",
+    "Rocha", "Dias", "Nascimento", "Conceição", "Simões", "Gonçalves", "Brandão", "Assunção",
+)
+_NAMES = tuple(f"{first} {last}" for first in _FIRST_NAMES for last in _LAST_NAMES)
+_ASCII = str.maketrans("áàâãéêíóôõúüç", "aaaaeeiooouuc")
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _uuid4(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_export(
+    path: Path,
+    users: int,
+    invite_rate: float = 0.8,
+    seed: int = 42,
+    start: Optional[datetime] = None,
+    days: int = 365,
+    bonus_every: int = 3,
+    bonus_points: int = 50,
+) -> Dict[str, int]:
+    """Grava um export sintético em `path` e devolve as contagens geradas.
+
+    Com a mesma `seed` e os mesmos parâmetros, o arquivo gerado é idêntico byte a byte.
+    """
+
+    rng = random.Random(seed)
+    start = start or datetime(2024, 1, 1, tzinfo=timezone.utc)
+    origin = start.timestamp()
+    step = days * 86400 / max(users, 1)
+
+    # Primeira passada: datas de cadastro, convidadores e pontos acumulados.
+    created = array("d")
+    inviters = array("l")
+    conversions = array("l", bytes(8 * users))
+    points = array("l", bytes(8 * users))
+    last_award = array("d", bytes(8 * users))
+    for index in range(users):
+        moment = origin + index * step + rng.random() * step
+        created.append(moment)
+        if index and rng.random() < invite_rate:
+            # Quadrado de um uniforme: viés para usuários antigos (convidadores "hub").
+            inviter = int(index * rng.random() ** 2)
+            inviters.append(inviter)
+            conversions[inviter] += 1
+            points[inviter] += CONVERSION_POINTS
+            last_award[inviter] = moment
+            if bonus_every > 0 and conversions[inviter] % bonus_every == 0:
+                points[inviter] += bonus_points
+                last_award[inviter] = moment + 0.001
+        else:
+            inviters.append(-1)
+
+    # Nomes guardados como índice da combinação (nome, sobrenome): 2 bytes por usuário.
+    name_ids = array("H", (rng.randrange(len(_NAMES)) for _ in range(users)))
+
+    def name(index: int) -> str:
+        return _NAMES[name_ids[index]]
+
+    def code(index: int) -> str:
+        return str(100000 + index)
+
+    notifications = 0
+    with path.open("w", encoding="utf-8") as handle:
+        handle.write(json.dumps({
+            "schema_version": 1,
+            "settings": {"bonus_every": bonus_every, "bonus_points": bonus_points},
+            "session": {"current_uid": None},
+        })[:-1])
+        handle.write(', "users": [')
+        for index in range(users):
+            user_name = name(index)
+            inviter = inviters[index]
+            user = {
+                "uid": f"u-{index}",
+                "name": user_name,
+                "email": f"{user_name.lower().translate(_ASCII).replace(' ', '.')}{index}@example.com",
+                "sex": rng.choice("FM"),
+                "age": rng.randint(18, 70),
+                "my_code": code(index),
+                "points_total": points[index],
+                "invited_by_code": code(inviter) if inviter >= 0 else None,
+                "password_hash": f"{rng.getrandbits(256):064x}",
+                "created_at": _iso(created[index]),
+                "updated_at": _iso(max(created[index], last_award[index])),
+            }
+            handle.write(("," if index else "") + json.dumps(user, ensure_ascii=False))
+
+        handle.write('], "notifications": [')
+        counted = array("l", bytes(8 * users))
+        for index in range(users):
+            inviter = inviters[index]
+            if inviter < 0:
+                continue
+            moment = created[index]
+            conversion = {
+                "id": _uuid4(rng),
+                "inviter_uid": f"u-{inviter}",
+                "inviter_code": code(inviter),
+                "invited_name": name(index),
+                "points_awarded": CONVERSION_POINTS,
+                "type": "conversion",
+                "created_at": _iso(moment),
+            }
+            handle.write(("," if notifications else "") + json.dumps(conversion, ensure_ascii=False))
+            notifications += 1
+            counted[inviter] += 1
+            if bonus_every > 0 and counted[inviter] % bonus_every == 0:
+                bonus = dict(
+                    conversion,
+                    id=_uuid4(rng),
+                    invited_name="",
+                    points_awarded=bonus_points,
+                    type="bonus",
+                    created_at=_iso(moment + 0.001),
+                )
+                handle.write("," + json.dumps(bonus, ensure_ascii=False))
+                notifications += 1
+        handle.write("]}")
+
+    return {"users": users, "notifications": notifications}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--invite-rate", type=float, default=0.8, help="fração de usuários cadastrados com código")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--bonus-every", type=int, default=3)
+    parser.add_argument("--bonus-points", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate_export(
+        args.out,
+        args.users,
+        invite_rate=args.invite_rate,
+        seed=args.seed,
+        days=args.days,
+        bonus_every=args.bonus_every,
+        bonus_points=args.bonus_points,
+    )
+    size = args.out.stat().st_size / 2 ** 20
+    print(
+        f"{args.out}: {counts['users']} usuários, {counts['notifications']} notificações "
+        f"({size:.1f} MiB) em {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
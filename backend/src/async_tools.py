@@ -0,0 +1,51 @@
+"""Versões assíncronas das tools do agente.
+
+Com `agent.ainvoke`/`astream`, o `AgentExecutor` executa as chamadas de tool de um
+mesmo passo com `asyncio.gather`. Cada tool criada por `agent_tool` ganha uma corrotina
+que roda a função síncrona em um pool de `TOOL_WORKERS` threads: as chamadas
+independentes de um passo (por exemplo `get_actual_date`, `get_points_summary` e
+`top_referrers`) avançam juntas e o passo custa a latência da mais lenta. Todas leem o
+mesmo snapshot: com um snapshot carregado, quem encontra uma revalidação em andamento
+recebe o atual em vez de esperar (ver `data_store.refresh_data`).
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from functools import partial, wraps
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.tools import StructuredTool
+
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "4"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="agent-tool")
+    return _executor
+
+
+def offload(func: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    """Corrotina que executa `func` no pool das tools, preservando o contexto (callbacks, tracing)."""
+
+    @wraps(func)
+    async def coroutine(*args: Any, **kwargs: Any) -> Any:
+        context = contextvars.copy_context()
+        call = partial(context.run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+
+    return coroutine
+
+
+def agent_tool(func: Callable[..., Any]) -> StructuredTool:
+    """Equivalente ao `@tool` do LangChain, com `invoke` síncrono e `ainvoke` no pool."""
+    return StructuredTool.from_function(func=func, coroutine=offload(func))
@@ -0,0 +1,192 @@
+"""Memória limitada da conversa com o agente.
+
+Mandar o histórico inteiro a cada `agent.invoke` deixa cada turno mais lento e caro
+que o anterior e, numa sessão longa, estoura a janela de contexto. `ChatMemory`
+mantém os últimos `CHAT_MEMORY_TURNS` turnos na íntegra e dobra os mais antigos em um
+resumo de até `CHAT_SUMMARY_TOKENS` tokens. O resumo é atualizado pelo LLM em uma
+thread de fundo, fora do caminho da resposta: enquanto ele não fica pronto, os turnos
+recém-saídos da janela seguem na íntegra. Blocos de JSON (saídas de tools repetidas
+na resposta ou coladas pelo usuário) não entram no histórico.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from llm_clients import shared_chat_model
+from metrics import llm_config
+from tokens import count_tokens, truncate
+
+CHAT_MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "6"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "500"))
+# Tamanho máximo de cada mensagem guardada (pergunta ou resposta).
+CHAT_MESSAGE_TOKENS = int(os.getenv("CHAT_MESSAGE_TOKENS", "600"))
+
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_SYSTEM_PROMPT = """Você mantém o resumo de uma conversa entre um analista e o assistente
+    de um programa de indicações. Atualize o resumo atual com as novas trocas, em PT-BR e em
+    tópicos curtos. Preserve fatos, números, usuários, códigos e períodos citados, além de
+    perguntas ainda em aberto. Não inclua JSON nem listas longas de registros.
+    """
+
+_OMITTED = "[dados omitidos]"
+# JSON com pelo menos este tamanho é tratado como saída de tool e sai do histórico.
+_JSON_MIN_CHARS = 120
+_CODE_BLOCK = re.compile(r"```[a-zA-Z]*\s*[\[{].*?```", re.S)
+_decoder = json.JSONDecoder()
+
+logger = logging.getLogger(__name__)
+
+Turn = Tuple[str, str]
+
+
+def strip_bulky_json(text: str) -> str:
+    """Troca blocos de código e trechos JSON grandes por um marcador curto."""
+    text = _CODE_BLOCK.sub(_OMITTED, text)
+    parts: List[str] = []
+    position = 0
+    index = 0
+    while index < len(text):
+        if text[index] in "{[":
+            try:
+                _, end = _decoder.raw_decode(text, index)
+            except ValueError:
+                end = None
+            if end is not None and end - index >= _JSON_MIN_CHARS:
+                parts.append(text[position:index])
+                parts.append(_OMITTED)
+                position = index = end
+                continue
+        index += 1
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def _clean(text: str, budget: int) -> str:
+    cleaned = strip_bulky_json(text or "").strip()
+    if count_tokens(cleaned) > budget:
+        cleaned = truncate(cleaned, budget).rstrip() + " […]"
+    return cleaned
+
+
+def _transcript(turns: List[Turn]) -> str:
+    return "\n".join(f"Analista: {question}\nAssistente: {answer}" for question, answer in turns)
+
+
+def _fallback_summary(summary: str, turns: List[Turn], budget: int) -> str:
+    """Resumo extrativo (sem LLM): as perguntas mais recentes que couberem no orçamento."""
+    lines = [line for line in summary.splitlines() if line.strip()]
+    lines.extend(f"- Perguntou: {truncate(question, 60)}" for question, _ in turns)
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return truncate("\n".join(lines), budget)
+
+
+class ChatMemory:
+    """Histórico enviado ao agente: resumo dos turnos antigos + últimos turnos na íntegra.
+
+    `summarize(resumo_atual, transcrição)` pode substituir o LLM (por exemplo, em
+    testes); sem ele, usa o modelo compartilhado de `llm_clients`. Se o resumo pelo LLM
+    falhar, um resumo extrativo com as perguntas recentes ocupa o lugar.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        summary_tokens: Optional[int] = None,
+        message_tokens: Optional[int] = None,
+        summarize: Optional[Callable[[str, str], str]] = None,
+    ) -> None:
+        self.max_turns = CHAT_MEMORY_TURNS if max_turns is None else max_turns
+        self.summary_tokens = CHAT_SUMMARY_TOKENS if summary_tokens is None else summary_tokens
+        self.message_tokens = CHAT_MESSAGE_TOKENS if message_tokens is None else message_tokens
+        self._summarize = summarize
+        self.summary = ""
+        self._turns: List[Turn] = []
+        # Turnos que já saíram da janela e aguardam a próxima atualização do resumo.
+        self._pending: List[Turn] = []
+        self._folding: Optional[threading.Thread] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def add_turn(self, question: str, answer: str) -> None:
+        """Registra um turno completo; turnos além da janela vão para o resumo em segundo plano."""
+        turn = (_clean(question, self.message_tokens), _clean(answer, self.message_tokens))
+        with self._lock:
+            self._turns.append(turn)
+            overflow = len(self._turns) - self.max_turns
+            if overflow > 0:
+                self._pending.extend(self._turns[:overflow])
+                del self._turns[:overflow]
+            if self._pending and self._folding is None:
+                self._folding = threading.Thread(target=self._fold, name="chat-memory-summary", daemon=True)
+                self._folding.start()
+
+    def messages(self) -> List[BaseMessage]:
+        """Mensagens para o `chat_history` do agente (sem a pergunta atual)."""
+        with self._lock:
+            # Se o resumo atrasar, no máximo `max_turns` turnos pendentes vão junto; os mais
+            # antigos voltam ao histórico assim que entram no resumo.
+            summary, turns = self.summary, self._pending[-self.max_turns:] + self._turns
+        history: List[BaseMessage] = []
+        if summary:
+            history.append(SystemMessage(content=f"Resumo da conversa anterior:\n{summary}"))
+        for question, answer in turns:
+            history.append(HumanMessage(content=question))
+            history.append(AIMessage(content=answer))
+        return history
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Aguarda a atualização do resumo em andamento (útil em testes e ao encerrar)."""
+        folding = self._folding
+        if folding is not None:
+            folding.join(timeout)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.summary = ""
+            self._turns.clear()
+            self._pending.clear()
+
+    def _fold(self) -> None:
+        while True:
+            with self._lock:
+                summary, batch, generation = self.summary, list(self._pending), self._generation
+                if not batch:
+                    self._folding = None
+                    return
+            try:
+                updated = self._summarize_turns(summary, batch)
+            except Exception:
+                logger.warning("Falha ao resumir o histórico; usando resumo extrativo", exc_info=True)
+                updated = _fallback_summary(summary, batch, self.summary_tokens)
+            with self._lock:
+                if generation != self._generation:  # `clear()` durante o resumo
+                    continue
+                self.summary = truncate(updated.strip(), self.summary_tokens)
+                del self._pending[:len(batch)]
+
+    def _summarize_turns(self, summary: str, turns: List[Turn]) -> str:
+        transcript = _transcript(turns)
+        if self._summarize is not None:
+            return self._summarize(summary, transcript)
+        llm = shared_chat_model(SUMMARY_MODEL, 0, max_retries=2)
+        response: Any = llm.invoke(
+            [
+                SystemMessage(content=SUMMARY_SYSTEM_PROMPT),
+                HumanMessage(
+                    content=(
+                        f"Resumo atual (até {self.summary_tokens} tokens):\n{summary or '(vazio)'}\n\n"
+                        f"Novas trocas:\n{transcript}"
+                    )
+                ),
+            ],
+            config=llm_config("chat_memory"),
+        )
+        return response.content
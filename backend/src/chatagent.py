@@ -1,147 +1,75 @@
-from datetime import datetime, timezone, timedelta
+import asyncio
+from datetime import datetime, timezone
 import json
-from typing import Any, Dict, List, Optional
-
-from langchain_openai import ChatOpenAI
-from langchain.tools import tool
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage
-import streamlit as st
-import requests
-import dotenv
-import os
-
-
-dotenv.load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
-DATA_URL = os.getenv("DATA_URL")
-
-data: Dict[str, Any] = {}
-users: List[Dict[str, Any]] = []
-notifications: List[Dict[str, Any]] = []
-
-
-def refresh_data() -> Dict[str, List[Dict[str, Any]]]:
-    """Busca os dados na API, atualiza o cache global e retorna o snapshot."""
-
-    global data
-    response = requests.get(DATA_URL, timeout=10)
-    response.raise_for_status()
-    payload = response.json()
-
-    data.clear()
-    data.update(payload)
-
-    users.clear()
-    users.extend(payload.get('users', []) or [])
-
-    notifications.clear()
-    notifications.extend(payload.get('notifications', []) or [])
-
-    return {
-        'users': users,
-        'notifications': notifications,
-    }
-
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-refresh_data()
-
-
-# Funções auxiliares para tools
-def _parse_iso8601(date_str: Optional[str]) -> Optional[datetime]:
-    if not date_str:
-        return None
-    cleaned = date_str.strip()
-    if cleaned.endswith('Z'):
-        cleaned = cleaned[:-1] + '+00:00'
-    try:
-        parsed = datetime.fromisoformat(cleaned)
-    except ValueError as exc:
-        raise ValueError(f"Data/hora ISO-8601 inválida: {date_str}") from exc
-    if parsed.tzinfo is None:
-        parsed = parsed.replace(tzinfo=timezone.utc)
-    return parsed
+import dotenv
 
+from async_tools import agent_tool
+from cohorts import cohort_columns
+from data_store import _parse_iso8601, get_snapshot, warm_up
+from llm_clients import shared_chat_model
+from metrics import instrument_tool
+from referral_graph import top_networks
+from report_engine import top_referrers as rank_top_referrers
+from search_index import fold
+from tool_memo import TOOL_MEMO_TIME_BUCKET, memoize_tool
 
-def _apply_date_window(
-    candidate: datetime,
-    start: Optional[datetime],
-    end: Optional[datetime],
-) -> bool:
-    if start and candidate < start:
-        return False
-    if end and candidate > end:
-        return False
-    return True
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
 
 
-def _to_int(value: Any) -> int:
-    try:
-        return int(value)
-    except (TypeError, ValueError):
-        return 0
+# Importar o módulo não faz I/O: os dados são carregados na primeira tool (ou em `warm_up()`)
+# e o executor do LangChain só é importado em `criar_agent()`.
+dotenv.load_dotenv()
 
 
 # Tools for the agent
 
-@tool
-# TODO Make a query for searching a user using its code, ID, email or name
+@agent_tool
+@memoize_tool()
+@instrument_tool
+def search_user(query: str, limit: int = 10) -> str:
+    """Buscar usuários pelo código, UID, e-mail, nome (sem diferenciar acentos) ou data de criação.
 
-def search_user(query: str) -> str:
-    """Buscar um usuário pelo código, UID, e-mail, nome ou data de criação."""
+    Retorna os `limit` resultados mais relevantes: UID ou código idênticos primeiro,
+    depois usuários criados na data consultada, nomes que começam com a consulta e
+    demais ocorrências; empates ficam com quem tem mais pontos.
+    """
+
+    if limit <= 0:
+        raise ValueError("limit deve ser um inteiro positivo")
 
-    refresh_data()
+    snapshot = get_snapshot()
 
-    lowered = (query or "").strip().lower()
+    key = (query or "").strip()
     target_date = None
-    if query:
+    if key:
         try:
-            target_date = _parse_iso8601(query)
+            target_date = _parse_iso8601(key)
         except ValueError:
             target_date = None
 
-    results = []
-    for user in users:
-        if not isinstance(user, dict):
-            continue
-        name = user.get('name', '') or ''
-        email = user.get('email', '') or ''
-        uid = user.get('uid', '') or ''
-        my_code = user.get('my_code', '') or ''
-        created_at_raw = user.get('created_at')
-
-        matches_text = bool(lowered) and (
-            lowered in name.lower()
-            or lowered in email.lower()
-            or lowered in uid.lower()
-            or lowered in my_code.lower()
-        )
-
-        matches_date = False
-        if target_date and created_at_raw:
-            try:
-                created_at = _parse_iso8601(created_at_raw)
-                matches_date = created_at.date() == target_date.date()
-            except ValueError:
-                matches_date = False
-
-        if matches_text or matches_date:
-            results.append(user)
+    exact = [user for user in (snapshot.users_by_uid.get(key), snapshot.users_by_code.get(key)) if user is not None]
+    same_day = snapshot.users_by_created_date.get(target_date.date(), []) if target_date else []
+    total, results = snapshot.search_index.search(key, limit, exact=exact, extra=same_day)
 
     if not results:
         return "Nenhum usuário encontrado para a consulta."
 
     formatted = "; ".join(
         [
-            f"UID: {u.get('uid')}, Nome: {u.get('name')}, E-mail: {u.get('email')}, Meu Código: {u.get('my_code')}, Total de Pontos: {u.get('points_total')}, Criado em: {u.get('created_at')}, Convidado por: {u.get('invited_by_code')}"
+            f"UID: {u.uid}, Nome: {u.name}, E-mail: {u.email}, Meu Código: {u.my_code}, Total de Pontos: {u.points_total}, Criado em: {u.created_at}, Convidado por: {u.invited_by_code}"
             for u in results
         ]
     )
-    return f"Encontrado(s) {len(results)} usuário(s): {formatted}"
+    shown = f" (mostrando os {len(results)} mais relevantes)" if total > len(results) else ""
+    return f"Encontrado(s) {total} usuário(s){shown}: {formatted}"
 
 
-@tool
+@agent_tool
+@memoize_tool()
+@instrument_tool
 def get_notifications_by_date(
     inviter_uid: Optional[str] = None,
     start: Optional[str] = None,
@@ -151,7 +79,7 @@ def get_notifications_by_date(
 ) -> str:
     """Retornar notificações filtradas por convidador, intervalo de datas e, opcionalmente, por tipo. Os tipos possíveis são 'conversion' e 'bonus'."""
 
-    refresh_data()
+    snapshot = get_snapshot()
 
     if limit <= 0:
         raise ValueError("limit deve ser um inteiro positivo")
@@ -164,29 +92,23 @@ def get_notifications_by_date(
 
     normalized_type = type.lower() if type else None
 
-    filtered: List[Dict[str, Any]] = []
-    for notification in notifications:
-        created_at = _parse_iso8601(notification.get('created_at'))
-        if created_at is None:
-            continue
-        if not _apply_date_window(created_at, start_dt, end_dt):
-            continue
-        if inviter_uid and notification.get('inviter_uid') != inviter_uid:
-            continue
-        if normalized_type and (notification.get('type') or '').lower() != normalized_type:
-            continue
-        filtered.append(notification)
+    timeline = snapshot.notifications_for(inviter_uid)
+    lo, hi = timeline.bounds(start_dt, end_dt)
 
-    filtered.sort(
-        key=lambda item: _parse_iso8601(item.get('created_at')) or datetime.min.replace(tzinfo=timezone.utc),
-        reverse=True,
-    )
+    payload: List[Dict[str, Any]] = []
+    for notification in timeline.newest_first(lo, hi):
+        if normalized_type and (notification.type or '').lower() != normalized_type:
+            continue
+        payload.append(notification.to_dict())
+        if len(payload) >= limit:
+            break
 
-    payload = filtered[:limit]
     return json.dumps(payload)
 
 
-@tool
+@agent_tool
+@memoize_tool()
+@instrument_tool
 def get_points_summary(
     inviter_uid: Optional[str] = None,
     start: Optional[str] = None,
@@ -194,7 +116,7 @@ def get_points_summary(
 ) -> str:
     """Resumir os pontos concedidos no período agrupando por tipo de notificação."""
 
-    refresh_data()
+    snapshot = get_snapshot()
 
     start_dt = _parse_iso8601(start) if start else None
     end_dt = _parse_iso8601(end) if end else None
@@ -202,36 +124,13 @@ def get_points_summary(
     if start_dt and end_dt and start_dt > end_dt:
         raise ValueError("start deve ser anterior ou igual a end")
 
-    total = 0
-    conversions = 0
-    bonus = 0
-
-    for notification in notifications:
-        created_at = _parse_iso8601(notification.get('created_at'))
-        if created_at is None:
-            continue
-        if not _apply_date_window(created_at, start_dt, end_dt):
-            continue
-        if inviter_uid and notification.get('inviter_uid') != inviter_uid:
-            continue
-
-        points = _to_int(notification.get('points_awarded'))
-        total += points
-        notif_type = (notification.get('type') or '').lower()
-        if notif_type == 'conversion':
-            conversions += points
-        elif notif_type == 'bonus':
-            bonus += points
-
-    result = {
-        'points_total_period': total,
-        'points_from_conversions': conversions,
-        'points_from_bonus': bonus,
-    }
+    result = snapshot.points_summary(start_dt, end_dt, inviter_uid)
     return json.dumps(result)
 
 
-@tool
+@agent_tool
+@memoize_tool()
+@instrument_tool
 def top_referrers(
     start: Optional[str] = None,
     end: Optional[str] = None,
@@ -239,7 +138,7 @@ def top_referrers(
 ) -> str:
     """Listar indicadores ranqueados pelo número de conversões no período escolhido."""
 
-    refresh_data()
+    snapshot = get_snapshot()
 
     if limit <= 0:
         raise ValueError("limit deve ser um inteiro positivo")
@@ -250,69 +149,101 @@ def top_referrers(
     if start_dt and end_dt and start_dt > end_dt:
         raise ValueError("start deve ser anterior ou igual a end")
 
-    conversion_counts: Dict[str, int] = {}
-    for notification in notifications:
-        if (notification.get('type') or '').lower() != 'conversion':
-            continue
-        created_at = _parse_iso8601(notification.get('created_at'))
-        if created_at is None:
-            continue
-        if not _apply_date_window(created_at, start_dt, end_dt):
-            continue
-        inviter = notification.get('inviter_uid')
-        if not inviter:
-            continue
-        conversion_counts[inviter] = conversion_counts.get(inviter, 0) + 1
-
-    ranked: List[Dict[str, Any]] = []
-    for uid, conversions in conversion_counts.items():
-        user = next((u for u in users if u.get('uid') == uid), None)
-        if not user:
-            continue
-        ranked.append({
-            'uid': uid,
-            'name': user.get('name'),
-            'my_code': user.get('my_code'),
-            'conversions': conversions,
-            'points_total': _to_int(user.get('points_total')),
-        })
-
-    ranked.sort(key=lambda item: (item['conversions'], item['points_total']), reverse=True)
-    payload = ranked[:limit]
+    payload = rank_top_referrers(snapshot, start_dt, end_dt, limit)
     return json.dumps(payload)
 
 
-@tool
-def churn_risk(days: int = 7) -> str:
-    """Identificar usuários convidados sem pontos com contas mais antigas que a janela informada."""
+@agent_tool
+@memoize_tool()
+@instrument_tool
+def largest_networks(limit: int = 5) -> str:
+    """Listar os usuários com as maiores redes de indicação somando todos os níveis (convidados, convidados dos convidados e assim por diante)."""
 
-    refresh_data()
+    if limit <= 0:
+        raise ValueError("limit deve ser um inteiro positivo")
 
-    if days <= 0:
-        raise ValueError("days deve ser um inteiro positivo")
+    graph = get_snapshot().referral_graph
+    return json.dumps({'networks': top_networks(graph, limit), 'graph': graph.stats()})
 
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    at_risk: List[Dict[str, Any]] = []
 
-    for user in users:
-        if not isinstance(user, dict):
-            continue
-        if not user.get('invited_by_code'):
-            continue
-        if _to_int(user.get('points_total')) != 0:
-            continue
-        created_at = _parse_iso8601(user.get('created_at'))
-        if created_at is None:
-            continue
-        if created_at > cutoff:
-            continue
-        at_risk.append({
-            'uid': user.get('uid'),
-            'name': user.get('name'),
-            'email': user.get('email'),
-            'invited_by_code': user.get('invited_by_code'),
-        })
+# Candidatos devolvidos por `get_downline` quando o nome consultado é ambíguo.
+DOWNLINE_CANDIDATES = 5
+
+
+@agent_tool
+@memoize_tool()
+@instrument_tool
+def get_downline(user: str, max_depth: Optional[int] = None, limit: int = 20) -> str:
+    """Mostrar a rede de indicações de um usuário (UID, código, e-mail ou nome): quem o convidou até a raiz, o tamanho da rede e quantos cadastros cada nível gerou (nível 1 = convidados diretos). Lista até `limit` membros, dos níveis mais próximos primeiro. Se o nome corresponder a mais de um usuário, devolve os candidatos para escolher pelo UID."""
+
+    if limit <= 0:
+        raise ValueError("limit deve ser um inteiro positivo")
+    if max_depth is not None and max_depth <= 0:
+        raise ValueError("max_depth deve ser um inteiro positivo")
+
+    snapshot = get_snapshot()
+    graph = snapshot.referral_graph
+
+    def summary(node: int) -> Dict[str, Any]:
+        member = graph.users[node]
+        return {'uid': member.uid, 'name': member.name, 'my_code': member.my_code}
+
+    key = (user or "").strip()
+    record = snapshot.users_by_uid.get(key) or snapshot.users_by_code.get(key) or snapshot.users_by_email.get(key.lower())
+    if record is None:
+        # Pelo nome (ou parte dele), como em `search_user`: só segue se a consulta for inequívoca.
+        total, found = snapshot.search_index.search(key, DOWNLINE_CANDIDATES)
+        named = [candidate for candidate in found if fold(candidate.name or "") == fold(key)]
+        if total == 1 or len(named) == 1:
+            record = found[0] if total == 1 else named[0]
+        elif total > 1:
+            return json.dumps({
+                'matches': total,
+                'candidates': [
+                    {'uid': candidate.uid, 'name': candidate.name, 'email': candidate.email, 'my_code': candidate.my_code}
+                    for candidate in found
+                ],
+            })
+    position = graph.position(record.uid) if record is not None else None
+    if position is None:
+        return "Nenhum usuário encontrado para a consulta."
+
+    levels = graph.levels(position, max_depth)
+    members: List[Dict[str, Any]] = []
+    for level, nodes in enumerate(levels, start=1):
+        for node in nodes[:limit - len(members)]:
+            members.append(dict(summary(node), level=level, downline_size=graph.sizes[node]))
 
+    result = {
+        **summary(position),
+        'depth': graph.depths[position],
+        'upline': [summary(node) for node in graph.upline(position)],
+        'direct_invites': graph.direct_count(position),
+        'downline_size': graph.sizes[position],
+        'levels_below': graph.heights[position],
+        'levels': [{'level': level, 'users': len(nodes)} for level, nodes in enumerate(levels, start=1)],
+        'members': members,
+    }
+    return json.dumps(result)
+
+
+def _reference_date(reference_date: Optional[str]) -> datetime:
+    return _parse_iso8601(reference_date) if reference_date else datetime.now(timezone.utc)
+
+
+@agent_tool
+# Sem `reference_date`, o corte depende do relógio: o memo vale por balde de tempo.
+@memoize_tool(time_bucket=TOOL_MEMO_TIME_BUCKET)
+@instrument_tool
+def churn_risk(days: int = 7, reference_date: Optional[str] = None) -> str:
+    """Identificar usuários convidados sem pontos com contas mais antigas que a janela informada (em dias antes de `reference_date`, padrão: agora)."""
+
+    snapshot = get_snapshot()
+
+    if days <= 0:
+        raise ValueError("days deve ser um inteiro positivo")
+
+    at_risk = cohort_columns(snapshot).churn_risk(_reference_date(reference_date), days)
     result = {
         'days': days,
         'count': len(at_risk),
@@ -320,19 +251,76 @@ def churn_risk(days: int = 7) -> str:
     }
     return json.dumps(result)
 
-@tool
+
+@agent_tool
+@memoize_tool(time_bucket=TOOL_MEMO_TIME_BUCKET)
+@instrument_tool
+def cohort_retention(
+        granularity: str = "month",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        reference_date: Optional[str] = None,
+        horizon: int = 6,
+    ) -> str:
+    """Analisar coortes de cadastro por semana ('week') ou mês ('month'): tamanho, taxa de ativação (usuários que já converteram alguém), mediana de dias até a primeira conversão e curvas de ativação acumulada e de retenção (fração que converteu em cada período após o cadastro, até `horizon` períodos). `start`/`end` filtram a data de cadastro; `reference_date` (padrão: agora) é o momento da análise."""
+
+    if horizon <= 0:
+        raise ValueError("horizon deve ser um inteiro positivo")
+
+    snapshot = get_snapshot()
+
+    start_dt = _parse_iso8601(start) if start else None
+    end_dt = _parse_iso8601(end) if end else None
+
+    if start_dt and end_dt and start_dt > end_dt:
+        raise ValueError("start deve ser anterior ou igual a end")
+
+    table = cohort_columns(snapshot).cohort_table(granularity, start_dt, end_dt, _reference_date(reference_date), horizon)
+    return json.dumps(table)
+
+
+@agent_tool
+@memoize_tool(time_bucket=TOOL_MEMO_TIME_BUCKET)
+@instrument_tool
+def inviter_activation(
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        reference_date: Optional[str] = None,
+        limit: int = 10,
+    ) -> str:
+    """Comparar convidadores pela ativação dos seus convidados cadastrados no período: quantos convidou, quantos já converteram alguém, a taxa e a mediana de dias até essa primeira conversão."""
+
+    if limit <= 0:
+        raise ValueError("limit deve ser um inteiro positivo")
+
+    snapshot = get_snapshot()
+
+    start_dt = _parse_iso8601(start) if start else None
+    end_dt = _parse_iso8601(end) if end else None
+
+    if start_dt and end_dt and start_dt > end_dt:
+        raise ValueError("start deve ser anterior ou igual a end")
+
+    reference = _reference_date(reference_date)
+    inviters = cohort_columns(snapshot).inviter_table(start_dt, end_dt, reference, limit)
+    return json.dumps({'reference_date': reference.isoformat(), 'inviters': inviters})
+
+@agent_tool
+@instrument_tool
 def get_actual_date() -> str:
-    """Obter a data e hora atual. Essa função deve ser usada ANTES da utilização de outras ferramentas que dependem de data/hora, como as tools: get_notifications_by_date, churn_risk."""
+    """Obter a data e hora atual. Essa função deve ser usada ANTES da utilização de outras ferramentas que dependem de data/hora, como as tools: get_notifications_by_date, churn_risk, cohort_retention, inviter_activation."""
     return json.dumps({"current_date": datetime.now(timezone.utc).isoformat()})
 
-@tool
+@agent_tool
+@memoize_tool()
+@instrument_tool
 def total_points_given_per_time(
         start: Optional[str] = None,
         end: Optional[str] = None,
     ) -> int:
     """Retornar o total de pontos concedidos no período especificado. Tem como parâmetro o início e o fim do período."""
 
-    refresh_data()
+    snapshot = get_snapshot()
 
     start_dt = _parse_iso8601(start) if start else None
     end_dt = _parse_iso8601(end) if end else None
@@ -340,27 +328,33 @@ def total_points_given_per_time(
     if start_dt and end_dt and start_dt > end_dt:
         raise ValueError("start deve ser anterior ou igual a end")
         
-    total_points = 0
-    for notification in notifications:
-        created_at = _parse_iso8601(notification.get('created_at'))
-        if created_at is None:
-            continue
-        if not _apply_date_window(created_at, start_dt, end_dt):
-            continue
-        points = _to_int(notification.get('points_awarded'))
-        total_points += points
-
-    return total_points
+    return snapshot.points_summary(start_dt, end_dt)['points_total_period']
     
-def criar_agent() -> AgentExecutor:
-    llm = ChatOpenAI(temperature=0, model_name="gpt-4o-mini", max_retries=3)
+def criar_agent(llm: Optional[Any] = None) -> "AgentExecutor":
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    # `streaming=True` faz o modelo emitir `on_llm_new_token` para os callbacks da chamada.
+    if llm is None:
+        llm = shared_chat_model(
+            "gpt-4o-mini",
+            0,
+            component="agent",
+            max_retries=3,
+            streaming=True,
+            stream_usage=True,
+        )
 
     tools = [
         search_user,
         get_notifications_by_date,
         get_points_summary,
         top_referrers,
+        largest_networks,
+        get_downline,
         churn_risk,
+        cohort_retention,
+        inviter_activation,
         get_actual_date,
     ]
 
@@ -384,19 +378,23 @@ def criar_agent() -> AgentExecutor:
     return AgentExecutor(agent=agent, tools=tools, verbose=True)
 
 def main():
+    from chat_memory import ChatMemory
+
+    warm_up(wait=False)
     agent = criar_agent()
-    chat_history: List = []
+    # Últimos turnos na íntegra + resumo dos anteriores: o custo por turno não cresce com a sessão.
+    memory = ChatMemory()
 
     while True:
         user_input = input("Você: ")
         if user_input.lower() in {"exit", "sair"}:
             break
-        response = agent.invoke({"input": user_input, "chat_history": chat_history})
+        # `ainvoke` executa as tools de um mesmo passo em paralelo (ver `async_tools.py`).
+        response = asyncio.run(agent.ainvoke({"input": user_input, "chat_history": memory.messages()}))
         output_text = response.get("output") if isinstance(response, dict) else response
         print("Agente:", output_text)
 
-        chat_history.append(HumanMessage(content=user_input))
-        chat_history.append(AIMessage(content=output_text or ""))
+        memory.add_turn(user_input, output_text or "")
 
 if __name__ == "__main__":
     main()
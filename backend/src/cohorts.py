@@ -0,0 +1,396 @@
+"""Coortes de cadastro: ativação, tempo até a primeira conversão e retenção.
+
+Os usuários são agrupados pela semana (segunda a domingo, UTC) ou pelo mês do
+cadastro. Um usuário é *ativado* na sua primeira conversão (uma notificação
+`conversion` em que ele é o convidador) e está *ativo* em um período quando converte
+alguém nele. Por coorte saem o tamanho, a taxa de ativação, a mediana de dias até a
+primeira conversão, a curva de ativação acumulada e a curva de retenção (fração ativa
+em cada período a partir do cadastro, 0 = o período do próprio cadastro); a mesma
+ativação é agregada por convidador, sobre os convidados de cada um. Tudo é relativo a
+uma data de referência: cadastros e conversões posteriores não contam, e períodos que
+a coorte ainda não alcançou ficam `None`.
+
+As colunas (cadastro, primeira conversão, convidador e conversões por usuário) são
+montadas uma vez por snapshot, no primeiro uso (`cohort_columns`); cada tabela é
+então um punhado de operações vetorizadas sobre a fatia de cadastros pedida. Sem
+NumPy, uma implementação em Python puro devolve os mesmos valores.
+"""
+
+from datetime import date, datetime, timedelta
+import statistics
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import weakref
+
+from columnar import TYPE_CONVERSION
+from data_store import Snapshot, _to_epoch_us, _to_int
+from rollups import DAY_US
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+GRANULARITIES = ('week', 'month')
+_EPOCH_DATE = date(1970, 1, 1)
+
+
+def _period(epoch_us: int, granularity: str) -> int:
+    """Índice da semana (a partir da segunda-feira 1970-01-05 = 1) ou do mês (1970-01 = 0)."""
+    if granularity == 'week':
+        return (epoch_us // DAY_US + 3) // 7
+    day = _EPOCH_DATE + timedelta(days=epoch_us // DAY_US)
+    return (day.year - 1970) * 12 + day.month - 1
+
+
+def _periods(epoch_us: Any, granularity: str) -> Any:
+    """`_period` de um array NumPy inteiro."""
+    if granularity == 'week':
+        return (epoch_us // DAY_US + 3) // 7
+    return epoch_us.astype('datetime64[us]').astype('datetime64[M]').astype(np.int64)
+
+
+def _label(period: int, granularity: str) -> str:
+    if granularity == 'week':
+        return (_EPOCH_DATE + timedelta(days=period * 7 - 3)).isoformat()
+    year, month = divmod(period, 12)
+    return f"{1970 + year:04d}-{month + 1:02d}"
+
+
+def _days(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value / DAY_US, 1)
+
+
+def _rate(count: int, total: int) -> float:
+    return round(count / total, 4) if total else 0.0
+
+
+def _group_medians(groups: Any, values: Any, count: int) -> List[Optional[float]]:
+    """Mediana de `values` por grupo (0..count-1), `None` nos grupos vazios."""
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    sizes = np.bincount(groups, minlength=count)
+    starts = np.cumsum(sizes) - sizes
+    filled = sizes > 0
+    medians = np.zeros(count, dtype=np.float64)
+    low = starts[filled] + (sizes[filled] - 1) // 2
+    high = starts[filled] + sizes[filled] // 2
+    medians[filled] = (ordered[low] + ordered[high]) / 2
+    return [float(value) if has_values else None for value, has_values in zip(medians.tolist(), filled.tolist())]
+
+
+class CohortColumns:
+    """Colunas por usuário da timeline de cadastros (ordem de `created_at`).
+
+    `first_conversion` é o instante da primeira conversão do usuário como convidador
+    (-1 sem conversões); `conversion_rows`/`conversion_times` são todas as conversões
+    feitas a partir do cadastro do convidador, em ordem de tempo, com a linha dele;
+    `inviter_ids` é o código de convite usado no cadastro (índice em `inviters`, -1
+    sem convidador conhecido); `export_positions` é a posição do usuário em
+    `snapshot.users`, para listar usuários na ordem do export.
+    """
+
+    def __init__(self, snapshot: Snapshot) -> None:
+        timeline = snapshot.user_timeline
+        users = timeline.items
+        self.timeline = timeline
+        self.users = users
+
+        position_of = {id(user): position for position, user in enumerate(snapshot.users)}
+        export_positions = [position_of[id(user)] for user in users]
+
+        rows_by_uid: Dict[str, int] = {}
+        for row, user in enumerate(users):
+            if user.uid:
+                rows_by_uid.setdefault(user.uid, row)
+
+        # Só códigos que existem viram convidadores; os demais contam como sem convidador.
+        inviter_ids: Dict[str, int] = {}
+        self.inviters: List[Any] = []
+        invited_by: List[int] = []
+        for user in users:
+            code = user.invited_by_code
+            inviter_id = inviter_ids.get(code, -1) if code else -1
+            if code and inviter_id < 0 and code in snapshot.users_by_code:
+                inviter_id = inviter_ids[code] = len(self.inviters)
+                self.inviters.append(snapshot.users_by_code[code])
+            invited_by.append(inviter_id)
+        invited = [bool(user.invited_by_code) for user in users]
+        zero_points = [_to_int(user.points_total) == 0 for user in users]
+
+        points = snapshot.points
+        rows_by_inviter = [rows_by_uid.get(uid, -1) for uid in points.inviter_uids]
+        if np is not None:
+            self._build_numpy(points, rows_by_inviter, invited_by, invited, zero_points)
+            self.export_positions = np.asarray(export_positions, dtype=np.int64)
+        else:
+            self._build_python(points, rows_by_inviter, invited_by, invited, zero_points)
+            self.export_positions = export_positions
+
+    def _build_numpy(self, points: Any, rows_by_inviter: List[int], invited_by: List[int], invited: List[bool], zero_points: List[bool]) -> None:
+        self.signup = np.asarray(self.timeline.keys, dtype=np.int64)
+        self.inviter_ids = np.asarray(invited_by, dtype=np.int64)
+        self.invited = np.asarray(invited, dtype=bool)
+        self.zero_points = np.asarray(zero_points, dtype=bool)
+
+        codes = np.asarray(points.inviter_codes, dtype=np.int64)
+        conversions = (np.asarray(points.type_codes) == TYPE_CONVERSION) & (codes >= 0)
+        rows = np.asarray(rows_by_inviter, dtype=np.int64)[codes[conversions]]
+        times = np.asarray(points.timestamps, dtype=np.int64)[conversions]
+        # Conversões anteriores ao cadastro do convidador (dados inconsistentes) não contam.
+        valid = rows >= 0
+        valid[valid] = times[valid] >= self.signup[rows[valid]]
+        self.conversion_rows = rows[valid]
+        self.conversion_times = times[valid]
+
+        # As conversões estão em ordem de tempo: a primeira ocorrência de cada linha é a primeira conversão.
+        self.first_conversion = np.full(len(self.signup), -1, dtype=np.int64)
+        first_rows, first_index = np.unique(self.conversion_rows, return_index=True)
+        self.first_conversion[first_rows] = self.conversion_times[first_index]
+
+    def _build_python(self, points: Any, rows_by_inviter: List[int], invited_by: List[int], invited: List[bool], zero_points: List[bool]) -> None:
+        self.signup = self.timeline.keys
+        self.inviter_ids = invited_by
+        self.invited = invited
+        self.zero_points = zero_points
+
+        self.conversion_rows: List[int] = []
+        self.conversion_times: List[int] = []
+        for timestamp, type_code, code in zip(points.timestamps, points.type_codes, points.inviter_codes):
+            if type_code != TYPE_CONVERSION or code < 0:
+                continue
+            row = rows_by_inviter[code]
+            if row >= 0 and timestamp >= self.signup[row]:
+                self.conversion_rows.append(row)
+                self.conversion_times.append(timestamp)
+
+        self.first_conversion = [-1] * len(self.signup)
+        for row, timestamp in zip(reversed(self.conversion_rows), reversed(self.conversion_times)):
+            self.first_conversion[row] = timestamp
+
+    def churn_risk(self, reference: datetime, days: int, start: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Convidados sem pontos cadastrados a partir de `start` e há pelo menos `days` dias.
+
+        Listados na ordem de `snapshot.users` (a do export), não na de cadastro.
+        """
+        lo, hi = self.timeline.bounds(start, reference - timedelta(days=days))
+        if np is not None:
+            rows = np.flatnonzero(self.invited[lo:hi] & self.zero_points[lo:hi]) + lo
+            rows = rows[np.argsort(self.export_positions[rows], kind='stable')].tolist()
+        else:
+            rows = [row for row in range(lo, hi) if self.invited[row] and self.zero_points[row]]
+            rows.sort(key=self.export_positions.__getitem__)
+        return [
+            {
+                'uid': self.users[row].uid,
+                'name': self.users[row].name,
+                'email': self.users[row].email,
+                'invited_by_code': self.users[row].invited_by_code,
+            }
+            for row in rows
+        ]
+
+    def cohort_table(
+        self,
+        granularity: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        reference: datetime,
+        horizon: int,
+    ) -> Dict[str, Any]:
+        """Uma linha por coorte de cadastro em `[start, min(end, reference)]`.
+
+        As curvas têm `horizon` pontos: `activation_curve[k]` é a fração da coorte
+        ativada até o período k após o cadastro e `retention_curve[k]` a fração com
+        alguma conversão no período k.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError("granularity deve ser 'week' ou 'month'")
+        if horizon <= 0:
+            raise ValueError("horizon deve ser um inteiro positivo")
+
+        reference_us = _to_epoch_us(reference)
+        lo, hi = self.timeline.bounds(start, min(end, reference) if end else reference)
+        if np is not None:
+            periods, sizes, activated, medians, activation, retention = self._cohorts_numpy(lo, hi, granularity, reference_us, horizon)
+        else:
+            periods, sizes, activated, medians, activation, retention = self._cohorts_python(lo, hi, granularity, reference_us, horizon)
+
+        reference_period = _period(reference_us, granularity)
+        cohorts = []
+        for index, period in enumerate(periods):
+            size = sizes[index]
+            # Períodos que a coorte ainda não alcançou na data de referência ficam em aberto.
+            observed = min(horizon, reference_period - period + 1)
+            cohorts.append({
+                'cohort': _label(period, granularity),
+                'users': size,
+                'activated': activated[index],
+                'activation_rate': _rate(activated[index], size),
+                'median_days_to_first_conversion': _days(medians[index]),
+                'activation_curve': [_rate(count, size) for count in activation[index][:observed]] + [None] * (horizon - observed),
+                'retention_curve': [_rate(count, size) for count in retention[index][:observed]] + [None] * (horizon - observed),
+            })
+        return {
+            'granularity': granularity,
+            'reference_date': reference.isoformat(),
+            'horizon': horizon,
+            'users': hi - lo,
+            'cohorts': cohorts,
+        }
+
+    def _cohorts_numpy(self, lo: int, hi: int, granularity: str, reference_us: int, horizon: int) -> Tuple[Any, ...]:
+        signup = self.signup[lo:hi]
+        cohort = _periods(signup, granularity)
+        # `signup` está ordenado, então as coortes formam blocos contíguos e crescentes.
+        periods, sizes = np.unique(cohort, return_counts=True)
+        count = len(periods)
+        cohort_index = np.repeat(np.arange(count), sizes)
+
+        first = self.first_conversion[lo:hi]
+        is_activated = (first >= 0) & (first <= reference_us)
+        activated_index = cohort_index[is_activated]
+        activated = np.bincount(activated_index, minlength=count)
+        medians = _group_medians(activated_index, first[is_activated] - signup[is_activated], count)
+
+        offsets = _periods(first[is_activated], granularity) - cohort[is_activated]
+        inside = offsets < horizon
+        activation = np.bincount(activated_index[inside] * horizon + offsets[inside], minlength=count * horizon)
+        activation = activation.reshape(count, horizon).cumsum(axis=1)
+
+        selected = (self.conversion_rows >= lo) & (self.conversion_rows < hi) & (self.conversion_times <= reference_us)
+        rows = self.conversion_rows[selected] - lo
+        offsets = _periods(self.conversion_times[selected], granularity) - cohort[rows]
+        inside = offsets < horizon
+        # Um usuário conta uma vez por período, não importa quantas conversões fez nele.
+        active = np.unique(rows[inside] * horizon + offsets[inside])
+        retention = np.bincount(cohort_index[active // horizon] * horizon + active % horizon, minlength=count * horizon)
+        retention = retention.reshape(count, horizon)
+
+        return periods.tolist(), sizes.tolist(), activated.tolist(), medians, activation.tolist(), retention.tolist()
+
+    def _cohorts_python(self, lo: int, hi: int, granularity: str, reference_us: int, horizon: int) -> Tuple[Any, ...]:
+        periods: List[int] = []
+        sizes: List[int] = []
+        cohort_of_row: Dict[int, int] = {}
+        delays: List[List[int]] = []
+        activation: List[List[int]] = []
+        for row in range(lo, hi):
+            period = _period(self.signup[row], granularity)
+            if not periods or periods[-1] != period:
+                periods.append(period)
+                sizes.append(0)
+                delays.append([])
+                activation.append([0] * horizon)
+            index = len(periods) - 1
+            sizes[index] += 1
+            cohort_of_row[row] = index
+            first = self.first_conversion[row]
+            if 0 <= first <= reference_us:
+                delays[index].append(first - self.signup[row])
+                offset = _period(first, granularity) - period
+                if offset < horizon:
+                    activation[index][offset] += 1
+        for counts in activation:
+            for offset in range(1, horizon):
+                counts[offset] += counts[offset - 1]
+
+        retention = [[0] * horizon for _ in periods]
+        active = set()
+        for row, timestamp in zip(self.conversion_rows, self.conversion_times):
+            if not lo <= row < hi or timestamp > reference_us:
+                continue
+            index = cohort_of_row[row]
+            offset = _period(timestamp, granularity) - periods[index]
+            if offset < horizon and (row, offset) not in active:
+                active.add((row, offset))
+                retention[index][offset] += 1
+
+        activated = [len(values) for values in delays]
+        medians = [float(statistics.median(values)) if values else None for values in delays]
+        return periods, sizes, activated, medians, activation, retention
+
+    def inviter_table(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        reference: datetime,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        """Convidadores com mais convidados cadastrados em `[start, min(end, reference)]`.
+
+        Para cada um: convidados, quantos deles já converteram alguém (ativados), a taxa
+        e a mediana de dias até essa primeira conversão. Empates: mais ativados, depois
+        a ordem do primeiro convite.
+        """
+        reference_us = _to_epoch_us(reference)
+        lo, hi = self.timeline.bounds(start, min(end, reference) if end else reference)
+        if np is not None:
+            inviter = self.inviter_ids[lo:hi]
+            first = self.first_conversion[lo:hi]
+            known = inviter >= 0
+            is_activated = known & (first >= 0) & (first <= reference_us)
+            count = len(self.inviters)
+            invitees = np.bincount(inviter[known], minlength=count)
+            activated = np.bincount(inviter[is_activated], minlength=count)
+            ranking = [
+                index for index in np.lexsort((-activated, -invitees))[:limit].tolist()
+                if invitees[index] > 0
+            ]
+            delays = (first - self.signup[lo:hi])[is_activated]
+            medians = _group_medians(inviter[is_activated], delays, count)
+            invitees, activated = invitees.tolist(), activated.tolist()
+        else:
+            invitees = [0] * len(self.inviters)
+            activated = [0] * len(self.inviters)
+            delays_by_inviter: Dict[int, List[int]] = {}
+            for row in range(lo, hi):
+                index = self.inviter_ids[row]
+                if index < 0:
+                    continue
+                invitees[index] += 1
+                first = self.first_conversion[row]
+                if 0 <= first <= reference_us:
+                    activated[index] += 1
+                    delays_by_inviter.setdefault(index, []).append(first - self.signup[row])
+            ranked = sorted(range(len(self.inviters)), key=lambda index: (-invitees[index], -activated[index]))
+            ranking = [index for index in ranked[:limit] if invitees[index] > 0]
+            medians = [
+                float(statistics.median(delays_by_inviter[index])) if index in delays_by_inviter else None
+                for index in range(len(self.inviters))
+            ]
+
+        return [
+            {
+                'uid': self.inviters[index].uid,
+                'name': self.inviters[index].name,
+                'my_code': self.inviters[index].my_code,
+                'invitees': invitees[index],
+                'activated': activated[index],
+                'activation_rate': _rate(activated[index], invitees[index]),
+                'median_days_to_first_conversion': _days(medians[index]),
+            }
+            for index in ranking
+        ]
+
+
+_cache_lock = threading.Lock()
+_cached: Optional[Tuple['weakref.ref[Snapshot]', CohortColumns]] = None
+
+
+def cohort_columns(snapshot: Snapshot) -> CohortColumns:
+    """Colunas de coorte do snapshot, montadas no primeiro uso e reaproveitadas até a troca."""
+    global _cached
+    with _cache_lock:
+        if _cached is None or _cached[0]() is not snapshot:
+            # Referência fraca: o snapshot anterior não fica vivo só por causa do cache.
+            _cached = (weakref.ref(snapshot), CohortColumns(snapshot))
+        return _cached[1]
+
+
+def default_granularity(start: Optional[datetime], end: Optional[datetime]) -> str:
+    """Semanas para janelas de até ~3 meses, meses para o resto."""
+    if start and end and end - start <= timedelta(days=92):
+        return 'week'
+    return 'month'
+
@@ -0,0 +1,263 @@
+"""Colunas das notificações para agregações de pontos vetorizadas.
+
+O NumPy é opcional: sem ele, `build_points_columns` devolve uma implementação em
+Python puro com a mesma interface e os mesmos resultados.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+
+TYPE_CONVERSION = 0
+TYPE_BONUS = 1
+TYPE_OTHER = 2
+_TYPE_CODES = {'conversion': TYPE_CONVERSION, 'bonus': TYPE_BONUS}
+
+_INT32_MIN = -(2 ** 31)
+_INT32_MAX = 2 ** 31 - 1
+
+
+def _type_code(notif_type: str) -> int:
+    return _TYPE_CODES.get(notif_type, TYPE_OTHER)
+
+
+def _summary(total: int, conversions: int, bonus: int) -> Dict[str, int]:
+    return {
+        'points_total_period': total,
+        'points_from_conversions': conversions,
+        'points_from_bonus': bonus,
+    }
+
+
+class _InviterInterner:
+    """Associa cada `inviter_uid` a um id inteiro denso (-1 quando ausente)."""
+
+    def __init__(self, inviters: List[Optional[str]], ids: Optional[Dict[str, int]] = None) -> None:
+        # Ao estender colunas existentes, parte de uma cópia dos ids já atribuídos.
+        self.ids: Dict[str, int] = dict(ids) if ids else {}
+        self.codes: List[int] = []
+        for inviter in inviters:
+            if not inviter:
+                self.codes.append(-1)
+                continue
+            code = self.ids.get(inviter)
+            if code is None:
+                code = self.ids[inviter] = len(self.ids)
+            self.codes.append(code)
+        # Os ids são atribuídos em ordem, então a posição na lista é o próprio id.
+        self.uids: List[str] = list(self.ids)
+
+
+class PythonPointsColumns:
+    """Colunas em listas Python, usadas quando o NumPy não está disponível."""
+
+    backend = 'python'
+
+    def __init__(
+        self,
+        timestamps: List[int],
+        points: List[int],
+        types: List[str],
+        inviters: List[Optional[str]],
+        positions: List[int],
+    ) -> None:
+        interner = _InviterInterner(inviters)
+        self.inviter_ids = interner.ids
+        self.inviter_uids = interner.uids
+        self.timestamps = timestamps
+        self.points = points
+        self.type_codes = [_type_code(notif_type) for notif_type in types]
+        self.inviter_codes = interner.codes
+        self.positions = positions
+
+    def as_lists(self, lo: int = 0) -> Tuple[List[int], List[int], List[int], List[int]]:
+        if lo:
+            return self.timestamps[lo:], self.points[lo:], self.type_codes[lo:], self.inviter_codes[lo:]
+        return self.timestamps, self.points, self.type_codes, self.inviter_codes
+
+    def extended(
+        self,
+        timestamps: List[int],
+        points: List[int],
+        types: List[str],
+        inviters: List[Optional[str]],
+        positions: List[int],
+    ) -> 'PythonPointsColumns':
+        """Novas colunas com as linhas informadas anexadas ao fim (as atuais não mudam)."""
+        columns = PythonPointsColumns.__new__(PythonPointsColumns)
+        interner = _InviterInterner(inviters, self.inviter_ids)
+        columns.inviter_ids = interner.ids
+        columns.inviter_uids = interner.uids
+        columns.timestamps = self.timestamps + timestamps
+        columns.points = self.points + points
+        columns.type_codes = self.type_codes + [_type_code(notif_type) for notif_type in types]
+        columns.inviter_codes = self.inviter_codes + interner.codes
+        columns.positions = self.positions + positions
+        return columns
+
+    def export_order(self, lo: int, hi: int) -> List[int]:
+        """Linhas de `[lo, hi)` na ordem da lista de notificações do export."""
+        return sorted(range(lo, hi), key=self.positions.__getitem__)
+
+    def summarize(self, lo: int, hi: int, inviter_uid: Optional[str] = None) -> Dict[str, int]:
+        """Soma os pontos das linhas `[lo, hi)` por tipo, opcionalmente de um único convidador."""
+
+        inviter_code = None
+        if inviter_uid:
+            inviter_code = self.inviter_ids.get(inviter_uid)
+            if inviter_code is None:
+                return _summary(0, 0, 0)
+
+        totals = [0, 0, 0]
+        for index in range(lo, hi):
+            if inviter_code is not None and self.inviter_codes[index] != inviter_code:
+                continue
+            totals[self.type_codes[index]] += self.points[index]
+        return _summary(sum(totals), totals[TYPE_CONVERSION], totals[TYPE_BONUS])
+
+    def scan(self, lo: int, hi: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Uma passada em `[lo, hi)`: pontos por tipo e conversões por convidador.
+
+        As conversões vêm na ordem em que cada convidador aparece pela primeira vez na
+        janela, seguindo a ordem do export (a da passada linear sobre as notificações).
+        """
+
+        totals = [0, 0, 0]
+        counts: Dict[int, int] = {}
+        first_seen: Dict[int, int] = {}
+        type_codes = self.type_codes
+        inviter_codes = self.inviter_codes
+        points = self.points
+        positions = self.positions
+        for index in range(lo, hi):
+            type_code = type_codes[index]
+            totals[type_code] += points[index]
+            code = inviter_codes[index]
+            if type_code == TYPE_CONVERSION and code >= 0:
+                counts[code] = counts.get(code, 0) + 1
+                if positions[index] < first_seen.get(code, positions[index] + 1):
+                    first_seen[code] = positions[index]
+        in_export_order = sorted(counts, key=first_seen.__getitem__)
+        conversions = {self.inviter_uids[code]: counts[code] for code in in_export_order}
+        return _summary(sum(totals), totals[TYPE_CONVERSION], totals[TYPE_BONUS]), conversions
+
+
+class NumpyPointsColumns:
+    """Colunas em arrays NumPy: somas por tipo/convidador viram reduções mascaradas."""
+
+    backend = 'numpy'
+
+    def __init__(
+        self,
+        timestamps: List[int],
+        points: List[int],
+        types: List[str],
+        inviters: List[Optional[str]],
+        positions: List[int],
+        inviter_ids: Optional[Dict[str, int]] = None,
+    ) -> None:
+        interner = _InviterInterner(inviters, inviter_ids)
+        self.inviter_ids = interner.ids
+        self.inviter_uids = interner.uids
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.points = np.asarray(points, dtype=_points_dtype(points))
+        self.type_codes = np.asarray([_type_code(notif_type) for notif_type in types], dtype=np.int8)
+        self.inviter_codes = np.asarray(interner.codes, dtype=np.int32)
+        self.positions = np.asarray(positions, dtype=np.int64)
+
+    def as_lists(self, lo: int = 0) -> Tuple[List[int], List[int], List[int], List[int]]:
+        return (
+            self.timestamps[lo:].tolist(),
+            self.points[lo:].tolist(),
+            self.type_codes[lo:].tolist(),
+            self.inviter_codes[lo:].tolist(),
+        )
+
+    def extended(
+        self,
+        timestamps: List[int],
+        points: List[int],
+        types: List[str],
+        inviters: List[Optional[str]],
+        positions: List[int],
+    ) -> 'NumpyPointsColumns':
+        """Novas colunas com as linhas informadas anexadas ao fim (as atuais não mudam)."""
+        tail = NumpyPointsColumns(timestamps, points, types, inviters, positions, self.inviter_ids)
+        columns = NumpyPointsColumns.__new__(NumpyPointsColumns)
+        columns.inviter_ids = tail.inviter_ids
+        columns.inviter_uids = tail.inviter_uids
+        columns.timestamps = np.concatenate([self.timestamps, tail.timestamps])
+        columns.points = np.concatenate([self.points, tail.points])
+        columns.type_codes = np.concatenate([self.type_codes, tail.type_codes])
+        columns.inviter_codes = np.concatenate([self.inviter_codes, tail.inviter_codes])
+        columns.positions = np.concatenate([self.positions, tail.positions])
+        return columns
+
+    def export_order(self, lo: int, hi: int) -> List[int]:
+        """Linhas de `[lo, hi)` na ordem da lista de notificações do export."""
+        return (np.argsort(self.positions[lo:hi], kind='stable') + lo).tolist()
+
+    def summarize(self, lo: int, hi: int, inviter_uid: Optional[str] = None) -> Dict[str, int]:
+        """Soma os pontos das linhas `[lo, hi)` por tipo, opcionalmente de um único convidador."""
+
+        points = self.points[lo:hi]
+        type_codes = self.type_codes[lo:hi]
+        if inviter_uid:
+            inviter_code = self.inviter_ids.get(inviter_uid)
+            if inviter_code is None:
+                return _summary(0, 0, 0)
+            mask = self.inviter_codes[lo:hi] == inviter_code
+            points = points[mask]
+            type_codes = type_codes[mask]
+
+        dtype = object if self.points.dtype == object else np.int64
+        total = int(points.sum(dtype=dtype))
+        conversions = int(points[type_codes == TYPE_CONVERSION].sum(dtype=dtype))
+        bonus = int(points[type_codes == TYPE_BONUS].sum(dtype=dtype))
+        return _summary(total, conversions, bonus)
+
+    def scan(self, lo: int, hi: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Uma passada em `[lo, hi)`: pontos por tipo e conversões por convidador.
+
+        As conversões vêm na ordem em que cada convidador aparece pela primeira vez na
+        janela, seguindo a ordem do export (a da passada linear sobre as notificações).
+        """
+
+        inviter_codes = self.inviter_codes[lo:hi]
+        mask = (self.type_codes[lo:hi] == TYPE_CONVERSION) & (inviter_codes >= 0)
+        # Em ordem do export, a primeira linha de cada convidador é a sua primeira aparição.
+        by_position = np.argsort(self.positions[lo:hi][mask])
+        converted = inviter_codes[mask][by_position]
+        codes, first_seen, counts = np.unique(converted, return_index=True, return_counts=True)
+        order = np.argsort(first_seen)
+        conversions = {self.inviter_uids[code]: count for code, count in zip(codes[order].tolist(), counts[order].tolist())}
+        return self.summarize(lo, hi), conversions
+
+
+def _points_dtype(points: List[int]):
+    if not points or (_INT32_MIN <= min(points) and max(points) <= _INT32_MAX):
+        return np.int32
+    # Fora do intervalo de int32 o resultado precisa continuar exato.
+    if -(2 ** 63) <= min(points) and max(points) <= 2 ** 63 - 1:
+        return np.int64
+    return object
+
+
+def build_points_columns(
+    timestamps: List[int],
+    points: List[int],
+    types: List[str],
+    inviters: List[Optional[str]],
+    positions: List[int],
+):
+    """Cria as colunas com NumPy quando disponível, ou a versão em Python puro.
+
+    `positions` é a posição de cada linha na lista de notificações do export.
+    """
+
+    columns_cls = NumpyPointsColumns if np is not None else PythonPointsColumns
+    return columns_cls(timestamps, points, types, inviters, positions)
@@ -0,0 +1,635 @@
+"""Cache do snapshot exportado em `DATA_URL`, compartilhado pelo agente e pelos relatórios."""
+
+from bisect import bisect_left, bisect_right
+import copy
+from datetime import date, datetime, timedelta, timezone
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import dotenv
+
+from columnar import _summary, build_points_columns
+from http_client import DATA_HTTP_TIMEOUT, CircuitBreaker, CircuitOpenError, get_session
+from json_stream import load_export
+import metrics
+from records import RECORD_TYPES, NotificationRecord, Record, UserRecord, compact
+from referral_graph import ReferralGraph
+from rollups import DAY_US, DailyRollups
+from search_index import UserSearchIndex
+
+
+dotenv.load_dotenv()
+DATA_URL = os.getenv("DATA_URL")
+# Janela (em segundos) em que o snapshot é considerado fresco e nenhuma requisição é feita.
+DATA_CACHE_TTL = float(os.getenv("DATA_CACHE_TTL", "30"))
+# `incremental` pede ao exportador apenas os registros mais novos que a marca d'água (`since`).
+DATA_SYNC_MODE = os.getenv("DATA_SYNC_MODE", "full").lower()
+_STREAM_CHUNK_SIZE = 1 << 16
+# Intervalo (em segundos) do atualizador em segundo plano; 0 desliga.
+DATA_REFRESH_INTERVAL = float(os.getenv("DATA_REFRESH_INTERVAL", "0"))
+
+logger = logging.getLogger(__name__)
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _parse_iso8601(date_str: Optional[str]) -> Optional[datetime]:
+    if not date_str:
+        return None
+    cleaned = date_str.strip()
+    if cleaned.endswith('Z'):
+        cleaned = cleaned[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(cleaned)
+    except ValueError as exc:
+        raise ValueError(f"Data/hora ISO-8601 inválida: {date_str}") from exc
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_epoch_us(moment: datetime) -> int:
+    """Converte um datetime com fuso para microssegundos desde a época (sem perda)."""
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _parsed_created_at(record: Any) -> Optional[datetime]:
+    if not isinstance(record, Record):
+        return None
+    try:
+        return _parse_iso8601(record.created_at)
+    except (ValueError, TypeError, AttributeError):
+        # `created_at` fora do padrão (epoch numérico, lista...) tira só este registro das timelines.
+        return None
+
+
+class Timeline:
+    """Registros ordenados por `created_at`, com as chaves em epoch (µs) para busca binária."""
+
+    __slots__ = ('keys', 'items')
+
+    def __init__(self, keys: List[int], items: List[Record]) -> None:
+        self.keys = keys
+        self.items = items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def bounds(self, start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, int]:
+        """Índices `[lo, hi)` dos registros com `start <= created_at <= end`."""
+        lo = bisect_left(self.keys, _to_epoch_us(start)) if start else 0
+        hi = bisect_right(self.keys, _to_epoch_us(end)) if end else len(self.keys)
+        return lo, max(lo, hi)
+
+    def window(self, start: Optional[datetime], end: Optional[datetime]) -> List[Record]:
+        lo, hi = self.bounds(start, end)
+        return self.items[lo:hi]
+
+    def newest_first(self, lo: int, hi: int) -> Iterator[Record]:
+        """Percorre `[lo, hi)` do mais recente para o mais antigo, mantendo a ordem original nos empates."""
+        index = hi
+        while index > lo:
+            group_start = bisect_left(self.keys, self.keys[index - 1], lo, index)
+            yield from self.items[group_start:index]
+            index = group_start
+
+
+class Snapshot:
+    """Dados exportados pela API junto dos índices de busca usados pelas tools.
+
+    Um snapshot nunca é alterado depois de criado: cada carga constrói um novo objeto
+    e o publica trocando uma única referência, então os índices sempre correspondem
+    às listas de `users` e `notifications`. Os `created_at` são interpretados uma única
+    vez aqui; registros sem data válida ficam fora das timelines.
+
+    Usuários e notificações são guardados como registros compactos (`records.py`);
+    `data` fica só com as demais chaves do export (`settings`, `session`...).
+    """
+
+    def __init__(self, payload: Dict[str, Any], source: Optional[str] = None) -> None:
+        """`source` identifica o conteúdo do export (validador HTTP ou hash do corpo).
+
+        Sem ele, a versão é calculada a partir de todos os registros.
+        """
+        self.data = {key: value for key, value in payload.items() if key not in RECORD_TYPES}
+        self._index_users(_compacted('users', payload.get('users') or []))
+        self._index_notifications(_compacted('notifications', payload.get('notifications') or []))
+        self.version = self._fingerprint(source if source is not None else self._content_digest())
+
+    def _index_users(self, users: List[UserRecord]) -> None:
+        self.users: List[UserRecord] = users
+        self.users_by_uid: Dict[str, UserRecord] = {}
+        self.users_by_code: Dict[str, UserRecord] = {}
+        self.users_by_email: Dict[str, UserRecord] = {}
+        self.users_by_created_date: Dict[date, List[UserRecord]] = {}
+        timed_users: List[Tuple[int, UserRecord]] = []
+        for user in users:
+            if not isinstance(user, UserRecord):
+                continue
+            # setdefault mantém o primeiro registro, como a busca linear fazia.
+            if user.uid:
+                self.users_by_uid.setdefault(user.uid, user)
+            if user.my_code:
+                self.users_by_code.setdefault(user.my_code, user)
+            if user.email:
+                self.users_by_email.setdefault(user.email.lower(), user)
+            created_at = _parsed_created_at(user)
+            if created_at is not None:
+                self.users_by_created_date.setdefault(created_at.date(), []).append(user)
+                timed_users.append((_to_epoch_us(created_at), user))
+        self.user_timeline = _build_timeline(timed_users)
+        self.search_index = UserSearchIndex(users)
+        self.referral_graph = ReferralGraph(users, self.users_by_code)
+
+    def _index_notifications(self, notifications: List[NotificationRecord]) -> None:
+        self.notifications: List[NotificationRecord] = notifications
+        self.notification_timeline = _build_timeline(_timed(notifications))
+
+        self.notifications_by_inviter: Dict[str, Timeline] = {}
+        timeline = self.notification_timeline
+        _group_by_inviter(self.notifications_by_inviter, timeline.keys, timeline.items)
+
+        # `_to_int` e o `lower()` do tipo são aplicados uma vez aqui, não a cada consulta.
+        positions = _export_positions(timeline.items, notifications)
+        self.points = build_points_columns(*_points_rows(timeline.keys, timeline.items), positions)
+        self.daily = DailyRollups(*self.points.as_lists())
+
+    @property
+    def watermark(self) -> Optional[Dict[str, Any]]:
+        """`created_at`/`id` da notificação mais recente, usados como `since` na sincronização incremental."""
+        if not self.notification_timeline.items:
+            return None
+        newest = self.notification_timeline.items[-1]
+        return {'since': newest.get('created_at'), 'since_id': newest.get('id')}
+
+    def merged(self, delta: Dict[str, Any]) -> 'Snapshot':
+        """Novo snapshot com um export incremental aplicado sobre este.
+
+        Notificações são tratadas como append-only: as novas entram no fim das timelines,
+        das colunas e das somas diárias sem reprocessar as existentes. Usuários do delta
+        substituem os registros com o mesmo `uid` e os índices de usuários são refeitos.
+        Notificações fora de ordem (anteriores à mais recente conhecida) forçam a
+        reconstrução completa do snapshot.
+        """
+
+        snapshot = copy.copy(self)
+        snapshot.data = {
+            **self.data,
+            **{key: value for key, value in delta.items() if key != 'delta' and key not in RECORD_TYPES},
+        }
+
+        delta_users = _compacted('users', delta.get('users') or [])
+        if delta_users:
+            snapshot._index_users(_merge_users(self.users, delta_users))
+
+        timeline = self.notification_timeline
+        new_notifications = _dedupe_tail(timeline, _compacted('notifications', delta.get('notifications') or []))
+        notifications = self.notifications + new_notifications
+        new_timed = _timed(new_notifications)
+        if new_timed and timeline.keys and min(key for key, _ in new_timed) < timeline.keys[-1]:
+            snapshot._index_notifications(notifications)
+            snapshot.version = snapshot._fingerprint(self.version)
+            return snapshot
+
+        new_timeline = _build_timeline(new_timed)
+        snapshot.notifications = notifications
+        snapshot.notification_timeline = Timeline(
+            timeline.keys + new_timeline.keys,
+            timeline.items + new_timeline.items,
+        )
+        snapshot.notifications_by_inviter = dict(self.notifications_by_inviter)
+        _group_by_inviter(snapshot.notifications_by_inviter, new_timeline.keys, new_timeline.items, copy_on_write=True)
+
+        rows = len(timeline.keys)
+        positions = _export_positions(new_timeline.items, new_notifications, len(self.notifications))
+        snapshot.points = self.points.extended(*_points_rows(new_timeline.keys, new_timeline.items), positions)
+        snapshot.daily = self.daily.extended(*snapshot.points.as_lists(rows))
+        snapshot.version = snapshot._fingerprint(self.version)
+        return snapshot
+
+    def _fingerprint(self, source: str) -> str:
+        """Identificador curto do conteúdo, estável entre processos.
+
+        Combina `source` (o que identifica o conteúdo completo: validador HTTP, hash
+        do corpo ou, após um delta, a versão anterior) com marcadores baratos que
+        mudam quando chegam usuários ou notificações, quando a notificação mais
+        recente muda ou quando algum usuário é atualizado (`updated_at`). Usado para
+        invalidar caches derivados do snapshot (memo das tools e cache de LLM).
+        """
+        newest = self.notification_timeline.items[-1] if self.notification_timeline.items else {}
+        latest_update = max(
+            (user.updated_at or '' for user in self.users if isinstance(user, UserRecord)),
+            default='',
+        )
+        marker = json.dumps([
+            len(self.users),
+            len(self.notifications),
+            newest.get('created_at'),
+            newest.get('id'),
+            latest_update,
+            source,
+        ])
+        return hashlib.sha1(marker.encode('utf-8')).hexdigest()[:16]
+
+    def _content_digest(self) -> str:
+        """Hash de todos os campos de todos os registros (para snapshots montados sem `source`)."""
+        digest = hashlib.sha1()
+        for records in (self.users, self.notifications):
+            for record in records:
+                fields = [getattr(record, field) for field in record.__slots__] if isinstance(record, Record) else record
+                digest.update(repr(fields).encode('utf-8'))
+        return 'content:' + digest.hexdigest()
+
+    def notifications_for(self, inviter_uid: Optional[str] = None) -> Timeline:
+        """Timeline de todas as notificações ou apenas das de um convidador."""
+        if not inviter_uid:
+            return self.notification_timeline
+        return self.notifications_by_inviter.get(inviter_uid) or Timeline([], [])
+
+    def points_summary(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        inviter_uid: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """Pontos concedidos em `[start, end]` agrupados por tipo.
+
+        Os dias completos da janela saem das somas de prefixo diárias; apenas as
+        notificações dos dias parciais das bordas são somadas pelas colunas de pontos.
+        """
+
+        inviter_code = None
+        if inviter_uid:
+            inviter_code = self.points.inviter_ids.get(inviter_uid)
+            if inviter_code is None:
+                return _merge_summaries()
+
+        keys = self.notification_timeline.keys
+        lo, hi = self.notification_timeline.bounds(start, end)
+        first_day = -(-_to_epoch_us(start) // DAY_US) if start else None
+        last_day = (_to_epoch_us(end) + 1) // DAY_US - 1 if end else None
+        if first_day is not None and last_day is not None and first_day > last_day:
+            return self.points.summarize(lo, hi, inviter_uid)
+
+        inner_lo = bisect_left(keys, first_day * DAY_US, lo, hi) if first_day is not None else lo
+        inner_hi = bisect_left(keys, (last_day + 1) * DAY_US, lo, hi) if last_day is not None else hi
+        return _merge_summaries(
+            self.points.summarize(lo, inner_lo, inviter_uid),
+            self.daily.range_sum(first_day, last_day, inviter_code),
+            self.points.summarize(inner_hi, hi, inviter_uid),
+        )
+
+
+def _merge_summaries(*summaries: Dict[str, int]) -> Dict[str, int]:
+    merged = _summary(0, 0, 0)
+    for summary in summaries:
+        for key in merged:
+            merged[key] += summary[key]
+    return merged
+
+
+def _compacted(kind: str, items: List[Any]) -> List[Any]:
+    """Itens do export como registros compactos (os já convertidos na leitura passam direto)."""
+    return [item if isinstance(item, Record) else compact(kind, item) for item in items]
+
+
+def _timed(records: List[Record]) -> List[Tuple[int, Record]]:
+    timed: List[Tuple[int, Record]] = []
+    for record in records:
+        created_at = _parsed_created_at(record)
+        if created_at is not None:
+            timed.append((_to_epoch_us(created_at), record))
+    return timed
+
+
+def _group_by_inviter(
+    by_inviter: Dict[str, Timeline],
+    keys: List[int],
+    items: List[NotificationRecord],
+    copy_on_write: bool = False,
+) -> None:
+    copied = set()
+    for key, notification in zip(keys, items):
+        inviter = notification.inviter_uid
+        if not inviter:
+            continue
+        inviter_timeline = by_inviter.get(inviter)
+        if inviter_timeline is None:
+            inviter_timeline = by_inviter[inviter] = Timeline([], [])
+            copied.add(inviter)
+        elif copy_on_write and inviter not in copied:
+            # Timelines do snapshot anterior continuam em uso; estende uma cópia.
+            inviter_timeline = by_inviter[inviter] = Timeline(list(inviter_timeline.keys), list(inviter_timeline.items))
+            copied.add(inviter)
+        inviter_timeline.keys.append(key)
+        inviter_timeline.items.append(notification)
+
+
+def _points_rows(keys: List[int], items: List[NotificationRecord]) -> Tuple[List[int], List[int], List[str], List[Optional[str]]]:
+    return (
+        keys,
+        [_to_int(notification.points_awarded) for notification in items],
+        [(notification.type or '').lower() for notification in items],
+        [notification.inviter_uid for notification in items],
+    )
+
+
+def _export_positions(items: List[NotificationRecord], notifications: List[NotificationRecord], offset: int = 0) -> List[int]:
+    """Posição de cada item da timeline na lista de notificações (a partir de `offset`)."""
+    position_of = {id(notification): offset + index for index, notification in enumerate(notifications)}
+    return [position_of[id(item)] for item in items]
+
+
+def _merge_users(users: List[UserRecord], delta_users: List[UserRecord]) -> List[UserRecord]:
+    updates = {user.uid: user for user in delta_users if isinstance(user, UserRecord) and user.uid}
+    merged: List[UserRecord] = []
+    for user in users:
+        uid = user.uid if isinstance(user, UserRecord) else None
+        merged.append(updates.pop(uid, user) if uid else user)
+    # O que sobrou em `updates` são usuários novos.
+    merged.extend(updates.values())
+    return merged
+
+
+def _dedupe_tail(timeline: Timeline, notifications: List[NotificationRecord]) -> List[NotificationRecord]:
+    """Remove do delta as notificações já conhecidas no instante da marca d'água (`since` é inclusivo)."""
+    if not timeline.keys:
+        return list(notifications)
+    tail_start = bisect_left(timeline.keys, timeline.keys[-1])
+    seen_ids = {item.id for item in timeline.items[tail_start:] if item.id}
+    return [item for item in notifications if not (isinstance(item, NotificationRecord) and item.id in seen_ids)]
+
+
+def _build_timeline(keyed: List[Tuple[int, Record]]) -> Timeline:
+    # Ordenação estável: empates preservam a ordem do export.
+    keyed.sort(key=lambda pair: pair[0])
+    return Timeline([key for key, _ in keyed], [item for _, item in keyed])
+
+
+_current = Snapshot({})
+_cache_state: Dict[str, Any] = {
+    'etag': None,
+    'last_modified': None,
+    'fetched_at': None,
+}
+_refresh_lock = threading.Lock()
+_breaker = CircuitBreaker()
+
+
+def _is_fresh(ttl: float) -> bool:
+    fetched_at = _cache_state['fetched_at']
+    return fetched_at is not None and time.monotonic() - fetched_at < ttl
+
+
+def _conditional_headers() -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if _cache_state['etag']:
+        headers['If-None-Match'] = _cache_state['etag']
+    if _cache_state['last_modified']:
+        headers['If-Modified-Since'] = _cache_state['last_modified']
+    return headers
+
+
+def _digesting(chunks: Iterable[bytes], digest: Any) -> Iterator[bytes]:
+    """Repassa os pedaços do corpo alimentando `digest`."""
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+def _content_source(headers: Any, body_digest: Any) -> str:
+    """O que identifica um export completo: ETag, Last-Modified ou, sem eles, o hash do corpo.
+
+    Assim uma correção em um registro antigo, que não mexe nos marcadores de
+    `_fingerprint`, ainda muda a versão do snapshot.
+    """
+    if headers.get('ETag'):
+        return 'etag:' + headers['ETag']
+    if headers.get('Last-Modified'):
+        return 'last-modified:' + headers['Last-Modified']
+    return 'body:' + body_digest.hexdigest()
+
+
+def current_snapshot() -> Snapshot:
+    """Retorna o último snapshot publicado, sem acessar a rede."""
+    return _current
+
+
+def get_snapshot() -> Snapshot:
+    """Snapshot que as tools devem ler.
+
+    Com o atualizador em segundo plano ativo e um snapshot já carregado, devolve o
+    atual sem lock e sem I/O; caso contrário delega a `refresh_data()` (com TTL).
+    """
+    if _poller_running() and _cache_state['fetched_at'] is not None:
+        return _current
+    return refresh_data()
+
+
+def snapshot_age_seconds() -> Optional[float]:
+    """Segundos desde a última carga ou revalidação bem-sucedida (None se nunca carregou)."""
+    fetched_at = _cache_state['fetched_at']
+    if fetched_at is None:
+        return None
+    return time.monotonic() - fetched_at
+
+
+metrics.register_gauge(metrics.SNAPSHOT_AGE, snapshot_age_seconds)
+
+
+def warm_up(wait: bool = True) -> bool:
+    """Carrega o primeiro snapshot antes da primeira pergunta, sem propagar falhas.
+
+    Importar os módulos não faz I/O; este é o gancho para antecipar a carga. Com
+    `wait=False` a carga roda em uma thread daemon e a função retorna na hora. Se
+    falhar, a primeira tool tenta de novo via `get_snapshot()`.
+    """
+
+    def load() -> bool:
+        try:
+            refresh_data()
+        except Exception:
+            logger.warning("Falha ao pré-carregar os dados; a primeira consulta tentará de novo", exc_info=True)
+            return False
+        return True
+
+    if wait:
+        return load()
+    threading.Thread(target=load, name="data-store-warm-up", daemon=True).start()
+    return True
+
+
+def refresh_data(force: bool = False, ttl: Optional[float] = None) -> Snapshot:
+    """Busca os dados na API, publica um novo snapshot indexado e o retorna.
+
+    Dentro da janela `ttl` (padrão `DATA_CACHE_TTL`) o snapshot em memória é devolvido
+    sem acessar a rede. Depois disso a API é revalidada com `If-None-Match` /
+    `If-Modified-Since`; uma resposta 304 apenas renova a validade do cache, sem
+    decodificar o JSON novamente. `force=True` ignora o TTL e faz uma carga completa.
+
+    Com `DATA_SYNC_MODE=incremental` e um snapshot já carregado, a requisição leva
+    `since`/`since_id` da notificação mais recente. Se o exportador responder com
+    `"delta": true`, os registros são mesclados ao snapshot atual; caso contrário a
+    resposta é tratada como um export completo. `If-None-Match`/`If-Modified-Since`
+    são enviados nos dois modos.
+
+    Com um snapshot já carregado, a falha de uma revalidação não chega às tools: o
+    último snapshot bom continua sendo servido, quem chega durante uma carga em
+    andamento não espera por ela e, com o circuito aberto (`http_client`), nem tenta
+    a rede. `force=True` sempre tenta e propaga o erro.
+    """
+
+    ttl = DATA_CACHE_TTL if ttl is None else ttl
+    if not force and _is_fresh(ttl):
+        return _current
+
+    if not force and _cache_state['fetched_at'] is not None:
+        if not _refresh_lock.acquire(blocking=False):
+            return _current
+    else:
+        _refresh_lock.acquire()
+    try:
+        return _refresh_locked(force, ttl)
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh_locked(force: bool, ttl: float) -> Snapshot:
+    global _current
+
+    # Outra thread pode ter atualizado o cache enquanto esperávamos o lock.
+    if not force and _is_fresh(ttl):
+        return _current
+
+    has_snapshot = _cache_state['fetched_at'] is not None
+    if not force and not _breaker.allow():
+        if has_snapshot:
+            metrics.inc(metrics.REFRESH_TOTAL, result='circuit_open')
+            return _current
+        raise CircuitOpenError("Exportador de dados indisponível; tente novamente em instantes.")
+
+    loaded = not force and has_snapshot
+    watermark = _current.watermark if loaded and DATA_SYNC_MODE == 'incremental' else None
+    # Os validadores vão junto da marca d'água: um exportador que ignora `since` ainda pode responder 304.
+    headers = _conditional_headers() if loaded else {}
+    started = time.perf_counter()
+    try:
+        with get_session().get(
+            DATA_URL, params=watermark, headers=headers, timeout=DATA_HTTP_TIMEOUT, stream=True
+        ) as response:
+            if response.status_code == 304:
+                # Consumir o corpo (vazio) devolve a conexão ao pool em vez de fechá-la.
+                response.content
+                _breaker.record_success()
+                metrics.observe(metrics.FETCH_DURATION, time.perf_counter() - started)
+                metrics.inc(metrics.REFRESH_TOTAL, result='not_modified')
+                _cache_state['fetched_at'] = time.monotonic()
+                return _current
+            response.raise_for_status()
+            # Lê o corpo em pedaços e decodifica users/notifications item a item.
+            chunks = response.iter_content(chunk_size=_STREAM_CHUNK_SIZE)
+            if metrics.enabled():
+                # Separa a espera pela rede do tempo de decodificação, que se intercalam.
+                chunks = metrics.MeteredChunks(chunks)
+            received = time.perf_counter()
+            body_digest = hashlib.sha1()
+            payload = load_export(_digesting(chunks, body_digest), compact)
+            decoded = time.perf_counter()
+    except Exception:
+        _breaker.record_failure()
+        metrics.inc(metrics.REFRESH_TOTAL, result='error')
+        if has_snapshot and not force:
+            logger.warning("Falha ao atualizar os dados; servindo o último snapshot", exc_info=True)
+            return _current
+        raise
+    _breaker.record_success()
+    if metrics.enabled():
+        metrics.observe(metrics.FETCH_DURATION, received - started + chunks.seconds)
+        metrics.observe(metrics.DECODE_DURATION, decoded - received - chunks.seconds)
+        metrics.observe(metrics.PAYLOAD_BYTES, chunks.bytes)
+
+    if watermark is not None and payload.get('delta') is True:
+        with metrics.timer(metrics.INDEX_DURATION, mode='delta'):
+            snapshot = _current.merged(payload)
+        metrics.inc(metrics.REFRESH_TOTAL, result='delta')
+        # O ETag da resposta parcial não identifica o export completo.
+        _cache_state['etag'] = None
+        _cache_state['last_modified'] = None
+    else:
+        with metrics.timer(metrics.INDEX_DURATION, mode='full'):
+            snapshot = Snapshot(payload, _content_source(response.headers, body_digest))
+        metrics.inc(metrics.REFRESH_TOTAL, result='full')
+        _cache_state['etag'] = response.headers.get('ETag')
+        _cache_state['last_modified'] = response.headers.get('Last-Modified')
+    _current = snapshot
+    # Só depois de publicado: o caminho sem lock de `refresh_data`/`get_snapshot` confia
+    # em `fetched_at` e não pode enxergar o cache como válido ainda com o snapshot anterior.
+    _cache_state['fetched_at'] = time.monotonic()
+    return snapshot
+
+
+_poller: Optional[threading.Thread] = None
+_poller_stop = threading.Event()
+
+
+def _poller_running() -> bool:
+    return _poller is not None and _poller.is_alive()
+
+
+def _poll(interval: float, stop: threading.Event) -> None:
+    while True:
+        try:
+            # ttl=0 revalida a cada ciclo; um 304 custa apenas a requisição condicional.
+            refresh_data(ttl=0)
+        except Exception:
+            logger.exception("Falha ao atualizar o snapshot; mantendo o anterior")
+        if stop.wait(interval):
+            return
+
+
+def start_background_refresh(interval: Optional[float] = None) -> bool:
+    """Inicia (uma única vez por processo) a thread que atualiza o snapshot periodicamente.
+
+    Cada ciclo constrói um snapshot novo fora do caminho das tools e o publica com a
+    troca de referência de `refresh_data()`. Retorna False se o intervalo for 0.
+    """
+
+    global _poller
+
+    interval = DATA_REFRESH_INTERVAL if interval is None else interval
+    if interval <= 0:
+        return False
+    with _refresh_lock:
+        if _poller_running():
+            return True
+        _poller_stop.clear()
+        _poller = threading.Thread(
+            target=_poll,
+            args=(interval, _poller_stop),
+            name="data-store-refresh",
+            daemon=True,
+        )
+        _poller.start()
+    return True
+
+
+def stop_background_refresh(timeout: Optional[float] = None) -> None:
+    """Sinaliza a parada do atualizador em segundo plano e aguarda a thread terminar."""
+    poller = _poller
+    _poller_stop.set()
+    if poller is not None:
+        poller.join(timeout)
@@ -0,0 +1,127 @@
+"""Cliente HTTP compartilhado para as cargas de `DATA_URL`.
+
+Uma única `requests.Session` reaproveita conexões (keep-alive) entre as cargas,
+negocia compressão (`gzip`, e `br`/`zstd` quando houver decodificador instalado) e
+repete a requisição com backoff limitado em falhas de conexão, timeouts e respostas
+5xx. O `CircuitBreaker` evita que um exportador fora do ar atrase cada chamada: depois
+de falhas seguidas, as cargas deixam de ir à rede por um intervalo.
+"""
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+DATA_HTTP_RETRIES = int(os.getenv("DATA_HTTP_RETRIES", "2"))
+DATA_HTTP_BACKOFF = float(os.getenv("DATA_HTTP_BACKOFF", "0.5"))
+# Teto de cada espera entre tentativas (segundos).
+DATA_HTTP_BACKOFF_MAX = float(os.getenv("DATA_HTTP_BACKOFF_MAX", "4"))
+DATA_HTTP_POOL_SIZE = int(os.getenv("DATA_HTTP_POOL_SIZE", "4"))
+# (conexão, leitura) em segundos; a leitura vale para cada pedaço do corpo.
+DATA_HTTP_TIMEOUT: Tuple[float, float] = (
+    float(os.getenv("DATA_HTTP_CONNECT_TIMEOUT", "3.05")),
+    float(os.getenv("DATA_HTTP_READ_TIMEOUT", "10")),
+)
+DATA_BREAKER_FAILURES = int(os.getenv("DATA_BREAKER_FAILURES", "3"))
+DATA_BREAKER_RESET = float(os.getenv("DATA_BREAKER_RESET", "30"))
+
+_RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def _build_session() -> "requests.Session":
+    # Import tardio: `requests`/`urllib3` só são carregados na primeira requisição.
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry, make_headers
+
+    retry = Retry(
+        total=DATA_HTTP_RETRIES,
+        connect=DATA_HTTP_RETRIES,
+        read=DATA_HTTP_RETRIES,
+        status=DATA_HTTP_RETRIES,
+        status_forcelist=_RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=DATA_HTTP_BACKOFF,
+        backoff_max=DATA_HTTP_BACKOFF_MAX,
+        respect_retry_after_header=True,
+        # Esgotadas as tentativas, devolve a última resposta para `raise_for_status`.
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=DATA_HTTP_POOL_SIZE,
+        pool_maxsize=DATA_HTTP_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # Só anuncia os formatos que o urllib3 consegue decodificar neste ambiente.
+    session.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+    return session
+
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """Sessão compartilhada do processo (criada na primeira chamada)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+class CircuitOpenError(RuntimeError):
+    """Carga não tentada: o circuito está aberto após falhas seguidas do exportador."""
+
+
+class CircuitBreaker:
+    """Disjuntor simples: fechado → aberto após `failures` falhas → meio-aberto após `reset`.
+
+    No estado meio-aberto uma única tentativa passa; sucesso fecha o circuito e falha
+    o reabre por mais `reset` segundos.
+    """
+
+    def __init__(self, failures: int = DATA_BREAKER_FAILURES, reset: float = DATA_BREAKER_RESET) -> None:
+        self.failures = failures
+        self.reset = reset
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset else "open"
+
+    def allow(self) -> bool:
+        """Indica se uma carga pode ir à rede agora."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            self._trial = False
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
@@ -0,0 +1,139 @@
+"""Leitura incremental do export JSON de `DATA_URL`.
+
+O objeto raiz é percorrido em pedaços: os arrays `users` e `notifications` são
+decodificados item a item, sem manter os bytes da resposta, o texto completo e a
+árvore JSON em memória ao mesmo tempo.
+"""
+
+import codecs
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+STREAMED_KEYS = ('users', 'notifications')
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789+-.eE'
+# Descarta o prefixo já consumido do buffer quando ele passa deste tamanho.
+_COMPACT_AT = 1 << 16
+
+
+class _ChunkReader:
+    """Buffer de texto alimentado por pedaços de bytes UTF-8."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        if self.pos > _COMPACT_AT:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.buffer += self._decoder.decode(chunk)
+                return True
+        self.buffer += self._decoder.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Próximo caractere significativo (sem consumi-lo), ou '' no fim do conteúdo."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON inválido: esperado '{char}', encontrado '{found or 'EOF'}'")
+        self.pos += 1
+
+    def expect_end(self) -> None:
+        """Como em `json.loads`, nada além de espaços pode seguir o valor raiz."""
+        found = self.peek()
+        if found:
+            raise ValueError(f"JSON inválido: conteúdo após o objeto raiz ('{found}')")
+
+    def value(self) -> Any:
+        """Decodifica o próximo valor JSON completo, lendo mais pedaços se necessário."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Um número no fim do buffer pode estar cortado ("1." de "1.5"): confirma com mais dados.
+            truncated = end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS
+            if truncated and isinstance(value, (int, float)) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_export(chunks: Iterable[bytes]) -> Iterator[Tuple[str, Any, bool]]:
+    """Percorre o objeto raiz do export emitindo `(chave, valor, é_item)`.
+
+    Para as chaves de `STREAMED_KEYS` cujo valor é um array, cada elemento é emitido
+    separadamente com `é_item=True`; as demais chaves são emitidas com o valor inteiro.
+    """
+
+    reader = _ChunkReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.pos += 1
+        reader.expect_end()
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key in STREAMED_KEYS and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.pos += 1
+                yield key, [], False
+            else:
+                while True:
+                    yield key, reader.value(), True
+                    if reader.peek() == ',':
+                        reader.pos += 1
+                        continue
+                    reader.expect(']')
+                    break
+        else:
+            yield key, reader.value(), False
+        if reader.peek() == ',':
+            reader.pos += 1
+            continue
+        reader.expect('}')
+        reader.expect_end()
+        return
+
+
+def load_export(
+    chunks: Iterable[bytes],
+    item_hook: Optional[Callable[[str, Any], Any]] = None,
+) -> Dict[str, Any]:
+    """Monta o payload do export a partir de pedaços de bytes, item a item.
+
+    `item_hook(chave, item)`, quando informado, converte cada item dos arrays em
+    streaming antes de guardá-lo (por exemplo, em um registro compacto).
+    """
+
+    payload: Dict[str, Any] = {}
+    for key, value, is_item in iter_export(chunks):
+        if is_item:
+            payload.setdefault(key, []).append(item_hook(key, value) if item_hook else value)
+        else:
+            payload[key] = value
+    return payload
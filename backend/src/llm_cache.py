@@ -0,0 +1,117 @@
+"""Cache em disco (SQLite) das respostas do LLM usadas nos relatórios.
+
+As entradas são indexadas por um hash de (modelo, temperatura, prompt de sistema,
+relatório bruto) e guardam a versão do snapshot que as gerou: quando o snapshot
+muda, as respostas antigas deixam de ser servidas e são removidas. A versão inclui o
+ETag/Last-Modified ou o hash do export (`Snapshot._fingerprint`), então um export
+corrigido invalida o cache mesmo com as mesmas contagens e datas.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional
+
+_DEFAULT_PATH = Path(__file__).resolve().parents[1] / ".cache" / "llm_responses.sqlite3"
+# Caminho do arquivo do cache; vazio desliga o cache.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(_DEFAULT_PATH))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+def cache_key(model: str, temperature: float, system_prompt: str, report: str) -> str:
+    """Hash estável dos parâmetros que determinam a resposta do LLM."""
+    material = json.dumps([model, temperature, system_prompt, report], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Cache LRU limitado por número de entradas, com expiração por TTL."""
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl: float = LLM_CACHE_TTL,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key: str, version: str) -> Optional[str]:
+        """Resposta guardada para `key`, se ainda válida para a versão do snapshot."""
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM responses WHERE version != ?", (version,))
+            row = connection.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, created_at = row
+            if now - created_at > self.ttl:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return content
+
+    def set(self, key: str, version: str, content: str) -> None:
+        """Guarda a resposta e descarta as menos usadas recentemente além do limite."""
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM responses WHERE version != ?", (version,))
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, version, content, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, version, content, now, now),
+            )
+            connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM responses")
+
+
+_default_cache: Optional[LLMResponseCache] = None
+
+
+def default_cache() -> Optional[LLMResponseCache]:
+    """Cache configurado por `LLM_CACHE_PATH` (None quando desligado)."""
+    global _default_cache
+    if not LLM_CACHE_PATH:
+        return None
+    if _default_cache is None:
+        _default_cache = LLMResponseCache(LLM_CACHE_PATH)
+    return _default_cache
@@ -0,0 +1,77 @@
+"""Clientes de chat compartilhados pelo processo.
+
+Um `ChatOpenAI` guarda seu próprio pool HTTP; criar um por relatório ou por sessão do
+Streamlit multiplica conexões e memória. Aqui cada combinação de parâmetros vira um
+único cliente, reutilizado por todas as threads (o cliente é seguro entre threads e
+não guarda estado de conversa). `RateLimiter` espaça as chamadas quando várias threads
+usam a API ao mesmo tempo (relatórios em lote).
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from metrics import llm_callbacks
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+_clients: Dict[Tuple[Any, ...], "ChatOpenAI"] = {}
+_lock = threading.Lock()
+
+
+def shared_chat_model(
+    model: str,
+    temperature: float,
+    component: Optional[str] = None,
+    **options: Any,
+) -> "ChatOpenAI":
+    """Cliente compartilhado para `(model, temperature, component, options)`.
+
+    `component`, quando informado, registra as métricas de LLM com esse rótulo
+    (ver `metrics.llm_callbacks`). `options` vai direto ao `ChatOpenAI` e precisa
+    ter valores hasheáveis.
+    """
+
+    key = (model, temperature, component, tuple(sorted(options.items())))
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                # Import tardio: `langchain_openai` (e o SDK da OpenAI) custa quase um segundo.
+                from langchain_openai import ChatOpenAI
+
+                callbacks = llm_callbacks(component) if component else []
+                client = _clients[key] = ChatOpenAI(
+                    model=model, temperature=temperature, callbacks=callbacks or None, **options
+                )
+    return client
+
+
+class RateLimiter:
+    """Balde de fichas: no máximo `per_minute` chamadas por minuto, com rajada de `burst`.
+
+    `acquire()` bloqueia a thread até haver uma ficha. Seguro entre threads.
+    """
+
+    def __init__(self, per_minute: float, burst: int = 1) -> None:
+        if per_minute <= 0:
+            raise ValueError("per_minute deve ser positivo")
+        self.interval = 60.0 / per_minute
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.interval
+            time.sleep(wait)
@@ -1,26 +1,61 @@
 """Página Streamlit para conversar com o agente e gerar relatórios."""
 
+import asyncio
 from datetime import date
 from typing import List
 
 import streamlit as st
 from langchain_core.messages import HumanMessage, AIMessage
 
-from chatagent import criar_agent, refresh_data
+from chat_memory import ChatMemory
+from chatagent import criar_agent
+from data_store import refresh_data, snapshot_age_seconds, start_background_refresh, warm_up
+import metrics
 from relatorio_agent import generate_report
+from streaming import AgentStreamHandler
+from tool_memo import memo_stats
 
 
 st.set_page_config(page_title="Assistente de Indicações", page_icon="🤖", layout="wide")
 
-if "agent" not in st.session_state:
-    st.session_state.agent = criar_agent()
+
+@st.cache_resource
+def _start_shared_services() -> None:
+    """Serviços de fundo do processo, iniciados uma única vez para todas as sessões."""
+    # Os imports não fazem I/O: a primeira carga roda em segundo plano enquanto a página abre.
+    warm_up(wait=False)
+    # Com DATA_REFRESH_INTERVAL > 0, os dados são atualizados fora do caminho das perguntas.
+    start_background_refresh()
+    # Com METRICS_ENABLED=1 e METRICS_PORT definido, expõe /metrics (Prometheus) e /metrics.json.
+    metrics.start_metrics_server()
+
+
+@st.cache_resource
+def _shared_agent():
+    """Agente único do processo: tools, prompt e cliente LLM não guardam estado de conversa.
+
+    O histórico vai em cada chamada (`chat_history`), então as sessões compartilham o
+    mesmo `AgentExecutor` e só o histórico fica em `st.session_state`.
+    """
+    return criar_agent()
+
+
+_start_shared_services()
+agent = _shared_agent()
 
 if "chat_history" not in st.session_state:
+    # Transcrição completa, só para exibição; o agente recebe `chat_memory.messages()`.
     st.session_state.chat_history: List = []
 
+if "chat_memory" not in st.session_state:
+    st.session_state.chat_memory = ChatMemory()
+
 if "report_result" not in st.session_state:
     st.session_state.report_result = None
 
+if "report_request" not in st.session_state:
+    st.session_state.report_request = None
+
 st.title("Assistente do Programa de Indicações")
 st.caption("Converse em português ou gere relatórios analíticos.")
 
@@ -29,10 +64,19 @@ _today = date.today()
 _default_start = _today.replace(day=1)
 
 if st.sidebar.button("Recarregar dados", use_container_width=True):
-    with st.spinner("Recarregando dados..."):
-        refresh_data()
+    try:
+        with st.spinner("Recarregando dados..."):
+            refresh_data(force=True)
+    except Exception as exc:
+        # As perguntas seguem usando o último snapshot carregado.
+        st.sidebar.error(f"Não foi possível recarregar os dados: {exc}")
+    else:
         st.session_state.report_result = None
-    st.sidebar.success("Dados atualizados!")
+        st.sidebar.success("Dados atualizados!")
+
+_snapshot_age = snapshot_age_seconds()
+if _snapshot_age is not None:
+    st.sidebar.caption(f"Snapshot atualizado há {_snapshot_age:.0f} s")
 
 start_date = st.sidebar.date_input("Data inicial", value=_default_start)
 end_date = st.sidebar.date_input("Data final", value=_today)
@@ -41,9 +85,9 @@ if start_date > end_date:
     st.sidebar.error("A data inicial deve ser anterior ou igual à data final.")
 
 if st.sidebar.button("Gerar relatório", use_container_width=True) and start_date <= end_date:
-    with st.spinner("Gerando relatório..."):
-        st.session_state.report_result = generate_report(start_date.isoformat(), end_date.isoformat())
-    st.sidebar.success("Relatório gerado!")
+    # O texto é gerado na aba de relatórios, que exibe a análise enquanto o LLM escreve.
+    st.session_state.report_request = (start_date.isoformat(), end_date.isoformat())
+    st.sidebar.info("Gerando relatório... acompanhe na aba Relatórios.")
 
 if st.session_state.report_result:
     report_content = st.session_state.report_result["content"]
@@ -75,24 +119,101 @@ with aba_chat:
 
         st.session_state.chat_history.append(HumanMessage(content=prompt))
 
-        response = st.session_state.agent.invoke(
-            {"input": prompt, "chat_history": st.session_state.chat_history}
-        )
-        output_text = response.get("output") if isinstance(response, dict) else str(response)
-
         with st.chat_message("assistant"):
-            st.markdown(output_text)
+            progress = st.container()
+            answer = st.empty()
+            streamed: List[str] = []
+
+            def _on_token(token: str) -> None:
+                streamed.append(token)
+                answer.markdown("".join(streamed) + "▌")
+
+            def _on_tool_start(name: str, tool_input: str) -> None:
+                # Texto emitido antes de uma chamada de tool não faz parte da resposta final.
+                streamed.clear()
+                answer.empty()
+                progress.caption(f"Consultando `{name}`...")
+
+            # `ainvoke` executa as tools de um mesmo passo em paralelo (ver `async_tools.py`).
+            response = asyncio.run(agent.ainvoke(
+                {"input": prompt, "chat_history": st.session_state.chat_memory.messages()},
+                config={"callbacks": [AgentStreamHandler(_on_token, _on_tool_start)]},
+            ))
+            output_text = response.get("output") if isinstance(response, dict) else str(response)
+            answer.markdown(output_text)
 
         st.session_state.chat_history.append(AIMessage(content=output_text))
+        st.session_state.chat_memory.add_turn(prompt, output_text or "")
 
 with aba_relatorios:
-    if st.session_state.report_result:
+    if st.session_state.report_request:
+        inicio, fim = st.session_state.report_request
+        st.session_state.report_request = None
+
+        st.subheader("Gerando relatório")
+        st.markdown(f"**Período:** {inicio} — {fim}")
+        report_placeholder = st.empty()
+        report_parts: List[str] = []
+
+        def _on_report_token(token: str) -> None:
+            report_parts.append(token)
+            report_placeholder.markdown("".join(report_parts) + "▌")
+
+        st.session_state.report_result = generate_report(inicio, fim, on_token=_on_report_token)
+        # Nova execução para exibir o relatório final e habilitar o download na barra lateral.
+        st.rerun()
+    elif st.session_state.report_result:
         metadata = st.session_state.report_result.get("metadata", {})
         inicio = metadata.get("start") or "Início"
         fim = metadata.get("end") or "Atual"
 
         st.subheader("Relatório mais recente")
         st.markdown(f"**Período:** {inicio} — {fim}")
+        if metadata.get("prompt_tokens") is not None:
+            st.caption(
+                f"Material enviado ao LLM: {metadata['prompt_tokens']} tokens "
+                f"({metadata.get('tokens_saved', 0)} a menos que o JSON completo)"
+            )
         st.markdown(st.session_state.report_result["content"], unsafe_allow_html=False)
     else:
         st.info("Use os controles na barra lateral para gerar um relatório de indicações.")
+
+
+def _metrics_rows(summary):
+    rows = []
+    for name, series in summary["histograms"].items():
+        # Durações em ms; demais histogramas (bytes) na unidade original.
+        scale, unit = (1000, "ms") if name.endswith("_seconds") else (1, "")
+        for item in series:
+            rows.append({
+                "métrica": name.removeprefix("mgm_"),
+                "labels": ", ".join(f"{k}={v}" for k, v in item["labels"].items()),
+                "n": item["count"],
+                "média": round(item["mean"] * scale, 2),
+                "p95": round(item["p95"] * scale, 2),
+                "unidade": unit,
+            })
+    return rows
+
+
+if metrics.enabled():
+    with st.sidebar.expander("Métricas (debug)"):
+        summary = metrics.to_json()
+        st.dataframe(_metrics_rows(summary), hide_index=True, use_container_width=True)
+        memo = memo_stats()
+        if memo["hit_rate"] is not None:
+            st.caption(
+                f"Memo das tools: {memo['hit_rate']:.0%} de acertos "
+                f"({memo['hits']}/{memo['hits'] + memo['misses']}, {memo['entries']} entradas)"
+            )
+        for name, series in summary["counters"].items():
+            for item in series:
+                labels = ", ".join(f"{k}={v}" for k, v in item["labels"].items())
+                st.caption(f"{name.removeprefix('mgm_')} [{labels}]: {item['value']:.0f}")
+        st.download_button(
+            "Exportar (Prometheus)",
+            data=metrics.to_prometheus().encode("utf-8"),
+            file_name="metrics.prom",
+            mime="text/plain",
+            use_container_width=True,
+        )
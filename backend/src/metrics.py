@@ -0,0 +1,366 @@
+"""Métricas de latência e volume do backend (tools, carga de dados e chamadas ao LLM).
+
+Ligadas com `METRICS_ENABLED=1`. Desligadas (padrão), `instrument_tool` devolve a
+própria função, `llm_callbacks` devolve uma lista vazia e as demais funções retornam
+na primeira linha: não há custo mensurável no caminho das tools.
+
+Os valores ficam em memória no processo e podem ser exportados no formato texto do
+Prometheus (`to_prometheus`) ou como JSON (`to_json`); `start_metrics_server` expõe os
+dois em `/metrics` e `/metrics.json`.
+"""
+
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in {"1", "true", "yes", "on"}
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+TOOL_DURATION = "mgm_tool_duration_seconds"
+FETCH_DURATION = "mgm_data_fetch_duration_seconds"
+DECODE_DURATION = "mgm_data_decode_duration_seconds"
+INDEX_DURATION = "mgm_data_index_duration_seconds"
+PAYLOAD_BYTES = "mgm_data_payload_bytes"
+REFRESH_TOTAL = "mgm_data_refresh_total"
+LLM_DURATION = "mgm_llm_duration_seconds"
+LLM_TOKENS = "mgm_llm_tokens_total"
+SNAPSHOT_AGE = "mgm_snapshot_age_seconds"
+TOOL_CACHE_TOTAL = "mgm_tool_cache_total"
+
+_HELP = {
+    TOOL_DURATION: "Duração de cada chamada de tool do agente.",
+    FETCH_DURATION: "Tempo de rede da carga de dados (cabeçalhos + leitura do corpo).",
+    DECODE_DURATION: "Tempo de decodificação do JSON da carga de dados.",
+    INDEX_DURATION: "Tempo de montagem/mescla do snapshot indexado.",
+    PAYLOAD_BYTES: "Tamanho do corpo recebido em cada carga de dados.",
+    REFRESH_TOTAL: "Revalidações de dados por resultado (full, delta, not_modified, error, circuit_open).",
+    LLM_DURATION: "Latência das chamadas ao LLM por componente.",
+    LLM_TOKENS: "Tokens consumidos nas chamadas ao LLM por componente e tipo.",
+    SNAPSHOT_AGE: "Segundos desde a última carga/revalidação do snapshot.",
+    TOOL_CACHE_TOTAL: "Consultas ao memo de resultados das tools por tool e resultado (hit, miss).",
+}
+
+_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_BYTES_BUCKETS = tuple(1024 * 4 ** power for power in range(11))  # 1 KiB … 1 GiB
+_BUCKETS = {PAYLOAD_BYTES: _BYTES_BUCKETS}
+
+Labels = Tuple[Tuple[str, str], ...]
+logger = logging.getLogger(__name__)
+
+
+class _Histogram:
+    """Contagens por faixa (cumulativas só na exportação), soma e total."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimativa por interpolação linear dentro da faixa, como o `histogram_quantile`."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+
+_lock = threading.Lock()
+_histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+_counters: Dict[str, Dict[Labels, float]] = {}
+_gauges: Dict[str, Callable[[], Optional[float]]] = {}
+
+
+def enabled() -> bool:
+    return METRICS_ENABLED
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Registra `value` no histograma `name` para o conjunto de labels."""
+    if not METRICS_ENABLED:
+        return
+    key = _labels(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = _Histogram(_BUCKETS.get(name, _SECONDS_BUCKETS))
+        histogram.observe(value)
+
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    if not METRICS_ENABLED:
+        return
+    key = _labels(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def register_gauge(name: str, read: Callable[[], Optional[float]]) -> None:
+    """Gauge lido na hora da exportação (por exemplo, a idade do snapshot)."""
+    _gauges[name] = read
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name: str, labels: Dict[str, Any]) -> None:
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timer(name: str, **labels: Any):
+    """Context manager que observa a duração do bloco em segundos."""
+    return _Timer(name, labels) if METRICS_ENABLED else _NOOP_TIMER
+
+
+def instrument_tool(func: Callable) -> Callable:
+    """Mede cada chamada da função em `TOOL_DURATION` (aplicar abaixo do `@tool`)."""
+    if not METRICS_ENABLED:
+        return func
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with _Timer(TOOL_DURATION, {"tool": func.__name__}):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class MeteredChunks:
+    """Repassa os pedaços de uma resposta somando bytes e o tempo de espera da rede."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        started = time.perf_counter()
+        try:
+            chunk = next(self._chunks)
+        finally:
+            self.seconds += time.perf_counter() - started
+        self.bytes += len(chunk)
+        return chunk
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Callback do LangChain que mede latência e tokens de cada chamada ao LLM."""
+
+    def __init__(self, component: str) -> None:
+        self.component = component
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            observe(LLM_DURATION, time.perf_counter() - started, component=self.component)
+        for kind, tokens in _token_usage(response).items():
+            inc(LLM_TOKENS, tokens, component=self.component, kind=kind)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+
+def _token_usage(response: Any) -> Dict[str, int]:
+    """Tokens de entrada/saída de um `LLMResult` (metadados da mensagem ou `llm_output`)."""
+    usage = {"prompt": 0, "completion": 0}
+    for generations in getattr(response, "generations", []) or []:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                usage["prompt"] += metadata.get("input_tokens", 0)
+                usage["completion"] += metadata.get("output_tokens", 0)
+    if not any(usage.values()):
+        token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        usage["prompt"] = token_usage.get("prompt_tokens", 0)
+        usage["completion"] = token_usage.get("completion_tokens", 0)
+    return {kind: tokens for kind, tokens in usage.items() if tokens}
+
+
+def llm_callbacks(component: str) -> List[BaseCallbackHandler]:
+    """Callbacks para o construtor de um modelo de chat (vazio quando desligado)."""
+    return [LLMMetricsHandler(component)] if METRICS_ENABLED else []
+
+
+def llm_config(component: str) -> Optional[Dict[str, Any]]:
+    """`config` para `invoke`/`stream` de um modelo já criado (None quando desligado)."""
+    return {"callbacks": [LLMMetricsHandler(component)]} if METRICS_ENABLED else None
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in pairs) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    """Escapa `\\`, `"` e quebras de linha do valor, como pede o formato de texto do Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _read_gauges() -> Dict[str, float]:
+    values = {}
+    for name, read in _gauges.items():
+        try:
+            value = read()
+        except Exception:  # um gauge com defeito não derruba a exportação
+            logger.exception("Falha ao ler o gauge %s", name)
+            continue
+        if value is not None:
+            values[name] = float(value)
+    return values
+
+
+def to_prometheus() -> str:
+    """Todas as métricas no formato texto de exposição do Prometheus."""
+
+    lines: List[str] = []
+    with _lock:
+        for name, series in sorted(_histograms.items()):
+            lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} histogram"]
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum!r}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for name, series in sorted(_counters.items()):
+            lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} counter"]
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value!r}")
+    for name, value in sorted(_read_gauges().items()):
+        lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} gauge", f"{name} {value!r}"]
+    return "\n".join(lines) + "\n"
+
+
+def to_json() -> Dict[str, Any]:
+    """Resumo das métricas: histogramas com contagem, média e quantis estimados."""
+
+    with _lock:
+        histograms = {
+            name: [
+                {
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count if histogram.count else None,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                }
+                for labels, histogram in sorted(series.items())
+            ]
+            for name, series in sorted(_histograms.items())
+        }
+        counters = {
+            name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+            for name, series in sorted(_counters.items())
+        }
+    return {"enabled": METRICS_ENABLED, "histograms": histograms, "counters": counters, "gauges": _read_gauges()}
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - nome exigido pelo http.server
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(to_json()).encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = to_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return None
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """Expõe `/metrics` e `/metrics.json` em uma thread (uma vez por processo).
+
+    Não faz nada com as métricas desligadas ou sem porta (`METRICS_PORT=0`).
+    """
+
+    global _server
+    port = METRICS_PORT if port is None else port
+    if not METRICS_ENABLED or not port:
+        return None
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
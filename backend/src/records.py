@@ -0,0 +1,134 @@
+"""Registros compactos de usuários e notificações do snapshot.
+
+Cada item de `users`/`notifications` vira um objeto com `__slots__` que guarda só os
+campos lidos pelas tools e pelo relatório (`password_hash`, por exemplo, é descartado
+na leitura). Um dicionário decodificado do JSON custa algumas centenas de bytes por
+registro, fora os valores; um registro com slots custa 8 bytes por campo mais o
+cabeçalho do objeto. Valores que se repetem entre muitos registros (`type`,
+`inviter_uid`, `inviter_code`, `invited_by_code`) são internados e compartilhados,
+assim como os nomes: o `invited_name` de uma notificação reaproveita o `name` do
+usuário convidado.
+
+Os registros são lidos como dicionários (`get`, `[]`, `in`) e por atributo; um campo
+ausente no export vale `None`. `to_dict()` devolve o dicionário para serialização.
+Como o snapshot, são tratados como imutáveis depois de criados.
+"""
+
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if value.__class__ is str else value
+
+
+class Record:
+    """Base dos registros: campos em `__slots__`, com leitura no estilo de `dict`."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Record':
+        # Os campos são passados na ordem de `__slots__`, a mesma do `__init__` de cada tipo.
+        return cls(*map(data.get, cls.__slots__))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class UserRecord(Record):
+    __slots__ = (
+        'uid',
+        'name',
+        'email',
+        'my_code',
+        'points_total',
+        'invited_by_code',
+        'created_at',
+        'updated_at',
+    )
+
+    def __init__(
+        self,
+        uid: Any = None,
+        name: Any = None,
+        email: Any = None,
+        my_code: Any = None,
+        points_total: Any = None,
+        invited_by_code: Any = None,
+        created_at: Any = None,
+        updated_at: Any = None,
+    ) -> None:
+        self.uid = uid
+        self.name = _intern(name)
+        self.email = email
+        self.my_code = my_code
+        self.points_total = points_total
+        self.invited_by_code = _intern(invited_by_code)
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+class NotificationRecord(Record):
+    __slots__ = (
+        'id',
+        'inviter_uid',
+        'inviter_code',
+        'invited_name',
+        'points_awarded',
+        'type',
+        'created_at',
+    )
+
+    def __init__(
+        self,
+        id: Any = None,
+        inviter_uid: Any = None,
+        inviter_code: Any = None,
+        invited_name: Any = None,
+        points_awarded: Any = None,
+        type: Any = None,
+        created_at: Any = None,
+    ) -> None:
+        self.id = id
+        self.inviter_uid = _intern(inviter_uid)
+        self.inviter_code = _intern(inviter_code)
+        self.invited_name = _intern(invited_name)
+        self.points_awarded = points_awarded
+        self.type = _intern(type)
+        self.created_at = created_at
+
+
+RECORD_TYPES = {'users': UserRecord, 'notifications': NotificationRecord}
+
+
+def compact(kind: str, item: Any) -> Any:
+    """Converte um item de `users`/`notifications` no registro correspondente.
+
+    Registros já convertidos e itens que não são objetos JSON passam inalterados.
+    """
+    record_type = RECORD_TYPES.get(kind)
+    if record_type is None or not isinstance(item, dict):
+        return item
+    return record_type.from_dict(item)
@@ -0,0 +1,201 @@
+"""Grafo de indicações do snapshot (`invited_by_code` → `my_code`).
+
+Construído uma vez por carga, junto dos demais índices de usuários: cada usuário é um
+nó identificado pela sua posição em `users`, com o pai (quem o convidou), os filhos em
+listas de adjacência compactas (estilo CSR), a profundidade a partir da raiz da sua
+rede e o tamanho total da rede abaixo dele. Uma ordem de largura a partir das raízes
+serve de ordem topológica: percorrida ao contrário, soma as redes de baixo para cima
+em uma única passada.
+
+Códigos de convite que não existem (`dangling`) tornam o usuário raiz. Ciclos
+(incluindo quem se convidou) são quebrados no primeiro usuário do ciclo encontrado,
+que também vira raiz; os dois casos são contados em `stats()`.
+"""
+
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+from records import UserRecord
+
+
+class ReferralGraph:
+    """Árvores de indicação com profundidade e tamanho de rede precomputados.
+
+    `depths`, `sizes` (rede abaixo do usuário), `heights` (níveis abaixo dele) e
+    `direct_count` são O(1) por usuário; `levels` e `upline` percorrem só a rede ou a
+    cadeia pedida. `largest(limit)` lê um ranking ordenado na construção.
+    """
+
+    def __init__(self, users: Sequence[Any], users_by_code: Dict[str, Any]) -> None:
+        self.users = users
+        count = len(users)
+        self.positions: Dict[str, int] = {}
+        for position, user in enumerate(users):
+            if isinstance(user, UserRecord) and user.uid:
+                self.positions.setdefault(user.uid, position)
+        # `users_by_code` guarda registros; o grafo trabalha com posições.
+        position_of = {id(user): position for position, user in enumerate(users)}
+
+        parents = array('i', [-1]) * count
+        self.dangling = 0
+        for position, user in enumerate(users):
+            code = user.invited_by_code if isinstance(user, UserRecord) else None
+            if not code:
+                continue
+            inviter = users_by_code.get(code)
+            if inviter is None:
+                self.dangling += 1
+                continue
+            parents[position] = position_of[id(inviter)]
+
+        self.cycles = self._break_cycles(parents)
+        self.parents = parents
+
+        # Filhos em CSR: os de `position` ficam em children[starts[position]:starts[position + 1]].
+        starts = array('i', [0]) * (count + 1)
+        for parent in parents:
+            if parent >= 0:
+                starts[parent + 1] += 1
+        for position in range(count):
+            starts[position + 1] += starts[position]
+        children = array('i', [0]) * starts[count]
+        filled = array('i', starts[:count])
+        for position, parent in enumerate(parents):
+            if parent >= 0:
+                children[filled[parent]] = position
+                filled[parent] += 1
+        self._starts, self._children = starts, children
+
+        # Ordem de largura a partir das raízes: pais sempre antes dos filhos.
+        depths = array('i', [0]) * count
+        order = array('i', (position for position in range(count) if parents[position] < 0))
+        index = 0
+        while index < len(order):
+            node = order[index]
+            index += 1
+            child_depth = depths[node] + 1
+            for child in children[starts[node]:starts[node + 1]]:
+                depths[child] = child_depth
+                order.append(child)
+        self.depths = depths
+
+        # De baixo para cima: tamanho da rede e número de níveis abaixo de cada usuário.
+        sizes = array('i', [0]) * count
+        heights = array('i', [0]) * count
+        for node in reversed(order):
+            parent = parents[node]
+            if parent >= 0:
+                sizes[parent] += sizes[node] + 1
+                if heights[node] + 1 > heights[parent]:
+                    heights[parent] = heights[node] + 1
+        self.sizes, self.heights = sizes, heights
+        self._ranking = array('i', sorted(range(count), key=sizes.__getitem__, reverse=True))
+
+        self.depth_counts: List[int] = [0] * (max(depths, default=-1) + 1)
+        for depth in depths:
+            self.depth_counts[depth] += 1
+
+    @staticmethod
+    def _break_cycles(parents: array) -> int:
+        """Corta um elo de cada ciclo de `parents` (in place) e devolve quantos havia.
+
+        Cada usuário é visitado uma vez: o caminho de um usuário ainda não resolvido
+        sobe pelos pais até uma raiz, um usuário já resolvido ou um usuário do próprio
+        caminho (ciclo).
+        """
+        count = len(parents)
+        state = bytearray(count)  # 0 = novo, 1 = no caminho atual, 2 = resolvido
+        cycles = 0
+        for start in range(count):
+            path = []
+            node = start
+            while node >= 0 and state[node] == 0:
+                state[node] = 1
+                path.append(node)
+                node = parents[node]
+            if node >= 0 and state[node] == 1:
+                parents[node] = -1
+                cycles += 1
+            for visited in path:
+                state[visited] = 2
+        return cycles
+
+    def position(self, uid: str) -> Optional[int]:
+        return self.positions.get(uid)
+
+    def direct_count(self, position: int) -> int:
+        return self._starts[position + 1] - self._starts[position]
+
+    def children(self, position: int) -> List[int]:
+        return self._children[self._starts[position]:self._starts[position + 1]].tolist()
+
+    def upline(self, position: int) -> List[int]:
+        """Quem convidou o usuário, quem convidou este, e assim por diante até a raiz."""
+        chain: List[int] = []
+        parent = self.parents[position]
+        while parent >= 0:
+            chain.append(parent)
+            parent = self.parents[parent]
+        return chain
+
+    def levels(self, position: int, max_depth: Optional[int] = None) -> List[List[int]]:
+        """Rede abaixo do usuário agrupada por nível (1 = convidados diretos)."""
+        levels: List[List[int]] = []
+        frontier = [position]
+        while frontier and (max_depth is None or len(levels) < max_depth):
+            next_level: List[int] = []
+            for node in frontier:
+                next_level.extend(self._children[self._starts[node]:self._starts[node + 1]])
+            if not next_level:
+                break
+            levels.append(next_level)
+            frontier = next_level
+        return levels
+
+    def largest(self, limit: int) -> List[int]:
+        """Posições dos `limit` usuários com as maiores redes (empates na ordem de `users`)."""
+        return self._ranking[:limit].tolist()
+
+    def depth_breakdown(self, conversions_by_uid: Dict[str, int], new_users: Sequence[Any] = ()) -> List[Dict[str, int]]:
+        """Por nível da rede: usuários, novos usuários e conversões dos convidadores do nível.
+
+        `conversions_by_uid` vem de `Snapshot.points.scan` (conversões por convidador na
+        janela) e `new_users` são os usuários cadastrados na janela.
+        """
+        rows = [{'depth': depth, 'users': users, 'new_users': 0, 'conversions': 0} for depth, users in enumerate(self.depth_counts)]
+        for uid, conversions in conversions_by_uid.items():
+            position = self.positions.get(uid)
+            if position is not None:
+                rows[self.depths[position]]['conversions'] += conversions
+        for user in new_users:
+            position = self.positions.get(user.uid) if isinstance(user, UserRecord) else None
+            if position is not None:
+                rows[self.depths[position]]['new_users'] += 1
+        return rows
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'users': len(self.depths),
+            'roots': self.depth_counts[0] if self.depth_counts else 0,
+            'max_depth': len(self.depth_counts) - 1,
+            'dangling_codes': self.dangling,
+            'cycles_broken': self.cycles,
+        }
+
+
+def top_networks(graph: ReferralGraph, limit: int) -> List[Dict[str, Any]]:
+    """Os usuários com as maiores redes (todos os níveis abaixo deles)."""
+    ranked: List[Dict[str, Any]] = []
+    for position in graph.largest(limit):
+        if graph.sizes[position] == 0:
+            break
+        user = graph.users[position]
+        ranked.append({
+            'uid': user.uid,
+            'name': user.name,
+            'my_code': user.my_code,
+            'downline_size': graph.sizes[position],
+            'direct_invites': graph.direct_count(position),
+            'levels': graph.heights[position],
+        })
+    return ranked
@@ -1,25 +1,23 @@
-from datetime import datetime, timezone, timedelta
-import json
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 
 import dotenv
-import os
 
-from chatagent import _parse_iso8601, _apply_date_window, _to_int, refresh_data, users, notifications
+from data_store import Snapshot, _parse_iso8601, get_snapshot
+from llm_cache import cache_key, default_cache
+from llm_clients import RateLimiter, shared_chat_model
+from metrics import llm_config
+from report_engine import aggregate_period
+from report_prompt import build_report_prompt, compact_json
 
 dotenv.load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
 
-def analise_content(report: str) -> str:
-    """Analisa o conteúdo do relatório e gera uma análise narrativa junto dos dados."""
-    
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
-    
-    system_prompt = """Você é um analista de negócios.
+REPORT_MODEL = "gpt-4o-mini"
+REPORT_TEMPERATURE = 0.2
+SYSTEM_PROMPT = """Você é um analista de negócios.
     Você ajuda na informação do produto: Aplicativo Member-Get-Member gamificado, onde usuários convidam novos participantes por código. Cada conversão gera pontos e, após certo número de indicações, recebem bônus. O sistema registra novos usuários e notificações de indicações.    
     Sua tarefa é receber um relatório bruto (com métricas e dados JSON retirados da plataforma)
     e transformá-lo em um texto estruturado, com:
@@ -31,6 +29,71 @@ def analise_content(report: str) -> str:
 
     Use linguagem clara e objetiva. Explique os números.
     """
+CHUNK_SYSTEM_PROMPT = """Você resume blocos de notificações de um programa de indicações.
+    Cada linha do CSV recebido é uma notificação (data, tipo, código do convidador, nome do convidado, pontos).
+    Responda em PT-BR, em no máximo 10 linhas, com totais por tipo, convidadores mais ativos,
+    picos ou quedas de atividade e qualquer padrão incomum. Não repita as linhas.
+    """
+# Usuários em risco de churn listados no prompt; o total vem sempre completo.
+REPORT_CHURN_SAMPLE = 25
+# Coortes de cadastro no prompt: as mais recentes, que são as que o período descreve.
+REPORT_COHORT_ROWS = 12
+
+
+def _summarize_chunk(
+    chunk: str,
+    snapshot_version: str,
+    llm: Optional[Any] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> str:
+    """Resumo de um bloco de notificações (etapa map do relatório), com cache em disco."""
+
+    cache = default_cache()
+    key = cache_key(REPORT_MODEL, REPORT_TEMPERATURE, CHUNK_SYSTEM_PROMPT, chunk)
+    if cache is not None:
+        cached = cache.get(key, snapshot_version)
+        if cached is not None:
+            return cached
+
+    if llm is None:
+        llm = shared_chat_model(REPORT_MODEL, REPORT_TEMPERATURE, stream_usage=True)
+    if limiter is not None:
+        limiter.acquire()
+    response = llm.invoke(
+        [SystemMessage(content=CHUNK_SYSTEM_PROMPT), HumanMessage(content=chunk)],
+        config=llm_config("report_chunk"),
+    )
+    if cache is not None:
+        cache.set(key, snapshot_version, response.content)
+    return response.content
+
+
+def stream_analise_content(
+    report: str,
+    snapshot_version: Optional[str] = None,
+    llm: Optional[Any] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> Iterator[str]:
+    """Gera a análise narrativa do relatório em pedaços, à medida que o LLM responde.
+
+    Com `snapshot_version`, a resposta é buscada/guardada no cache em disco
+    (`llm_cache.py`): o mesmo relatório sobre os mesmos dados não chama o LLM de novo
+    e o texto guardado é emitido de uma vez. `llm` permite injetar outro modelo de
+    chat (por exemplo, um stub offline); `limiter` espaça as chamadas que vão à API.
+    """
+
+    cache = default_cache() if snapshot_version else None
+    key = cache_key(REPORT_MODEL, REPORT_TEMPERATURE, SYSTEM_PROMPT, report)
+    if cache is not None:
+        cached = cache.get(key, snapshot_version)
+        if cached is not None:
+            yield cached
+            return
+
+    if llm is None:
+        llm = shared_chat_model(REPORT_MODEL, REPORT_TEMPERATURE, stream_usage=True)
+    if limiter is not None:
+        limiter.acquire()
 
     human_prompt = f"""Aqui está o relatório bruto:
 
@@ -39,173 +102,132 @@ def analise_content(report: str) -> str:
     Gere a análise interpretativa em PT-BR, mantendo os dados principais, mas enriquecendo com insights narrativos.
     """
 
-    response = llm.invoke([SystemMessage(content=system_prompt), HumanMessage(content=human_prompt)])
-    return response.content
+    parts: List[str] = []
+    messages = [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=human_prompt)]
+    for chunk in llm.stream(messages, config=llm_config("report")):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    # Só guarda respostas completas: um stream interrompido não chega aqui.
+    if cache is not None:
+        cache.set(key, snapshot_version, "".join(parts))
+
+
+def analise_content(
+    report: str,
+    snapshot_version: Optional[str] = None,
+    llm: Optional[Any] = None,
+) -> str:
+    """Analisa o conteúdo do relatório e gera uma análise narrativa junto dos dados."""
+    return "".join(stream_analise_content(report, snapshot_version, llm))
 
-def _filter_by_date_range(
-    items: List[Dict[str, Any]],
-    start: Optional[datetime],
-    end: Optional[datetime],
-    date_key: str,
-) -> List[Dict[str, Any]]:
-    """Retorna itens cujo campo de data está dentro da janela desejada."""
-
-    filtered: List[Dict[str, Any]] = []
-    for item in items:
-        if not isinstance(item, dict):
-            continue
-        raw_date = item.get(date_key)
-        candidate = _parse_iso8601(raw_date)
-        if candidate is None:
-            continue
-        if _apply_date_window(candidate, start, end):
-            filtered.append(item)
-    return filtered
-
-
-def _calculate_points_summary(notifs: List[Dict[str, Any]]) -> Dict[str, int]:
-    total = 0
-    conversions = 0
-    bonus = 0
-
-    for notification in notifs:
-        points = _to_int(notification.get('points_awarded'))
-        total += points
-        notif_type = (notification.get('type') or '').lower()
-        if notif_type == 'conversion':
-            conversions += points
-        elif notif_type == 'bonus':
-            bonus += points
 
+def prepare_report(snapshot: Snapshot, start: Optional[str], end: Optional[str]) -> Dict[str, Any]:
+    """Etapa sem LLM do relatório: agrega a janela e monta o cabeçalho do prompt.
+
+    Separada de `render_report` para que o lote (`report_batch.py`) agregue todos os
+    períodos sobre o mesmo snapshot antes de disparar as chamadas ao LLM.
+    """
+    start_date = _parse_iso8601(start) if start else None
+    end_date = _parse_iso8601(end) if end else None
+
+    reference_date = end_date or datetime.now(timezone.utc)
+    aggregate = aggregate_period(snapshot, start_date, end_date, reference_date, top_k=5)
+
+    points_summary = aggregate['points_summary']
+    top_users = aggregate['top_referrers']
+    churned_users = aggregate['churn_risk']
+    referral_depths = aggregate['referral_depths']
+    cohorts = aggregate['cohorts']
+
+    churn_sample = dict(churned_users, users=churned_users['users'][:REPORT_CHURN_SAMPLE])
+    cohort_rows = cohorts['cohorts'][-REPORT_COHORT_ROWS:]
+    cohort_unit = 'semana' if cohorts['granularity'] == 'week' else 'mês'
+    header = (
+        "Relatório de Indicações\n"
+        f"Período: {start_date.date() if start_date else 'Início'} a {end_date.date() if end_date else 'Atual'}\n\n"
+        f"Resumo de Pontos:\n{compact_json(points_summary)}\n\n"
+        f"Top 5 Usuários que mais indicaram:\n{compact_json(top_users)}\n\n"
+        "Rede por nível (0 = sem convidador; usuários no total, novos no período e conversões "
+        f"feitas pelos convidadores de cada nível):\n{compact_json(referral_depths)}\n\n"
+        f"Coortes de cadastro por {cohort_unit} (até {REPORT_COHORT_ROWS} mais recentes de {len(cohorts['cohorts'])}; "
+        "ativação = primeira conversão feita pelo usuário; curvas por período após o cadastro, "
+        f"null = período ainda não alcançado):\n{compact_json(cohort_rows)}\n\n"
+        f"Usuários com risco de churn (até {REPORT_CHURN_SAMPLE} listados de {churned_users['count']}):\n"
+        f"{compact_json(churn_sample)}"
+    )
+
+    period_label = f"{start_date.date()}_{end_date.date()}" if start_date and end_date else "completo"
     return {
-        'points_total_period': total,
-        'points_from_conversions': conversions,
-        'points_from_bonus': bonus,
+        "start": start,
+        "end": end,
+        "header": header,
+        # Notificações criadas dentro da janela do relatório.
+        "notifications": aggregate['notifications'],
+        "snapshot_version": snapshot.version,
+        "file_name": f"relatorio_indicacoes_{period_label}.txt",
     }
 
 
-def _top_referrers(
-    users_data: List[Dict[str, Any]],
-    notifs: List[Dict[str, Any]],
-    limit: int = 5,
-) -> List[Dict[str, Any]]:
-    conversion_counts: Dict[str, int] = {}
-    for notification in notifs:
-        if (notification.get('type') or '').lower() != 'conversion':
-            continue
-        inviter = notification.get('inviter_uid')
-        if not inviter:
-            continue
-        conversion_counts[inviter] = conversion_counts.get(inviter, 0) + 1
-
-    ranked: List[Dict[str, Any]] = []
-    for uid, conversions in conversion_counts.items():
-        user = next((u for u in users_data if u.get('uid') == uid), None)
-        if not user:
-            continue
-        ranked.append({
-            'uid': uid,
-            'name': user.get('name'),
-            'my_code': user.get('my_code'),
-            'conversions': conversions,
-            'points_total': _to_int(user.get('points_total')),
-        })
-
-    ranked.sort(key=lambda item: (item['conversions'], item['points_total']), reverse=True)
-    return ranked[:limit]
-
-
-def _churn_risk(
-    users_subset: List[Dict[str, Any]],
-    reference_date: datetime,
-    days: int = 7,
+def render_report(
+    prepared: Dict[str, Any],
+    on_token: Optional[Callable[[str], None]] = None,
+    llm: Optional[Any] = None,
+    limiter: Optional[RateLimiter] = None,
 ) -> Dict[str, Any]:
-    cutoff = reference_date - timedelta(days=days)
-    at_risk: List[Dict[str, Any]] = []
-
-    for user in users_subset:
-        if not user.get('invited_by_code'):
-            continue
-        if _to_int(user.get('points_total')) != 0:
-            continue
-        created_at = _parse_iso8601(user.get('created_at'))
-        if created_at is None:
-            continue
-        if created_at > cutoff:
-            continue
-        at_risk.append({
-            'uid': user.get('uid'),
-            'name': user.get('name'),
-            'email': user.get('email'),
-            'invited_by_code': user.get('invited_by_code'),
-        })
+    """Etapa com LLM: resume os blocos que não couberem no orçamento e escreve a análise."""
+    version = prepared["snapshot_version"]
+    prompt = build_report_prompt(
+        prepared["header"],
+        prepared["notifications"],
+        summarize=lambda chunk: _summarize_chunk(chunk, version, llm, limiter),
+    )
+    report_content = prompt["content"]
+
+    parts: List[str] = []
+    for part in stream_analise_content(report_content, snapshot_version=version, llm=llm, limiter=limiter):
+        parts.append(part)
+        if on_token:
+            on_token(part)
+    processed_report = "".join(parts)
 
     return {
-        'days': days,
-        'count': len(at_risk),
-        'users': at_risk,
+        "content": processed_report,
+        "file_name": prepared["file_name"],
+        "metadata": {
+            "start": prepared["start"],
+            "end": prepared["end"],
+            "raw_report": report_content,
+            "snapshot_version": version,
+            "prompt_tokens": prompt["prompt_tokens"],
+            "raw_tokens": prompt["raw_tokens"],
+            "tokens_saved": prompt["tokens_saved"],
+            "summarized_chunks": prompt["summarized_chunks"],
+        },
     }
 
 
 def generate_report(
     start: Optional[str],
     end: Optional[str],
+    on_token: Optional[Callable[[str], None]] = None,
+    llm: Optional[Any] = None,
 ) -> Dict[str, Any]:
-    """Gera um relatório textual a partir da janela de datas informada."""
-    start_date = _parse_iso8601(start) if start else None
-    end_date = _parse_iso8601(end) if end else None
-
-    refresh_data()
-
-    users_data = list(users)
-    notifications_data = list(notifications)
-
-    filtered_users = _filter_by_date_range(users_data, start_date, end_date, date_key="created_at")
-    filtered_notifications = _filter_by_date_range(notifications_data, start_date, end_date, date_key="created_at")
-
-    points_summary = _calculate_points_summary(filtered_notifications)
-    top_users = _top_referrers(users_data, filtered_notifications, limit=5)
-    reference_date = end_date or datetime.now(timezone.utc)
-    churned_users = _churn_risk(filtered_users, reference_date)
-
-    report_content = f"""
-    Relatório de Indicações
-    Período: {start_date.date() if start_date else 'Início'} a {end_date.date() if end_date else 'Atual'}
-
-    Resumo de Pontos:
-    {json.dumps(points_summary, indent=2)}
-
-    Top 5 Usuários que mais indicaram:
-    {json.dumps(top_users, indent=2)}
+    """Gera um relatório textual a partir da janela de datas informada.
 
-    Usuários com risco de churn:
-    {json.dumps(churned_users, indent=2)}
-
-    Indicações e Notificações:
-    {json.dumps(filtered_notifications, indent=2)}
-
-    Fim do Relatório
+    O material bruto enviado ao LLM respeita `REPORT_TOKEN_BUDGET` (ver `report_prompt.py`).
+    `on_token`, quando informado, recebe cada pedaço da análise assim que o LLM o emite.
+    Para vários períodos de uma vez, use `report_batch.generate_reports`.
     """
+    return render_report(prepare_report(get_snapshot(), start, end), on_token=on_token, llm=llm)
 
-    processed_report = analise_content(report_content)
 
-    period_label = f"{start_date.date()}_{end_date.date()}" if start_date and end_date else "completo"
-    file_name = f"relatorio_indicacoes_{period_label}.txt"
+def main():
+    """Linha de comando: gera relatórios em lote (ver `report_batch.py`)."""
+    from report_batch import main as batch_main
 
-    return {
-        "content": processed_report,
-        "file_name": file_name,
-        "metadata": {
-            "start": start,
-            "end": end,
-            "raw_report": report_content,
-        },
-    }
+    batch_main()
 
-def main():
-    """Função principal para teste."""
-    resultado = generate_report("2023-01-01", "2023-12-31")
-    print(f"Relatório gerado: {resultado['file_name']}")
 
 if __name__ == "__main__":
     main()
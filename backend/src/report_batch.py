@@ -0,0 +1,195 @@
+"""Relatórios de vários períodos de uma vez (fechamento mensal, quebras semanais).
+
+Uso (a partir de `backend/`):
+    python3 src/report_batch.py                     # mês corrente, até hoje
+    python3 src/report_batch.py monthly:12 weekly:8 --output-dir relatorios
+    python3 src/report_batch.py 2024-01-01..2024-03-31 monthly:24 --until 2026-10-01
+
+Todos os períodos leem o mesmo snapshot: as agregações (sem LLM) são feitas antes,
+em sequência, e só então as análises vão ao LLM em paralelo, em um pool limitado a
+`REPORT_BATCH_WORKERS` threads e a `REPORT_RATE_LIMIT` chamadas por minuto. Com
+chamadas suficientes em paralelo, o tempo total fica próximo ao de uma única análise.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+import logging
+import os
+from pathlib import Path
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from data_store import _parse_iso8601, get_snapshot
+from llm_clients import RateLimiter
+from relatorio_agent import prepare_report, render_report
+
+REPORT_BATCH_WORKERS = int(os.getenv("REPORT_BATCH_WORKERS", "4"))
+# Chamadas ao LLM por minuto somando todas as threads do lote; 0 desliga o limite.
+REPORT_RATE_LIMIT = float(os.getenv("REPORT_RATE_LIMIT", "120"))
+
+logger = logging.getLogger(__name__)
+
+Period = Tuple[str, str]
+
+
+def _period(first: date, last: date) -> Period:
+    """Janela de `first` 00:00 até o fim de `last` (UTC), nos formatos aceitos por `generate_report`."""
+    end = datetime.combine(last, dt_time.max, tzinfo=timezone.utc)
+    return first.isoformat(), end.isoformat()
+
+
+def monthly_periods(count: int, until: date) -> List[Period]:
+    """Os `count` meses completos anteriores ao mês de `until`, do mais antigo ao mais recente."""
+    periods: List[Period] = []
+    first = until.replace(day=1)
+    for _ in range(count):
+        last = first - timedelta(days=1)
+        first = last.replace(day=1)
+        periods.append(_period(first, last))
+    return periods[::-1]
+
+
+def weekly_periods(count: int, until: date) -> List[Period]:
+    """As `count` semanas completas (segunda a domingo) anteriores à semana de `until`."""
+    monday = until - timedelta(days=until.weekday())
+    return [
+        _period(monday - timedelta(weeks=offset), monday - timedelta(weeks=offset) + timedelta(days=6))
+        for offset in range(count, 0, -1)
+    ]
+
+
+def month_to_date(until: date) -> Period:
+    """Do primeiro dia do mês de `until` até o fim de `until`."""
+    return _period(until.replace(day=1), until)
+
+
+def parse_periods(specs: Sequence[str], until: Optional[date] = None) -> List[Period]:
+    """Converte especificações em períodos.
+
+    Aceita `monthly:N`, `weekly:N` (relativos a `until`, padrão hoje em UTC) e
+    `INICIO..FIM` com datas ou datas/horas ISO-8601; uma data final sem hora inclui o
+    dia inteiro. Períodos repetidos aparecem uma vez só. Sem especificações, devolve
+    o mês corrente até `until` (`month_to_date`).
+    """
+
+    until = until or datetime.now(timezone.utc).date()
+    if not specs:
+        return [month_to_date(until)]
+    periods: List[Period] = []
+    for spec in specs:
+        kind, _, count = spec.partition(":")
+        if kind in ("monthly", "weekly") and count.isdigit():
+            builder = monthly_periods if kind == "monthly" else weekly_periods
+            periods.extend(builder(int(count), until))
+            continue
+        start, separator, end = spec.partition("..")
+        if not separator:
+            raise ValueError(f"Período inválido: {spec!r} (use monthly:N, weekly:N ou INICIO..FIM)")
+        if end and len(end.strip()) == 10:
+            end = _period(date.fromisoformat(end.strip()), date.fromisoformat(end.strip()))[1]
+        # Compara depois de estender a data final: um início no mesmo dia não é inversão.
+        start_date, end_date = _parse_iso8601(start), _parse_iso8601(end)
+        if start_date and end_date and start_date > end_date:
+            raise ValueError(f"Período invertido: {spec!r}")
+        periods.append((start or None, end or None))
+    return list(dict.fromkeys(periods))
+
+
+def generate_reports(
+    periods: Sequence[Period],
+    output_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+    rate_limit: Optional[float] = None,
+    llm: Optional[Any] = None,
+    on_report: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Gera um relatório por período a partir de um único snapshot.
+
+    Retorna os resultados na ordem de `periods` (mesmo formato de `generate_report`).
+    Um período que falhar não interrompe os demais: seu resultado traz `error` no
+    lugar de `content`. Com `output_dir`, cada relatório é gravado em `file_name`;
+    `on_report` é chamado à medida que cada um termina.
+    """
+
+    workers = REPORT_BATCH_WORKERS if workers is None else workers
+    rate_limit = REPORT_RATE_LIMIT if rate_limit is None else rate_limit
+    if not periods:
+        return []
+
+    snapshot = get_snapshot()
+    prepared = [prepare_report(snapshot, start, end) for start, end in periods]
+
+    limiter = RateLimiter(rate_limit, burst=workers) if rate_limit > 0 else None
+    if output_dir is not None:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(prepared)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(prepared))), thread_name_prefix="report") as pool:
+        futures = {
+            pool.submit(render_report, item, llm=llm, limiter=limiter): index
+            for index, item in enumerate(prepared)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            item = prepared[index]
+            try:
+                result = future.result()
+            except Exception as exc:
+                logger.exception("Falha ao gerar o relatório %s", item["file_name"])
+                result = {
+                    "error": str(exc),
+                    "file_name": item["file_name"],
+                    "metadata": {"start": item["start"], "end": item["end"]},
+                }
+            else:
+                if output_dir is not None:
+                    path = output_dir / result["file_name"]
+                    path.write_text(result["content"], encoding="utf-8")
+                    result["path"] = str(path)
+            results[index] = result
+            if on_report:
+                on_report(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("periods", nargs="*", help="monthly:N, weekly:N ou INICIO..FIM (padrão: o mês corrente até hoje)")
+    parser.add_argument("--until", type=date.fromisoformat, help="referência de monthly/weekly (padrão: hoje)")
+    parser.add_argument("--output-dir", type=Path, default=Path("relatorios"))
+    parser.add_argument("--workers", type=int, default=REPORT_BATCH_WORKERS)
+    parser.add_argument("--rate-limit", type=float, default=REPORT_RATE_LIMIT, help="chamadas ao LLM por minuto (0 desliga)")
+    args = parser.parse_args()
+
+    try:
+        periods = parse_periods(args.periods, args.until)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    started = time.perf_counter()
+
+    def report_done(result: Dict[str, Any]) -> None:
+        elapsed = time.perf_counter() - started
+        if "error" in result:
+            print(f"[{elapsed:6.1f} s] ERRO {result['file_name']}: {result['error']}")
+        else:
+            print(f"[{elapsed:6.1f} s] {result['path']}")
+
+    print(f"{len(periods)} período(s), {args.workers} em paralelo")
+    results = generate_reports(
+        periods,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        rate_limit=args.rate_limit,
+        on_report=report_done,
+    )
+    failed = sum("error" in result for result in results)
+    print(f"{len(results) - failed} relatório(s) em {time.perf_counter() - started:.1f} s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
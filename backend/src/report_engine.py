@@ -0,0 +1,94 @@
+"""Agregação do relatório em uma única passada sobre o snapshot."""
+
+from datetime import datetime
+import heapq
+from typing import Any, Dict, List, Optional
+
+from cohorts import cohort_columns, default_granularity
+from data_store import Snapshot, _to_int
+
+
+def _rank_referrers(
+    snapshot: Snapshot,
+    conversion_counts: Dict[str, int],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    ranked: List[Dict[str, Any]] = []
+    first_seen: Dict[str, int] = {}
+    # `conversion_counts` vem na ordem da primeira aparição de cada convidador na janela (ordem do export).
+    for uid, conversions in conversion_counts.items():
+        user = snapshot.users_by_uid.get(uid)
+        if not user:
+            continue
+        ranked.append({
+            'uid': uid,
+            'name': user.name,
+            'my_code': user.my_code,
+            'conversions': conversions,
+            'points_total': _to_int(user.points_total),
+        })
+        first_seen[uid] = len(first_seen)
+    # Empates em conversões e pontos ficam com quem aparece primeiro na janela, na ordem
+    # do export, como na passada linear sobre as notificações; a chave explícita não
+    # depende da ordem de entrada do heap.
+    return heapq.nlargest(
+        limit,
+        ranked,
+        key=lambda item: (item['conversions'], item['points_total'], -first_seen[item['uid']]),
+    )
+
+
+def top_referrers(
+    snapshot: Snapshot,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    """Convidadores com mais conversões na janela (desempate pelos pontos totais)."""
+    lo, hi = snapshot.notification_timeline.bounds(start, end)
+    _, conversion_counts = snapshot.points.scan(lo, hi)
+    return _rank_referrers(snapshot, conversion_counts, limit)
+
+
+def aggregate_period(
+    snapshot: Snapshot,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    reference_date: datetime,
+    top_k: int = 5,
+    churn_days: int = 7,
+    cohort_horizon: int = 4,
+) -> Dict[str, Any]:
+    """Calcula todas as métricas do relatório de uma janela de uma só vez.
+
+    As notificações da janela são percorridas uma única vez (pontos por tipo e
+    conversões por convidador juntos). Usuários em risco e coortes de cadastro saem
+    das colunas de coorte do snapshot (`cohorts.py`), relativos a `reference_date`.
+    A quebra por nível da rede usa as profundidades já calculadas no grafo de
+    indicações do snapshot.
+    """
+
+    lo, hi = snapshot.notification_timeline.bounds(start, end)
+    points_summary, conversion_counts = snapshot.points.scan(lo, hi)
+
+    columns = cohort_columns(snapshot)
+    at_risk = columns.churn_risk(reference_date, churn_days, start)
+
+    # As linhas do relatório seguem a ordem do export, como na passada linear original.
+    items = snapshot.notification_timeline.items
+    return {
+        'notifications': [items[row] for row in snapshot.points.export_order(lo, hi)],
+        'points_summary': points_summary,
+        'conversion_counts': conversion_counts,
+        'top_referrers': _rank_referrers(snapshot, conversion_counts, top_k),
+        'referral_depths': snapshot.referral_graph.depth_breakdown(
+            conversion_counts,
+            snapshot.user_timeline.window(start, end),
+        ),
+        'churn_risk': {
+            'days': churn_days,
+            'count': len(at_risk),
+            'users': at_risk,
+        },
+        'cohorts': columns.cohort_table(default_granularity(start, end), start, end, reference_date, cohort_horizon),
+    }
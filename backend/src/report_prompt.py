@@ -0,0 +1,179 @@
+"""Montagem do material bruto do relatório dentro de um orçamento de tokens.
+
+Em vez de despejar todas as notificações em JSON indentado, o prompt leva tabelas
+pré-agregadas e as notificações em linhas CSV compactas. Se as linhas ainda não
+couberem no orçamento, são divididas em blocos resumidos em paralelo (map) e os
+resumos são combinados até caber (reduce): o tamanho do prompt fica limitado
+qualquer que seja a janela do relatório. Os tokens são contados com `tokens.py`.
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from records import NotificationRecord
+from tokens import count_many, count_tokens, truncate
+
+REPORT_TOKEN_BUDGET = int(os.getenv("REPORT_TOKEN_BUDGET", "12000"))
+REPORT_CHUNK_TOKENS = int(os.getenv("REPORT_CHUNK_TOKENS", "6000"))
+REPORT_MAP_WORKERS = int(os.getenv("REPORT_MAP_WORKERS", "4"))
+# Janelas até este número de dias recebem a tabela de atividade por dia; acima, por mês.
+_DAILY_TABLE_MAX_DAYS = 92
+# Linhas usadas para estimar o tamanho do JSON indentado que o relatório enviava antes.
+_RAW_SAMPLE_SIZE = 200
+_CSV_HEADER = "created_at,type,inviter_code,invited_name,points_awarded"
+# Folga para o título da seção e o rodapé, contados fora de `detail`.
+_FRAME_TOKENS = 32
+
+
+def compact_json(value: Any) -> str:
+    """JSON sem indentação nem espaços entre separadores."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _csv_field(value: Any) -> str:
+    text = "" if value is None else str(value)
+    if any(char in text for char in ',"\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def notification_rows(notifications: Sequence[NotificationRecord]) -> List[str]:
+    """Notificações em linhas CSV (`_CSV_HEADER`), sem ids nem indentação."""
+    return [
+        ",".join(
+            _csv_field(getattr(notification, field))
+            for field in ("created_at", "type", "inviter_code", "invited_name", "points_awarded")
+        )
+        for notification in notifications
+    ]
+
+
+def activity_table(notifications: Sequence[NotificationRecord]) -> str:
+    """Contagem por tipo e pontos por dia (ou por mês, em janelas longas), em CSV."""
+
+    days = {str(notification.created_at or "")[:10] for notification in notifications}
+    width = 10 if len(days) <= _DAILY_TABLE_MAX_DAYS else 7
+    counts: Dict[str, Counter] = {}
+    points: Counter = Counter()
+    for notification in notifications:
+        period = str(notification.created_at or "")[:width] or "sem data"
+        counts.setdefault(period, Counter())[notification.type or "outro"] += 1
+        try:
+            points[period] += int(notification.points_awarded or 0)
+        except (TypeError, ValueError):
+            continue
+
+    types = sorted({notif_type for period_counts in counts.values() for notif_type in period_counts})
+    label = "dia" if width == 10 else "mes"
+    lines = [",".join([label, *types, "pontos"])]
+    for period in sorted(counts):
+        lines.append(",".join([period, *(str(counts[period][t]) for t in types), str(points[period])]))
+    return "\n".join(lines)
+
+
+def estimate_raw_tokens(notifications: Sequence[NotificationRecord]) -> int:
+    """Tokens que as notificações ocupariam em `json.dumps(..., indent=2)`.
+
+    Mede uma amostra e extrapola, para não serializar a janela inteira só para comparar.
+    """
+
+    if not notifications:
+        return count_tokens("[]")
+    sample = [notification.to_dict() for notification in notifications[:_RAW_SAMPLE_SIZE]]
+    sample_tokens = count_tokens(json.dumps(sample, indent=2))
+    return sample_tokens * len(notifications) // len(sample)
+
+
+def _chunk(rows: Sequence[str], row_tokens: Sequence[int], budget: int) -> List[List[str]]:
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for row, tokens in zip(rows, row_tokens):
+        if current and used + tokens > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(row)
+        used += tokens + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _map_parallel(summarize: Callable[[str], str], texts: List[str], workers: int) -> List[str]:
+    if len(texts) == 1 or workers <= 1:
+        return [summarize(text) for text in texts]
+    with ThreadPoolExecutor(max_workers=min(workers, len(texts))) as pool:
+        return list(pool.map(summarize, texts))
+
+
+def _reduce(
+    summaries: List[str],
+    summarize: Callable[[str], str],
+    budget: int,
+    chunk_tokens: int,
+    workers: int,
+) -> List[str]:
+    """Combina resumos em grupos até o conjunto caber em `budget`."""
+
+    while len(summaries) > 1 and count_tokens("\n\n".join(summaries)) > budget:
+        groups = _chunk(summaries, count_many(summaries), chunk_tokens)
+        if len(groups) == len(summaries):
+            # Resumos grandes demais para agrupar pelo orçamento: combina de dois em dois.
+            groups = [summaries[index:index + 2] for index in range(0, len(summaries), 2)]
+        summaries = _map_parallel(summarize, ["\n\n".join(group) for group in groups], workers)
+    return summaries
+
+
+def build_report_prompt(
+    header: str,
+    notifications: Sequence[NotificationRecord],
+    summarize: Callable[[str], str],
+    budget: Optional[int] = None,
+    chunk_tokens: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Monta o material bruto do relatório sem passar de `budget` tokens.
+
+    `header` traz as seções já agregadas (resumo de pontos, ranking, churn). As
+    notificações entram como tabela de atividade e, se couberem, linha a linha;
+    caso contrário, `summarize` (chamado em paralelo) resume blocos de linhas.
+
+    Retorna `content`, `prompt_tokens`, `raw_tokens` (estimativa do formato antigo,
+    com as notificações em JSON indentado), `tokens_saved` e `summarized_chunks`.
+    """
+
+    budget = REPORT_TOKEN_BUDGET if budget is None else budget
+    chunk_tokens = REPORT_CHUNK_TOKENS if chunk_tokens is None else chunk_tokens
+    workers = REPORT_MAP_WORKERS if workers is None else workers
+
+    base = f"{header}\n\nAtividade no período (CSV):\n{activity_table(notifications)}\n"
+    rows = notification_rows(notifications)
+    raw_tokens = count_tokens(header) + estimate_raw_tokens(notifications)
+
+    detail = "\n".join([_CSV_HEADER, *rows])
+    summarized_chunks = 0
+    if count_tokens(base) + count_tokens(detail) > budget:
+        remaining = max(budget - count_tokens(base) - _FRAME_TOKENS, 0)
+        chunks = _chunk(rows, count_many(rows), chunk_tokens)
+        summaries = _map_parallel(
+            summarize, ["\n".join([_CSV_HEADER, *chunk]) for chunk in chunks], workers
+        )
+        summarized_chunks = len(chunks)
+        summaries = _reduce(summaries, summarize, remaining, chunk_tokens, workers)
+        detail = truncate("\n\n".join(summaries), remaining)
+        section = "Resumo das notificações (gerado por blocos)"
+    else:
+        section = "Indicações e Notificações (CSV)"
+
+    content = f"{base}\n{section}:\n{detail}\n\nFim do Relatório\n"
+    prompt_tokens = count_tokens(content)
+    return {
+        "content": content,
+        "prompt_tokens": prompt_tokens,
+        "raw_tokens": raw_tokens,
+        "tokens_saved": max(raw_tokens - prompt_tokens, 0),
+        "summarized_chunks": summarized_chunks,
+    }
@@ -0,0 +1,108 @@
+"""Totais diários de pontos com somas de prefixo por (tipo, convidador).
+
+Com os prefixos, a soma de qualquer intervalo de dias completos sai de duas buscas
+na série, independentemente de quantas notificações existam no período.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+
+from columnar import TYPE_BONUS, TYPE_CONVERSION, _summary
+
+DAY_US = 86_400_000_000
+_TYPE_COUNT = 3
+
+
+class _DailySeries:
+    """Dias (UTC, em dias desde a época) com pontos e somas acumuladas por tipo."""
+
+    __slots__ = ('days', 'prefix')
+
+    def __init__(self) -> None:
+        self.days: List[int] = []
+        # prefix[tipo][i] = soma dos pontos do tipo nos dias days[:i].
+        self.prefix: List[List[int]] = [[0] for _ in range(_TYPE_COUNT)]
+
+    def copy(self) -> '_DailySeries':
+        series = _DailySeries.__new__(_DailySeries)
+        series.days = list(self.days)
+        series.prefix = [list(column) for column in self.prefix]
+        return series
+
+    def add(self, day: int, type_code: int, points: int) -> None:
+        if not self.days or self.days[-1] != day:
+            self.days.append(day)
+            for column in self.prefix:
+                column.append(column[-1])
+        self.prefix[type_code][-1] += points
+
+    def range_sum(self, first_day: Optional[int], last_day: Optional[int]) -> List[int]:
+        lo = bisect_left(self.days, first_day) if first_day is not None else 0
+        hi = bisect_right(self.days, last_day) if last_day is not None else len(self.days)
+        if lo >= hi:
+            return [0] * _TYPE_COUNT
+        return [column[hi] - column[lo] for column in self.prefix]
+
+
+class DailyRollups:
+    """Séries diárias para todas as notificações e para cada convidador."""
+
+    def __init__(
+        self,
+        timestamps: List[int],
+        points: List[int],
+        type_codes: List[int],
+        inviter_codes: List[int],
+    ) -> None:
+        self.overall = _DailySeries()
+        self.by_inviter: Dict[int, _DailySeries] = {}
+        self._add_rows(timestamps, points, type_codes, inviter_codes, copied=None)
+
+    def _add_rows(
+        self,
+        timestamps: List[int],
+        points: List[int],
+        type_codes: List[int],
+        inviter_codes: List[int],
+        copied: Optional[set],
+    ) -> None:
+        # As linhas chegam ordenadas por data, então cada série recebe os dias em ordem.
+        for timestamp, value, type_code, inviter_code in zip(timestamps, points, type_codes, inviter_codes):
+            day = timestamp // DAY_US
+            self.overall.add(day, type_code, value)
+            if inviter_code < 0:
+                continue
+            series = self.by_inviter.get(inviter_code)
+            if series is None:
+                series = self.by_inviter[inviter_code] = _DailySeries()
+            elif copied is not None and inviter_code not in copied:
+                series = self.by_inviter[inviter_code] = series.copy()
+            if copied is not None:
+                copied.add(inviter_code)
+            series.add(day, type_code, value)
+
+    def extended(
+        self,
+        timestamps: List[int],
+        points: List[int],
+        type_codes: List[int],
+        inviter_codes: List[int],
+    ) -> 'DailyRollups':
+        """Novas séries com linhas mais recentes que as atuais somadas (cópia sob escrita)."""
+        rollups = DailyRollups.__new__(DailyRollups)
+        rollups.overall = self.overall.copy()
+        rollups.by_inviter = dict(self.by_inviter)
+        rollups._add_rows(timestamps, points, type_codes, inviter_codes, copied=set())
+        return rollups
+
+    def range_sum(
+        self,
+        first_day: Optional[int],
+        last_day: Optional[int],
+        inviter_code: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """Pontos por tipo nos dias completos `[first_day, last_day]` (limites opcionais)."""
+
+        series = self.overall if inviter_code is None else self.by_inviter.get(inviter_code)
+        totals = series.range_sum(first_day, last_day) if series else [0] * _TYPE_COUNT
+        return _summary(sum(totals), totals[TYPE_CONVERSION], totals[TYPE_BONUS])
@@ -0,0 +1,195 @@
+"""Índice de busca de usuários usado por `search_user`.
+
+Nome, e-mail, UID e `my_code` de cada usuário são normalizados uma única vez na carga
+(minúsculas, sem acentos: "José" e "jose" se encontram) e guardados em um único buffer
+de bytes, com os campos separados por `\\0`. Com NumPy, o buffer vira listas invertidas
+de trigramas (cada trigrama → usuários que o contêm, em ordem): uma consulta intersecta
+as listas dos seus trigramas, começando pela menor, e só confere o texto dos poucos
+candidatos que sobram. Sem NumPy, ou para consultas com menos de 3 caracteres, a busca
+percorre o buffer com `bytes.find`, que continua sem criar objetos por usuário.
+"""
+
+from array import array
+from bisect import bisect_right
+import heapq
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import unicodedata
+
+from records import UserRecord
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+_FIELDS = ('name', 'email', 'uid', 'my_code')
+_SEP = 0
+# Abaixo disso, conferir o texto dos candidatos sai mais barato que outra interseção.
+_VERIFY_CANDIDATES = 256
+
+
+def fold(text: str) -> str:
+    """Minúsculas sem acentos (NFKD sem marcas combinantes)."""
+    lowered = text.lower()
+    if lowered.isascii():
+        return lowered
+    return ''.join(char for char in unicodedata.normalize('NFKD', lowered) if not unicodedata.combining(char))
+
+
+def _document(user: Any) -> bytes:
+    if not isinstance(user, UserRecord):
+        return b'\0' * len(_FIELDS)
+    parts = []
+    for field in _FIELDS:
+        value = getattr(user, field)
+        parts.append(fold(value).replace('\0', '') if isinstance(value, str) else '')
+    return ('\0'.join(parts) + '\0').encode('utf-8')
+
+
+class UserSearchIndex:
+    """Busca por substring (com ranking) sobre os usuários de um snapshot.
+
+    As posições devolvidas são índices em `users`. O índice é imutável, como o snapshot.
+    """
+
+    def __init__(self, users: Sequence[Any]) -> None:
+        self.users = users
+        documents = [_document(user) for user in users]
+        self._buffer = b''.join(documents)
+        self._offsets = array('q', accumulate(map(len, documents), initial=0))
+        self._points = array('q', map(_points, users))
+        del documents
+        self._gram_keys = self._gram_starts = self._gram_owners = None
+        if np is not None and self._buffer:
+            self._build_postings()
+
+    def _build_postings(self) -> None:
+        data = np.frombuffer(self._buffer, dtype=np.uint8)
+        codes = (data[:-2].astype(np.uint32) << 16) | (data[1:-1].astype(np.uint32) << 8) | data[2:]
+        # Trigramas que atravessam um separador (fim de campo ou de usuário) não existem no texto.
+        valid = (data[:-2] != _SEP) & (data[1:-1] != _SEP) & (data[2:] != _SEP)
+        offsets = np.frombuffer(self._offsets, dtype=np.int64)
+        owners = np.repeat(np.arange(len(offsets) - 1, dtype=np.uint64), np.diff(offsets))[:-2][valid]
+        # Chave (trigrama, usuário): a ordenação agrupa por trigrama com os usuários em ordem,
+        # e o mesmo trigrama repetido em um usuário fica adjacente e é descartado.
+        pairs = (codes[valid].astype(np.uint64) << np.uint64(32)) | owners
+        if not len(pairs):
+            # Nenhum campo com 3 caracteres: não há trigramas e toda consulta fica vazia.
+            self._gram_keys = np.empty(0, dtype=np.uint32)
+            self._gram_starts = np.zeros(1, dtype=np.int64)
+            self._gram_owners = np.empty(0, dtype=np.uint32)
+            return
+        pairs.sort()
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+        gram_of_pair = (pairs >> np.uint64(32)).astype(np.uint32)
+        boundaries = np.flatnonzero(np.diff(gram_of_pair)) + 1
+        self._gram_keys = gram_of_pair[np.concatenate(([0], boundaries))]
+        self._gram_starts = np.concatenate(([0], boundaries, [len(pairs)]))
+        self._gram_owners = (pairs & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def _posting(self, gram: bytes) -> Optional[Any]:
+        code = (gram[0] << 16) | (gram[1] << 8) | gram[2]
+        slot = int(np.searchsorted(self._gram_keys, code))
+        if slot == len(self._gram_keys) or self._gram_keys[slot] != code:
+            return None
+        return self._gram_owners[self._gram_starts[slot]:self._gram_starts[slot + 1]]
+
+    def matches(self, query: str) -> List[int]:
+        """Posições (em ordem) dos usuários cujo nome, e-mail, UID ou código contém `query`."""
+        needle = fold(query.strip()).encode('utf-8')
+        if not needle or b'\0' in needle:
+            return []
+        if self._gram_keys is None or len(needle) < 3:
+            return self._scan(needle)
+
+        postings = []
+        for gram in {needle[i:i + 3] for i in range(len(needle) - 2)}:
+            posting = self._posting(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if len(candidates) <= _VERIFY_CANDIDATES:
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        # Trigramas em comum não garantem a substring: confere o texto de cada candidato.
+        buffer, offsets = self._buffer, self._offsets
+        return [
+            position for position in candidates.tolist()
+            if buffer.find(needle, offsets[position], offsets[position + 1]) != -1
+        ]
+
+    def _scan(self, needle: bytes) -> List[int]:
+        found: List[int] = []
+        buffer, offsets = self._buffer, self._offsets
+        start = buffer.find(needle)
+        while start != -1:
+            position = bisect_right(offsets, start) - 1
+            found.append(position)
+            start = buffer.find(needle, offsets[position + 1])
+        return found
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        exact: Sequence[Dict[str, Any]] = (),
+        extra: Sequence[Dict[str, Any]] = (),
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Total de resultados e os `limit` usuários mais relevantes.
+
+        `exact` (UID ou código idênticos à consulta) vem primeiro e `extra` (por exemplo,
+        os usuários criados na data consultada) logo depois. Entre as ocorrências de
+        texto, o nome que começa com a consulta (ou tem uma palavra que começa com ela)
+        vem antes de outro campo que começa com ela, que vem antes de qualquer outra
+        ocorrência. Empates são decididos pelo maior `points_total`.
+        """
+
+        needle = fold(query.strip()).encode('utf-8')
+        points = self._points
+        seen = set()
+        tiers: List[List[Any]] = []
+        for group in (exact, extra):
+            tier = []
+            for user in group:
+                if id(user) not in seen:
+                    seen.add(id(user))
+                    tier.append(user)
+            tiers.append([(_points(user), user) for user in tier])
+
+        # Ocorrências de texto por nível: nome, outro campo começando com a consulta, resto.
+        text_tiers: Tuple[List[int], List[int], List[int]] = ([], [], [])
+        buffer, offsets, users = self._buffer, self._offsets, self.users
+        word_start, field_start = b' ' + needle, b'\0' + needle
+        for position in self.matches(query):
+            if seen and id(users[position]) in seen:
+                continue
+            start = offsets[position]
+            name_end = buffer.find(b'\0', start)
+            if buffer.startswith(needle, start) or buffer.find(word_start, start, name_end) != -1:
+                text_tiers[0].append(position)
+            elif buffer.find(field_start, name_end, offsets[position + 1]) != -1:
+                text_tiers[1].append(position)
+            else:
+                text_tiers[2].append(position)
+
+        total = sum(map(len, tiers)) + sum(map(len, text_tiers))
+        top: List[Dict[str, Any]] = []
+        for tier in tiers:
+            # `nlargest` é estável: em pontuação igual, mantém a ordem original.
+            top.extend(user for _, user in heapq.nlargest(limit - len(top), tier, key=lambda item: item[0]))
+        for positions in text_tiers:
+            if len(top) >= limit:
+                break
+            top.extend(users[position] for position in heapq.nlargest(limit - len(top), positions, key=points.__getitem__))
+        return total, top[:limit]
+
+
+def _points(user: Any) -> int:
+    try:
+        return int(user.points_total or 0)
+    except (AttributeError, TypeError, ValueError):
+        return 0
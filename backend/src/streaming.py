@@ -0,0 +1,41 @@
+"""Repasse dos tokens e das chamadas de tools do agente para a interface.
+
+O handler não depende do Streamlit: recebe funções simples, então o mesmo código
+serve à página, ao terminal e a um LLM falso que emite tokens em testes.
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class AgentStreamHandler(BaseCallbackHandler):
+    """Callback do LangChain que repassa tokens e o progresso das tools."""
+
+    # Com `ainvoke`, roda na thread do laço de eventos (a do script no Streamlit), e não
+    # em um executor: os elementos da página só podem ser atualizados dessa thread.
+    run_inline = True
+
+    def __init__(
+        self,
+        on_token: Callable[[str], None],
+        on_tool_start: Optional[Callable[[str, str], None]] = None,
+        on_tool_end: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self._on_token = on_token
+        self._on_tool_start = on_tool_start
+        self._on_tool_end = on_tool_end
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        # Chunks de chamada de tool chegam com conteúdo vazio.
+        if token:
+            self._on_token(token)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        if self._on_tool_start:
+            name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+            self._on_tool_start(name, input_str)
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        if self._on_tool_end:
+            self._on_tool_end(str(getattr(output, "content", output)))
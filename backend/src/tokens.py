@@ -0,0 +1,54 @@
+"""Contagem e corte de textos em tokens, compartilhados pelo relatório e pela memória do chat.
+
+O `tiktoken` é opcional: sem ele (ou sem o arquivo do encoding), os tokens são
+estimados pelo número de caracteres.
+"""
+
+from functools import lru_cache
+import logging
+from typing import List, Sequence
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depende do ambiente
+    tiktoken = None
+
+_TOKENIZER_MODEL = "gpt-4o-mini"
+_CHARS_PER_TOKEN = 4
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(_TOKENIZER_MODEL)
+    except Exception as exc:  # encoding indisponível (por exemplo, sem rede para baixá-lo)
+        logger.warning("tiktoken indisponível (%s); estimando tokens por caracteres", exc)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Número de tokens de `text` no tokenizer do modelo (ou estimativa por caracteres)."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(encoding.encode_ordinary(text))
+
+
+def count_many(texts: Sequence[str]) -> List[int]:
+    """`count_tokens` de vários textos de uma vez (em lote, com o `tiktoken`)."""
+    encoding = _encoding()
+    if encoding is None:
+        return [count_tokens(text) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts))]
+
+
+def truncate(text: str, budget: int) -> str:
+    """Prefixo de `text` com no máximo `budget` tokens."""
+    encoding = _encoding()
+    if encoding is None:
+        return text[: budget * _CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode_ordinary(text)[:budget])
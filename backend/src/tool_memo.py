@@ -0,0 +1,140 @@
+"""Memo LRU dos resultados das tools do agente.
+
+Na mesma conversa o agente costuma repetir chamadas idênticas (`top_referrers()` ou o
+resumo de pontos do mês corrente). O resultado de uma tool depende só dos argumentos e
+do snapshot, então a chave é (tool, argumentos normalizados, `Snapshot.version`):
+quando `refresh_data()` publica dados novos, a versão muda e o memo é esvaziado na
+próxima consulta. Tools que dependem do relógio (`churn_risk`) entram na chave com um
+balde de tempo; `get_actual_date` não passa por aqui.
+"""
+
+from collections import OrderedDict
+from functools import wraps
+import inspect
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from data_store import get_snapshot
+import metrics
+
+TOOL_MEMO_SIZE = int(os.getenv("TOOL_MEMO_SIZE", "256"))
+# Largura (segundos) do balde de tempo das tools que dependem do relógio.
+TOOL_MEMO_TIME_BUCKET = float(os.getenv("TOOL_MEMO_TIME_BUCKET", "60"))
+
+
+class ToolMemo:
+    """LRU seguro entre threads, esvaziado quando a versão do snapshot muda."""
+
+    def __init__(self, max_entries: int = TOOL_MEMO_SIZE) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tool: str, key: Hashable, version: str) -> Tuple[bool, Any]:
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits[tool] = self._hits.get(tool, 0) + 1
+                return True, self._entries[key]
+            self._misses[tool] = self._misses.get(tool, 0) + 1
+            return False, None
+
+    def set(self, key: Hashable, version: str, value: Any) -> None:
+        with self._lock:
+            # Um resultado calculado sobre uma versão que já saiu não é guardado.
+            if version != self._version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Acertos, faltas e taxa de acerto por tool, além do tamanho atual."""
+        with self._lock:
+            tools = {
+                name: {
+                    "hits": self._hits.get(name, 0),
+                    "misses": self._misses.get(name, 0),
+                    "hit_rate": self._hits.get(name, 0) / (self._hits.get(name, 0) + self._misses.get(name, 0)),
+                }
+                for name in sorted(set(self._hits) | set(self._misses))
+            }
+            hits, misses = sum(self._hits.values()), sum(self._misses.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else None,
+                "tools": tools,
+            }
+
+
+_memo = ToolMemo()
+
+
+def memo_stats() -> Dict[str, Any]:
+    return _memo.stats()
+
+
+def clear_memo() -> None:
+    _memo.clear()
+
+
+def _normalize(value: Any) -> Hashable:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _normalize(item)) for key, item in value.items()))
+    return value
+
+
+def memoize_tool(time_bucket: Optional[float] = None) -> Callable[[Callable], Callable]:
+    """Decorador que memoriza a função por (nome, argumentos, versão do snapshot).
+
+    Aplicar abaixo do `@tool` e acima do `@instrument_tool` (acertos não entram na
+    duração das tools). Com `time_bucket`, a chave inclui `time.time() // time_bucket`.
+    Exceções não são memorizadas. `TOOL_MEMO_SIZE=0` desliga o memo.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if _memo.max_entries <= 0:
+            return func
+        signature = inspect.signature(func)
+        name = func.__name__
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key: Tuple[Any, ...] = (name, tuple((arg, _normalize(value)) for arg, value in bound.arguments.items()))
+            if time_bucket:
+                key += (int(time.time() // time_bucket),)
+
+            version = get_snapshot().version
+            hit, value = _memo.get(name, key, version)
+            metrics.inc(metrics.TOOL_CACHE_TOTAL, tool=name, result="hit" if hit else "miss")
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            _memo.set(key, version, value)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,76 @@
+"""Os módulos do backend são importados pelo nome, a partir de `src/` (como em `main.py`)."""
+
+import json
+import os
+from pathlib import Path
+import sys
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+# Nenhum teste acessa a rede: a URL de dados aponta para uma porta fechada.
+os.environ.setdefault("DATA_URL", "http://127.0.0.1:9/export")
+
+
+class FakeResponse:
+    """Resposta de `requests` com o mínimo que `refresh_data` usa."""
+
+    def __init__(self, status_code: int, body: bytes, headers: Dict[str, str]) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.content = body
+
+    def __enter__(self) -> 'FakeResponse':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            import requests
+
+            raise requests.HTTPError(f"{self.status_code} na resposta de teste", response=self)
+
+    def iter_content(self, chunk_size: int) -> List[bytes]:
+        return [self.content[i:i + chunk_size] for i in range(0, len(self.content), chunk_size)]
+
+
+class FakeSession:
+    """Sessão HTTP com respostas (ou falhas) enfileiradas; guarda `params` e `headers` de cada chamada."""
+
+    def __init__(self) -> None:
+        self.responses: List[Any] = []
+        self.calls: List[Dict[str, Any]] = []
+
+    def respond(self, payload: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> None:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.responses.append(FakeResponse(status_code, body, headers or {}))
+
+    def fail(self, error: Exception) -> None:
+        """Enfileira uma falha de rede: a próxima chamada levanta `error`."""
+        self.responses.append(error)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> FakeResponse:
+        self.calls.append({'params': params, 'headers': headers})
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """`data_store` sem snapshot carregado e com a rede trocada por uma `FakeSession`."""
+    import data_store
+    from http_client import CircuitBreaker
+
+    fake = FakeSession()
+    monkeypatch.setattr(data_store, '_breaker', CircuitBreaker())
+    monkeypatch.setattr(data_store, 'get_session', lambda: fake)
+    monkeypatch.setattr(data_store, '_cache_state', {'etag': None, 'last_modified': None, 'fetched_at': None})
+    monkeypatch.setattr(data_store, '_current', data_store.Snapshot({}))
+    return fake
@@ -0,0 +1,117 @@
+import json
+import threading
+from typing import List, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from chat_memory import ChatMemory, strip_bulky_json
+from tokens import count_tokens
+
+
+class _Summarizer:
+    """Substitui o LLM do resumo: guarda as chamadas e devolve um resumo previsível."""
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, str]] = []
+
+    def __call__(self, summary: str, transcript: str) -> str:
+        self.calls.append((summary, transcript))
+        return f"{summary}\n- {len(self.calls)}: {transcript.splitlines()[0]}".strip()
+
+
+def _contents(memory: ChatMemory) -> List[Tuple[str, str]]:
+    return [(type(message).__name__, message.content) for message in memory.messages()]
+
+
+def test_turnos_antigos_vao_para_o_resumo():
+    summarizer = _Summarizer()
+    memory = ChatMemory(max_turns=2, summarize=summarizer)
+    for index in range(1, 5):
+        memory.add_turn(f"pergunta {index}", f"resposta {index}")
+        memory.wait(5)
+
+    assert [transcript for _, transcript in summarizer.calls] == [
+        "Analista: pergunta 1\nAssistente: resposta 1",
+        "Analista: pergunta 2\nAssistente: resposta 2",
+    ]
+    # O resumo atual é passado adiante a cada atualização.
+    assert summarizer.calls[1][0] == "- 1: Analista: pergunta 1"
+    messages = memory.messages()
+    assert isinstance(messages[0], SystemMessage)
+    assert messages[0].content == "Resumo da conversa anterior:\n- 1: Analista: pergunta 1\n- 2: Analista: pergunta 2"
+    assert _contents(memory)[1:] == [
+        ('HumanMessage', 'pergunta 3'), ('AIMessage', 'resposta 3'),
+        ('HumanMessage', 'pergunta 4'), ('AIMessage', 'resposta 4'),
+    ]
+
+
+def test_turnos_pendentes_seguem_na_integra_enquanto_o_resumo_nao_fica_pronto():
+    release = threading.Event()
+
+    def slow_summary(summary: str, transcript: str) -> str:
+        release.wait(5)
+        return "resumo"
+
+    memory = ChatMemory(max_turns=1, summarize=slow_summary)
+    memory.add_turn("pergunta 1", "resposta 1")
+    memory.add_turn("pergunta 2", "resposta 2")
+
+    assert [content for _, content in _contents(memory)] == ["pergunta 1", "resposta 1", "pergunta 2", "resposta 2"]
+    release.set()
+    memory.wait(5)
+    assert _contents(memory) == [
+        ('SystemMessage', "Resumo da conversa anterior:\nresumo"),
+        ('HumanMessage', 'pergunta 2'), ('AIMessage', 'resposta 2'),
+    ]
+
+
+def test_falha_do_llm_usa_resumo_extrativo():
+    def failing(summary: str, transcript: str) -> str:
+        raise RuntimeError("LLM indisponível")
+
+    memory = ChatMemory(max_turns=1, summary_tokens=40, summarize=failing)
+    questions = [f"quantos pontos o usuário {index} ganhou em março?" for index in range(6)]
+    for question in questions:
+        memory.add_turn(question, "muitos")
+        memory.wait(5)
+
+    assert memory.summary
+    assert count_tokens(memory.summary) <= 40
+    # Sem o LLM, ficam as perguntas mais recentes que cabem no orçamento.
+    assert memory.summary.splitlines()[-1] == f"- Perguntou: {questions[-2]}"
+    assert questions[0] not in memory.summary
+
+
+def test_strip_bulky_json():
+    bulky = json.dumps([{'uid': f'u{index}', 'points_total': index * 50} for index in range(10)])
+    small = '{"uid": "u1"}'
+    text = f"Resultado: {bulky} e também {small}. Chaves soltas {{ ficam }}."
+    assert strip_bulky_json(text) == f"Resultado: [dados omitidos] e também {small}. Chaves soltas {{ ficam }}."
+
+    fenced = "Veja:\n```json\n{\"a\": 1}\n```\nfim"
+    assert strip_bulky_json(fenced) == "Veja:\n[dados omitidos]\nfim"
+
+
+def test_mensagens_cortadas_no_limite_de_tokens():
+    memory = ChatMemory(max_turns=3, message_tokens=10, summarize=_Summarizer())
+    long_answer = "palavra " * 200
+    memory.add_turn("pergunta curta", long_answer)
+
+    (_, question), (_, answer) = _contents(memory)
+    assert question == "pergunta curta"
+    assert answer.endswith(" […]")
+    assert count_tokens(answer[:-len(" […]")]) <= 10
+    assert long_answer.startswith(answer[:-len(" […]")])
+
+
+def test_clear_descarta_resumo_e_turnos():
+    memory = ChatMemory(max_turns=1, summarize=_Summarizer())
+    memory.add_turn("pergunta 1", "resposta 1")
+    memory.add_turn("pergunta 2", "resposta 2")
+    memory.wait(5)
+
+    memory.clear()
+    assert memory.summary == ""
+    assert memory.messages() == []
+    memory.add_turn("nova", "conversa")
+    assert [type(message) for message in memory.messages()] == [HumanMessage, AIMessage]
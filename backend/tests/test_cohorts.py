@@ -0,0 +1,135 @@
+"""As coortes com NumPy e em Python puro concordam, e as regras da data de referência valem nos dois."""
+
+from datetime import datetime, timedelta, timezone
+import json
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+import cohorts
+import columnar
+from data_store import Snapshot
+
+REFERENCE = datetime(2024, 3, 15, tzinfo=timezone.utc)
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat().replace('+00:00', 'Z')
+
+
+def _messy_export(count: int = 400) -> Dict[str, Any]:
+    """Cadastros em ~5 meses, convites para códigos inexistentes e conversões fora de ordem."""
+    rng = random.Random(11)
+    origin = datetime(2023, 12, 1, tzinfo=timezone.utc)
+    users: List[Dict[str, Any]] = []
+    notifications: List[Dict[str, Any]] = []
+    for index in range(count):
+        created = origin + timedelta(minutes=rng.randrange(0, 60 * 24 * 150))
+        inviter = rng.choice(users) if users and rng.random() < 0.8 else None
+        code = inviter['my_code'] if inviter else rng.choice([None, 'SEM-DONO'])
+        users.append({
+            'uid': f'u{index}',
+            'name': f'U{index}',
+            'email': f'u{index}@example.com',
+            'my_code': f'C{index}',
+            'invited_by_code': code,
+            'points_total': rng.choice([0, 0, 50, '100']),
+            'created_at': _iso(created) if rng.random() > 0.03 else None,
+        })
+        if inviter:
+            # Às vezes antes do cadastro do convidador (dado inconsistente) ou depois da referência.
+            moment = created + timedelta(days=rng.choice([0, 0, 3, 40, -400]))
+            notifications.append({
+                'id': f'n{index}', 'inviter_uid': inviter['uid'], 'type': rng.choice(['conversion', 'Conversion', 'bonus']),
+                'points_awarded': 50, 'created_at': _iso(moment),
+            })
+    rng.shuffle(notifications)
+    return {'users': users, 'notifications': notifications}
+
+
+def _tables(snapshot: Snapshot) -> Dict[str, Any]:
+    columns = cohorts.cohort_columns(snapshot)
+    tables: Dict[str, Any] = {}
+    for granularity in cohorts.GRANULARITIES:
+        for horizon in (1, 3, 8):
+            for start, end in [(None, None), (datetime(2024, 1, 8, tzinfo=timezone.utc), None), (None, datetime(2024, 2, 1, tzinfo=timezone.utc))]:
+                key = f'{granularity}|{horizon}|{start}|{end}'
+                tables[key] = columns.cohort_table(granularity, start, end, REFERENCE, horizon)
+    for limit in (1, 5, 50):
+        tables[f'inviters|{limit}'] = columns.inviter_table(None, None, REFERENCE, limit)
+        tables[f'inviters|{limit}|jan'] = columns.inviter_table(datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 31, tzinfo=timezone.utc), REFERENCE, limit)
+    for days in (0, 7, 30):
+        tables[f'churn|{days}'] = columns.churn_risk(REFERENCE, days)
+        tables[f'churn|{days}|fev'] = columns.churn_risk(REFERENCE, days, datetime(2024, 2, 1, tzinfo=timezone.utc))
+    return tables
+
+
+def _with_backend(monkeypatch, backend: str, export: Dict[str, Any]) -> Snapshot:
+    if backend == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(columnar, 'np', None)
+        monkeypatch.setattr(cohorts, 'np', None)
+    snapshot = Snapshot(export)
+    assert snapshot.points.backend == backend
+    return snapshot
+
+
+def test_numpy_e_python_puro_devolvem_o_mesmo():
+    pytest.importorskip('numpy')
+    export = _messy_export()
+    results = {}
+    for backend in ('numpy', 'python'):
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            results[backend] = _tables(_with_backend(monkeypatch, backend, export))
+    # Também confere que a saída é JSON puro (sem tipos NumPy) nos dois caminhos.
+    assert json.dumps(results['numpy'], sort_keys=True) == json.dumps(results['python'], sort_keys=True)
+
+
+def _small_export() -> Dict[str, Any]:
+    users = [
+        {'uid': 'u1', 'name': 'Ana', 'my_code': 'A', 'points_total': 50, 'created_at': '2024-01-10T12:00:00Z'},
+        {'uid': 'u2', 'name': 'Bia', 'my_code': 'B', 'invited_by_code': 'A', 'points_total': 50, 'created_at': '2024-02-05T12:00:00Z'},
+        {'uid': 'u3', 'name': 'Caio', 'my_code': 'C', 'invited_by_code': 'B', 'points_total': 0, 'created_at': '2024-03-02T12:00:00Z'},
+    ]
+    notifications = [
+        {'id': 'n1', 'inviter_uid': 'u1', 'type': 'conversion', 'points_awarded': 50, 'created_at': '2024-02-05T12:00:00Z'},
+        # Anterior ao cadastro de u2: descartada, não pode virar a primeira conversão dele.
+        {'id': 'n0', 'inviter_uid': 'u2', 'type': 'conversion', 'points_awarded': 50, 'created_at': '2024-01-20T12:00:00Z'},
+        {'id': 'n2', 'inviter_uid': 'u2', 'type': 'conversion', 'points_awarded': 50, 'created_at': '2024-03-02T12:00:00Z'},
+        # Posterior à data de referência: não conta.
+        {'id': 'n3', 'inviter_uid': 'u3', 'type': 'conversion', 'points_awarded': 50, 'created_at': '2024-04-01T12:00:00Z'},
+    ]
+    return {'users': users, 'notifications': notifications}
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'python'])
+def test_conversoes_antes_do_cadastro_descartadas_e_periodos_futuros_nulos(monkeypatch, backend):
+    columns = cohorts.cohort_columns(_with_backend(monkeypatch, backend, _small_export()))
+
+    table = columns.cohort_table('month', None, None, REFERENCE, 4)
+
+    assert [row['cohort'] for row in table['cohorts']] == ['2024-01', '2024-02', '2024-03']
+    january, february, march = table['cohorts']
+    assert january['activation_curve'] == [0.0, 1.0, 1.0, None]
+    assert january['retention_curve'] == [0.0, 1.0, 0.0, None]
+    assert february['activated'] == 1
+    assert february['median_days_to_first_conversion'] == 26.0
+    assert february['activation_curve'] == [0.0, 1.0, None, None]
+    assert february['retention_curve'] == [0.0, 1.0, None, None]
+    assert march['activated'] == 0
+    assert march['median_days_to_first_conversion'] is None
+    assert march['activation_curve'] == [0.0, None, None, None]
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'python'])
+def test_convidadores_e_churn_na_data_de_referencia(monkeypatch, backend):
+    columns = cohorts.cohort_columns(_with_backend(monkeypatch, backend, _small_export()))
+
+    inviters = columns.inviter_table(None, None, REFERENCE, 10)
+    assert [(row['uid'], row['invitees'], row['activated']) for row in inviters] == [('u1', 1, 1), ('u2', 1, 0)]
+    assert inviters[0]['median_days_to_first_conversion'] == 26.0
+
+    assert [row['uid'] for row in columns.churn_risk(REFERENCE, 7)] == ['u3']
+    assert columns.churn_risk(REFERENCE, 30) == []
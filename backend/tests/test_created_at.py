@@ -0,0 +1,19 @@
+import pytest
+
+from data_store import Snapshot
+
+
+@pytest.mark.parametrize('bad', [1700000000, 1.5, ['2024-01-01'], {'$date': '2024-01-01'}, '', 'ontem'])
+def test_created_at_invalido_tira_so_o_registro(bad):
+    snapshot = Snapshot({
+        'users': [{'uid': 'ruim', 'created_at': bad}, {'uid': 'bom', 'created_at': '2024-01-01T10:00:00-03:00'}],
+        'notifications': [
+            {'id': 'n1', 'type': 'bonus', 'points_awarded': 5, 'created_at': bad},
+            {'id': 'n2', 'type': 'bonus', 'points_awarded': 7, 'created_at': '2024-01-01T13:00:00Z'},
+        ],
+    })
+
+    assert [user.uid for user in snapshot.user_timeline.items] == ['bom']
+    assert 'ruim' in snapshot.users_by_uid
+    assert [notification.id for notification in snapshot.notification_timeline.items] == ['n2']
+    assert snapshot.points_summary(None, None)['points_total_period'] == 7
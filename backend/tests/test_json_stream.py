@@ -0,0 +1,106 @@
+import importlib.util
+import json
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from json_stream import iter_export, load_export
+
+# Export de exemplo que acompanha o app (mesmo formato servido em `DATA_URL`).
+APP_EXPORT = Path(__file__).resolve().parents[2] / 'mgm_app' / 'assets' / 'data.json'
+SYNTHETIC = Path(__file__).resolve().parents[1] / 'bench' / 'synthetic.py'
+
+
+def _splits(data: bytes) -> Iterator[List[bytes]]:
+    """Todas as divisões de `data` em dois pedaços, mais a de um byte por pedaço."""
+    for cut in range(len(data) + 1):
+        yield [data[:cut], data[cut:]]
+    yield [data[i:i + 1] for i in range(len(data))]
+
+
+@pytest.mark.parametrize('text', [
+    # Escapes simples, `\uXXXX`, par substituto e caractere UTF-8 de vários bytes.
+    '{"users": [{"name": "a\\"b\\\\c\\n\\/"}]}',
+    '{"users": [{"name": "Jo\\u00e3o"}]}',
+    '{"users": [{"name": "\\ud83d\\ude00"}]}',
+    '{"users": [{"name": "Conceição 😀 漢"}]}',
+    # Números: inteiros, negativos, decimais e expoentes, inclusive no fim de um item.
+    '{"notifications": [{"points_awarded": 12345}, -7, 1.5, 2.5e-3, 10E+2, 0], "total": 98765}',
+    # Objetos e arrays aninhados dentro dos itens.
+    '{"users": [{"tags": ["a", {"b": [1, [2, {"c": null}]]}], "meta": {"x": {"y": true}}}, [[], {}]]}',
+])
+def test_qualquer_corte_entre_pedacos_decodifica_igual(text):
+    data = text.encode('utf-8')
+    expected = json.loads(text)
+    for chunks in _splits(data):
+        assert load_export(chunks) == expected
+
+
+@pytest.mark.parametrize('value', [None, {'u1': {'name': 'A'}}, 'x', 3, [], [1, 2]])
+def test_users_e_notifications_que_nao_sao_lista(value):
+    text = json.dumps({'users': value, 'notifications': value, 'settings': {'bonus_every': 3}})
+    assert load_export([text.encode('utf-8')]) == json.loads(text)
+
+
+def test_itens_sao_emitidos_um_a_um_e_demais_chaves_inteiras():
+    text = '{"settings": {"a": [1]}, "users": [{"uid": "u1"}, {"uid": "u2"}], "notifications": []}'
+    assert list(iter_export([text.encode('utf-8')])) == [
+        ('settings', {'a': [1]}, False),
+        ('users', {'uid': 'u1'}, True),
+        ('users', {'uid': 'u2'}, True),
+        ('notifications', [], False),
+    ]
+
+
+def test_item_hook_converte_cada_item():
+    text = '{"users": [{"uid": "u1"}, {"uid": "u2"}], "schema_version": 1}'
+    payload = load_export([text.encode('utf-8')], lambda key, item: (key, item['uid']))
+    assert payload == {'users': [('users', 'u1'), ('users', 'u2')], 'schema_version': 1}
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    '{"users": [{"uid": "u1"}',
+    '{"users": [{"uid": "u1"}, ',
+    '{"users": [{"uid": "u1"}]',
+    '{"users": [{"uid": "u',
+    '{"total": 12',
+    '{"users": [{"uid": "u1"} {"uid": "u2"}]}',
+    '{"users" [1]}',
+    '{"users": [1,]}',
+    '[{"uid": "u1"}]',
+    '{"users": [tru]}',
+    '{"users": []} {"users": []}',
+    '{} x',
+])
+def test_conteudo_truncado_ou_invalido_falha(text):
+    data = text.encode('utf-8')
+    for chunks in _splits(data):
+        with pytest.raises(ValueError):
+            load_export(chunks)
+
+
+def test_utf8_invalido_falha():
+    with pytest.raises(UnicodeDecodeError):
+        load_export([b'{"users": [{"name": "', b'\xff\xfe"}]}'])
+
+
+def test_export_do_app_igual_ao_json_loads():
+    data = APP_EXPORT.read_bytes()
+    expected = json.loads(data)
+    assert expected['users'] and expected['notifications']
+    for size in (1, 7, 64, len(data)):
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        assert load_export(chunks) == expected
+
+
+def test_export_sintetico_igual_ao_json_loads(tmp_path):
+    spec = importlib.util.spec_from_file_location('synthetic', SYNTHETIC)
+    synthetic = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(synthetic)
+    path = tmp_path / 'export.json'
+    synthetic.generate_export(path, users=300, seed=7)
+    data = path.read_bytes()
+    chunks = [data[i:i + 4093] for i in range(0, len(data), 4093)]
+    assert load_export(chunks) == json.loads(data)
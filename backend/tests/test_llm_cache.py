@@ -0,0 +1,66 @@
+from typing import List
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+import pytest
+
+import llm_cache
+from llm_cache import LLMResponseCache
+import relatorio_agent
+
+
+def _model(*answers: str) -> GenericFakeChatModel:
+    # Cada chamada consome uma resposta; uma chamada a mais falha (StopIteration).
+    return GenericFakeChatModel(messages=iter(answers))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), max_entries=2, ttl=60)
+    monkeypatch.setattr(relatorio_agent, "default_cache", lambda: cache)
+    return cache
+
+
+def _analysis(report: str, version: str, llm: GenericFakeChatModel) -> List[str]:
+    return list(relatorio_agent.stream_analise_content(report, version, llm=llm))
+
+
+def test_acerto_nao_chama_o_llm_e_emite_de_uma_vez(cache):
+    parts = _analysis("relatório", "v1", _model("análise do período"))
+    assert len(parts) > 1 and "".join(parts) == "análise do período"
+
+    assert _analysis("relatório", "v1", _model()) == ["análise do período"]
+
+
+def test_versao_nova_do_snapshot_e_uma_falta(cache):
+    _analysis("relatório", "v1", _model("antes da correção"))
+
+    assert "".join(_analysis("relatório", "v2", _model("depois da correção"))) == "depois da correção"
+    assert cache.get(relatorio_agent.cache_key(
+        relatorio_agent.REPORT_MODEL, relatorio_agent.REPORT_TEMPERATURE, relatorio_agent.SYSTEM_PROMPT, "relatório"
+    ), "v1") is None
+
+
+def test_resposta_expira_pelo_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache.set("k", "v1", "resposta")
+
+    now[0] += 59
+    assert cache.get("k", "v1") == "resposta"
+    now[0] += 2
+    assert cache.get("k", "v1") is None
+
+
+def test_descarta_a_menos_usada_alem_do_limite(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    for key in ("a", "b"):
+        now[0] += 1
+        cache.set(key, "v1", key)
+    now[0] += 1
+    assert cache.get("a", "v1") == "a"
+
+    now[0] += 1
+    cache.set("c", "v1", "c")
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == "a" and cache.get("c", "v1") == "c"
@@ -0,0 +1,14 @@
+import metrics
+
+
+def test_valores_de_label_escapados_no_formato_prometheus(monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    metrics.reset()
+    try:
+        metrics.inc(metrics.TOOL_CACHE_TOTAL, tool='busca "vip"\\n\nfim', result='hit')
+        text = metrics.to_prometheus()
+    finally:
+        metrics.reset()
+
+    line = next(line for line in text.splitlines() if line.startswith(metrics.TOOL_CACHE_TOTAL + '{'))
+    assert line == metrics.TOOL_CACHE_TOTAL + '{result="hit",tool="busca \\"vip\\"\\\\n\\nfim"} 1'
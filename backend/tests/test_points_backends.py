@@ -0,0 +1,97 @@
+"""As colunas NumPy, as em Python puro e a soma direta sobre dicionários concordam."""
+
+from datetime import datetime, timedelta, timezone
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+import chatagent
+import columnar
+from data_store import Snapshot, _parse_iso8601, _to_int
+import tool_memo
+
+_OFFSETS = ['Z', '+00:00', '-03:00', '+05:30', '']
+_TYPES = ['conversion', 'Conversion', 'BONUS', 'bonus', 'signup', None, 'CONVERSION']
+_POINTS = [50, '25', '7', None, 'abc', 0, -10, 3.0, 2 ** 40]
+
+
+def _notifications(count: int = 600) -> List[Dict[str, Any]]:
+    rng = random.Random(7)
+    origin = datetime(2024, 1, 1)
+    notifications = []
+    for index in range(count):
+        moment = origin + timedelta(minutes=rng.randrange(0, 60 * 24 * 40))
+        created_at = moment.isoformat() + rng.choice(_OFFSETS) if rng.random() > 0.05 else None
+        notifications.append({
+            'id': f'n{index}',
+            'inviter_uid': rng.choice(['u1', 'u2', 'u3', None]),
+            'type': rng.choice(_TYPES),
+            'points_awarded': rng.choice(_POINTS),
+            'created_at': created_at,
+        })
+    return notifications
+
+
+def _reference(notifications: List[Dict[str, Any]], start: Optional[str], end: Optional[str], inviter_uid: Optional[str] = None) -> Dict[str, int]:
+    """A soma linear sobre os dicionários, como as tools faziam antes das colunas."""
+    start_dt, end_dt = _parse_iso8601(start), _parse_iso8601(end)
+    totals = {'points_total_period': 0, 'points_from_conversions': 0, 'points_from_bonus': 0}
+    for notification in notifications:
+        created_at = _parse_iso8601(notification.get('created_at'))
+        if created_at is None or (start_dt and created_at < start_dt) or (end_dt and created_at > end_dt):
+            continue
+        if inviter_uid and notification.get('inviter_uid') != inviter_uid:
+            continue
+        points = _to_int(notification.get('points_awarded'))
+        totals['points_total_period'] += points
+        notif_type = (notification.get('type') or '').lower()
+        if notif_type == 'conversion':
+            totals['points_from_conversions'] += points
+        elif notif_type == 'bonus':
+            totals['points_from_bonus'] += points
+    return totals
+
+
+_WINDOWS = [
+    (None, None),
+    ('2024-01-05T00:00:00Z', None),
+    (None, '2024-01-20T23:59:59.999999Z'),
+    ('2024-01-03T10:15:00-03:00', '2024-01-28T02:00:00+05:30'),
+    ('2024-01-10T00:00:00Z', '2024-01-10T00:00:00Z'),
+    ('2024-01-10T21:00:00-03:00', '2024-01-11T20:59:59-03:00'),
+    ('2024-02-01T00:00:00', '2024-03-01T00:00:00'),
+]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def snapshot(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(columnar, 'np', None)
+    snapshot = Snapshot({'users': [], 'notifications': _notifications()})
+    assert snapshot.points.backend == request.param
+    monkeypatch.setattr(chatagent, 'get_snapshot', lambda: snapshot)
+    monkeypatch.setattr(tool_memo, 'get_snapshot', lambda: snapshot)
+    # Os dois backends têm a mesma versão: sem limpar, o memo devolveria o resultado do outro.
+    tool_memo.clear_memo()
+    yield snapshot
+    tool_memo.clear_memo()
+
+
+@pytest.mark.parametrize('start, end', _WINDOWS)
+@pytest.mark.parametrize('inviter_uid', [None, 'u2', 'desconhecido'])
+def test_get_points_summary(snapshot, start, end, inviter_uid):
+    args = {'start': start, 'end': end, 'inviter_uid': inviter_uid}
+    result = json.loads(chatagent.get_points_summary.invoke({key: value for key, value in args.items() if value}))
+
+    assert result == _reference(_notifications(), start, end, inviter_uid)
+
+
+@pytest.mark.parametrize('start, end', _WINDOWS)
+def test_total_points_given_per_time(snapshot, start, end):
+    args = {key: value for key, value in {'start': start, 'end': end}.items() if value}
+
+    assert chatagent.total_points_given_per_time.invoke(args) == _reference(_notifications(), start, end)['points_total_period']
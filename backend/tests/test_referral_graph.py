@@ -0,0 +1,111 @@
+import json
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+import chatagent
+from data_store import Snapshot
+import tool_memo
+
+
+def _user(uid: str, name: str, code: str, invited_by: Optional[str] = None) -> Dict[str, Any]:
+    return {'uid': uid, 'name': name, 'email': f'{uid}@exemplo.com', 'my_code': code, 'invited_by_code': invited_by}
+
+
+# r1 → a → {b, c}, b → d; e usa um código inexistente; s se convidou; x ↔ y formam um ciclo.
+USERS: List[Dict[str, Any]] = [
+    _user('r1', 'Rosa Lima', 'R1'),
+    _user('a', 'Ana Paula', 'A', 'R1'),
+    _user('b', 'Bruno Costa', 'B', 'A'),
+    _user('c', 'Ana Beatriz', 'C', 'A'),
+    _user('d', 'Davi Rocha', 'D', 'B'),
+    _user('e', 'Enzo Melo', 'E', 'NAO-EXISTE'),
+    _user('s', 'Sara Dias', 'S', 'S'),
+    _user('x', 'Xavier Gomes', 'X', 'Y'),
+    _user('y', 'Yara Gomes', 'Y', 'X'),
+]
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    snapshot = Snapshot({'users': USERS, 'notifications': []})
+    monkeypatch.setattr(chatagent, 'get_snapshot', lambda: snapshot)
+    monkeypatch.setattr(tool_memo, 'get_snapshot', lambda: snapshot)
+    tool_memo.clear_memo()
+    yield snapshot
+    tool_memo.clear_memo()
+
+
+def _by_uid(snapshot: Snapshot, values) -> Dict[str, int]:
+    graph = snapshot.referral_graph
+    return {uid: values[graph.position(uid)] for uid in 'r1 a b c d e s x y'.split()}
+
+
+def test_profundidades_redes_e_niveis(snapshot):
+    graph = snapshot.referral_graph
+
+    assert _by_uid(snapshot, graph.depths) == {'r1': 0, 'a': 1, 'b': 2, 'c': 2, 'd': 3, 'e': 0, 's': 0, 'x': 0, 'y': 1}
+    assert _by_uid(snapshot, graph.sizes) == {'r1': 4, 'a': 3, 'b': 1, 'c': 0, 'd': 0, 'e': 0, 's': 0, 'x': 1, 'y': 0}
+    assert _by_uid(snapshot, graph.heights) == {'r1': 3, 'a': 2, 'b': 1, 'c': 0, 'd': 0, 'e': 0, 's': 0, 'x': 1, 'y': 0}
+    assert [graph.users[node].uid for node in graph.upline(graph.position('d'))] == ['b', 'a', 'r1']
+    assert [[graph.users[node].uid for node in level] for level in graph.levels(graph.position('r1'))] == [['a'], ['b', 'c'], ['d']]
+    assert [graph.users[node].uid for node in graph.largest(3)] == ['r1', 'a', 'b']
+
+
+def test_codigo_inexistente_e_ciclos_viram_raiz(snapshot):
+    graph = snapshot.referral_graph
+
+    # Autoindicação e o ciclo x ↔ y são cortados no primeiro usuário encontrado.
+    assert graph.parents[graph.position('s')] == -1
+    assert graph.parents[graph.position('x')] == -1
+    assert graph.parents[graph.position('y')] == graph.position('x')
+    assert graph.parents[graph.position('e')] == -1
+    assert graph.stats() == {'users': 9, 'roots': 4, 'max_depth': 3, 'dangling_codes': 1, 'cycles_broken': 2}
+
+
+def test_get_downline_por_codigo(snapshot):
+    result = json.loads(chatagent.get_downline.invoke({'user': 'A', 'limit': 2}))
+
+    assert result['uid'] == 'a'
+    assert result['depth'] == 1
+    assert [item['uid'] for item in result['upline']] == ['r1']
+    assert (result['direct_invites'], result['downline_size'], result['levels_below']) == (2, 3, 2)
+    assert result['levels'] == [{'level': 1, 'users': 2}, {'level': 2, 'users': 1}]
+    assert [(item['uid'], item['level']) for item in result['members']] == [('b', 1), ('c', 1)]
+
+
+def test_get_downline_max_depth(snapshot):
+    result = json.loads(chatagent.get_downline.invoke({'user': 'r1', 'max_depth': 1}))
+
+    assert result['levels'] == [{'level': 1, 'users': 1}]
+    assert [item['uid'] for item in result['members']] == ['a']
+    assert result['downline_size'] == 4
+
+
+@pytest.mark.parametrize('query', ['Rosa', 'rosa lima', 'r1@EXEMPLO.com'])
+def test_get_downline_por_nome_ou_email(snapshot, query):
+    assert json.loads(chatagent.get_downline.invoke({'user': query}))['uid'] == 'r1'
+
+
+def test_get_downline_nome_ambiguo_devolve_candidatos(snapshot):
+    result = json.loads(chatagent.get_downline.invoke({'user': 'Ana'}))
+
+    assert result['matches'] == 2
+    assert sorted(item['uid'] for item in result['candidates']) == ['a', 'c']
+
+
+def test_get_downline_nome_completo_desempata(snapshot, monkeypatch):
+    users = USERS + [_user('p', 'Ana Paula Souza', 'P', 'C')]
+    extended = Snapshot({'users': users, 'notifications': []})
+    monkeypatch.setattr(chatagent, 'get_snapshot', lambda: extended)
+    monkeypatch.setattr(tool_memo, 'get_snapshot', lambda: extended)
+
+    # "Ana Paula" também está em "Ana Paula Souza"; o nome idêntico à consulta identifica um só.
+    assert json.loads(chatagent.get_downline.invoke({'user': 'ana paula'}))['uid'] == 'a'
+    assert json.loads(chatagent.get_downline.invoke({'user': 'Paula'}))['matches'] == 2
+
+
+def test_get_downline_sem_resultado(snapshot):
+    assert chatagent.get_downline.invoke({'user': 'ninguém'}) == "Nenhum usuário encontrado para a consulta."
+    with pytest.raises(ValueError):
+        chatagent.get_downline.invoke({'user': 'r1', 'limit': 0})
@@ -0,0 +1,142 @@
+import pytest
+
+import data_store
+import http_client
+
+EXPORT = {
+    'users': [{'uid': 'u1', 'my_code': 'A1', 'created_at': '2024-01-01T00:00:00Z'}],
+    'notifications': [{'id': 'n1', 'inviter_uid': 'u1', 'type': 'bonus', 'points_awarded': 5, 'created_at': '2024-01-02T00:00:00Z'}],
+}
+VALIDATORS = {'ETag': '"v1"', 'Last-Modified': 'Tue, 02 Jan 2024 00:00:00 GMT'}
+
+
+@pytest.mark.parametrize('mode', ['full', 'incremental'])
+def test_revalidacao_envia_validadores_nos_dois_modos(session, monkeypatch, mode):
+    monkeypatch.setattr(data_store, 'DATA_SYNC_MODE', mode)
+    session.respond(EXPORT, VALIDATORS)
+    loaded = data_store.refresh_data(force=True)
+
+    session.respond(None, status_code=304)
+    assert data_store.refresh_data(ttl=0) is loaded
+
+    revalidation = session.calls[-1]
+    assert revalidation['headers'] == {'If-None-Match': '"v1"', 'If-Modified-Since': VALIDATORS['Last-Modified']}
+    if mode == 'incremental':
+        assert revalidation['params'] == {'since': '2024-01-02T00:00:00Z', 'since_id': 'n1'}
+    else:
+        assert revalidation['params'] is None
+
+
+class _PublishOrderCheck(dict):
+    """`_cache_state` que falha se `fetched_at` for carimbado antes de `_current` mudar."""
+
+    def __init__(self, previous: data_store.Snapshot) -> None:
+        super().__init__(etag=None, last_modified=None, fetched_at=None)
+        self.previous = previous
+
+    def __setitem__(self, key, value):
+        if key == 'fetched_at' and value is not None:
+            assert data_store._current is not self.previous, "fetched_at carimbado com o snapshot anterior publicado"
+        super().__setitem__(key, value)
+
+
+def test_fetched_at_so_depois_de_publicar_o_snapshot(session, monkeypatch):
+    state = _PublishOrderCheck(data_store._current)
+    monkeypatch.setattr(data_store, '_cache_state', state)
+    session.respond(EXPORT, VALIDATORS)
+
+    loaded = data_store.refresh_data(force=True)
+
+    assert data_store._current is loaded
+    assert state['fetched_at'] is not None
+    assert len(loaded.users) == 1
+
+
+class _Clock:
+    """`time.monotonic` controlado pelo teste para o disjuntor."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(http_client, 'time', clock)
+    return clock
+
+
+def _fail_revalidations(session, count: int, loaded: data_store.Snapshot) -> None:
+    for _ in range(count):
+        session.fail(ConnectionError("exportador fora do ar"))
+        assert data_store.refresh_data(ttl=0) is loaded
+
+
+def test_falhas_seguidas_abrem_o_circuito_e_servem_o_ultimo_snapshot(session, clock):
+    session.respond(EXPORT, VALIDATORS)
+    loaded = data_store.refresh_data(force=True)
+
+    _fail_revalidations(session, http_client.DATA_BREAKER_FAILURES - 1, loaded)
+    assert data_store._breaker.state == 'closed'
+    _fail_revalidations(session, 1, loaded)
+    assert data_store._breaker.state == 'open'
+
+    # Aberto: nem tenta a rede e segue servindo o último snapshot bom.
+    calls = len(session.calls)
+    assert data_store.refresh_data(ttl=0) is loaded
+    assert data_store.get_snapshot() is loaded
+    assert len(session.calls) == calls
+
+
+def test_meio_aberto_apos_o_intervalo_deixa_passar_uma_tentativa(session, clock):
+    session.respond(EXPORT, VALIDATORS)
+    loaded = data_store.refresh_data(force=True)
+    _fail_revalidations(session, http_client.DATA_BREAKER_FAILURES, loaded)
+
+    clock.now += http_client.DATA_BREAKER_RESET
+    assert data_store._breaker.state == 'half_open'
+    # A tentativa falha: o circuito reabre por mais um intervalo.
+    _fail_revalidations(session, 1, loaded)
+    assert data_store._breaker.state == 'open'
+
+    clock.now += http_client.DATA_BREAKER_RESET
+    session.respond(None, status_code=304)
+    assert data_store.refresh_data(ttl=0) is loaded
+    assert data_store._breaker.state == 'closed'
+
+
+def test_resposta_de_erro_conta_como_falha(session, clock):
+    session.respond(EXPORT, VALIDATORS)
+    loaded = data_store.refresh_data(force=True)
+
+    for _ in range(http_client.DATA_BREAKER_FAILURES):
+        session.respond({'erro': 'indisponível'}, status_code=503)
+        assert data_store.refresh_data(ttl=0) is loaded
+    assert data_store._breaker.state == 'open'
+
+
+def test_force_propaga_o_erro_mesmo_com_snapshot(session, clock):
+    session.respond(EXPORT, VALIDATORS)
+    loaded = data_store.refresh_data(force=True)
+    _fail_revalidations(session, http_client.DATA_BREAKER_FAILURES, loaded)
+
+    # Com o circuito aberto, `force=True` ainda vai à rede e a falha chega a quem chamou.
+    session.fail(ConnectionError("exportador fora do ar"))
+    with pytest.raises(ConnectionError):
+        data_store.refresh_data(force=True)
+    assert data_store._current is loaded
+
+
+def test_sem_snapshot_a_falha_chega_a_quem_chamou(session, clock):
+    for _ in range(http_client.DATA_BREAKER_FAILURES):
+        session.fail(ConnectionError("exportador fora do ar"))
+        with pytest.raises(ConnectionError):
+            data_store.refresh_data()
+
+    calls = len(session.calls)
+    with pytest.raises(http_client.CircuitOpenError):
+        data_store.refresh_data()
+    assert len(session.calls) == calls
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timezone
+import sys
+
+import pytest
+
+import relatorio_agent
+import report_batch
+from report_batch import month_to_date, parse_periods
+
+# Quarta-feira.
+UNTIL = date(2024, 3, 13)
+
+
+def _end_of(day: str) -> str:
+    return f"{day}T23:59:59.999999+00:00"
+
+
+def test_monthly_meses_completos_anteriores():
+    assert parse_periods(["monthly:2"], UNTIL) == [
+        ("2024-01-01", _end_of("2024-01-31")),
+        ("2024-02-01", _end_of("2024-02-29")),
+    ]
+    # Atravessa a virada do ano.
+    assert parse_periods(["monthly:1"], date(2024, 1, 15)) == [("2023-12-01", _end_of("2023-12-31"))]
+
+
+@pytest.mark.parametrize("until", [date(2024, 3, 11), UNTIL, date(2024, 3, 17)])
+def test_weekly_semanas_completas_de_segunda_a_domingo(until):
+    # De segunda a domingo da mesma semana, a semana corrente fica de fora.
+    assert parse_periods(["weekly:2"], until) == [
+        ("2024-02-26", _end_of("2024-03-03")),
+        ("2024-03-04", _end_of("2024-03-10")),
+    ]
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("2024-01-01..2024-01-31", ("2024-01-01", _end_of("2024-01-31"))),
+    ("2024-01-01..2024-01-31T12:00:00Z", ("2024-01-01", "2024-01-31T12:00:00Z")),
+    ("2024-01-01T08:00:00-03:00..2024-01-01", ("2024-01-01T08:00:00-03:00", _end_of("2024-01-01"))),
+    ("..2024-01-31", (None, _end_of("2024-01-31"))),
+    ("2024-01-01..", ("2024-01-01", None)),
+])
+def test_intervalo_explicito(spec, expected):
+    assert parse_periods([spec], UNTIL) == [expected]
+
+
+def test_periodos_repetidos_aparecem_uma_vez():
+    assert parse_periods(["monthly:1", "2024-02-01..2024-02-29", "monthly:1"], UNTIL) == [("2024-02-01", _end_of("2024-02-29"))]
+
+
+@pytest.mark.parametrize("spec", ["mensal:3", "monthly:x", "2024-01-01", "2024-02-01..2024-01-01"])
+def test_especificacao_invalida(spec):
+    with pytest.raises(ValueError):
+        parse_periods([spec], UNTIL)
+
+
+def test_sem_especificacao_usa_o_mes_corrente():
+    assert parse_periods([], UNTIL) == [month_to_date(UNTIL)] == [("2024-03-01", _end_of("2024-03-13"))]
+
+
+@pytest.mark.parametrize("entry_point", [report_batch.main, relatorio_agent.main])
+def test_cli_sem_argumentos_gera_o_relatorio_do_mes(monkeypatch, tmp_path, entry_point):
+    generated = []
+
+    def fake_generate_reports(periods, **kwargs):
+        generated.append(periods)
+        return []
+
+    monkeypatch.setattr(report_batch, "generate_reports", fake_generate_reports)
+    monkeypatch.setattr(sys, "argv", ["relatorio_agent.py", "--output-dir", str(tmp_path)])
+
+    entry_point()
+
+    assert generated == [[month_to_date(datetime.now(timezone.utc).date())]]
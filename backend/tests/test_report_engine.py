@@ -0,0 +1,95 @@
+"""As listas do relatório seguem a ordem do export, como a passada linear original."""
+
+from datetime import datetime, timedelta, timezone
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+import chatagent
+import cohorts
+import columnar
+from data_store import Snapshot, _parse_iso8601, _to_int
+from report_engine import aggregate_period
+import tool_memo
+
+START = datetime(2024, 1, 5, tzinfo=timezone.utc)
+END = datetime(2024, 2, 20, tzinfo=timezone.utc)
+
+
+def _export() -> Dict[str, Any]:
+    """Export embaralhado: a ordem da lista não é a de `created_at`."""
+    rng = random.Random(3)
+    origin = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def moment() -> str:
+        return (origin + timedelta(hours=rng.randrange(0, 24 * 70))).isoformat()
+
+    users = [
+        {
+            'uid': f'u{index}', 'name': f'U{index}', 'email': f'u{index}@example.com', 'my_code': f'C{index}',
+            'invited_by_code': f'C{index - 1}' if index and index % 4 else None,
+            'points_total': 0 if index % 3 else 50, 'created_at': moment(),
+        }
+        for index in range(120)
+    ]
+    notifications = [
+        {
+            'id': f'n{index}', 'inviter_uid': f'u{rng.randrange(120)}', 'type': rng.choice(['conversion', 'bonus']),
+            'points_awarded': 50, 'created_at': moment(),
+        }
+        for index in range(300)
+    ]
+    rng.shuffle(users)
+    rng.shuffle(notifications)
+    return {'users': users, 'notifications': notifications}
+
+
+def _in_window(record: Dict[str, Any], start: Optional[datetime], end: Optional[datetime]) -> bool:
+    created_at = _parse_iso8601(record.get('created_at'))
+    return created_at is not None and (start is None or created_at >= start) and (end is None or created_at <= end)
+
+
+def _churn_baseline(users: List[Dict[str, Any]], start: Optional[datetime], reference: datetime, days: int = 7) -> List[str]:
+    cutoff = reference - timedelta(days=days)
+    return [
+        user['uid'] for user in users
+        if _in_window(user, start, None) and user.get('invited_by_code') and _to_int(user.get('points_total')) == 0
+        and _parse_iso8601(user['created_at']) <= cutoff
+    ]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(columnar, 'np', None)
+        monkeypatch.setattr(cohorts, 'np', None)
+    return request.param
+
+
+def test_notificacoes_e_churn_na_ordem_do_export(backend):
+    export = _export()
+    snapshot = Snapshot(export)
+    assert snapshot.points.backend == backend
+
+    aggregate = aggregate_period(snapshot, START, END, END)
+
+    expected = [item['id'] for item in export['notifications'] if _in_window(item, START, END)]
+    assert [notification.id for notification in aggregate['notifications']] == expected
+    assert [user['uid'] for user in aggregate['churn_risk']['users']] == _churn_baseline(export['users'], START, END)
+
+
+def test_tool_churn_risk_na_ordem_do_export(backend, monkeypatch):
+    export = _export()
+    snapshot = Snapshot(export)
+    monkeypatch.setattr(chatagent, 'get_snapshot', lambda: snapshot)
+    monkeypatch.setattr(tool_memo, 'get_snapshot', lambda: snapshot)
+    tool_memo.clear_memo()
+
+    result = chatagent.churn_risk.invoke({'days': 10, 'reference_date': END.isoformat()})
+
+    assert [user['uid'] for user in json.loads(result)['users']] == _churn_baseline(export['users'], None, END, 10)
+    tool_memo.clear_memo()
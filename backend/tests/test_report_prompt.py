@@ -0,0 +1,109 @@
+import threading
+from typing import List
+
+import pytest
+
+from records import NotificationRecord
+import report_prompt
+from report_prompt import _CSV_HEADER, build_report_prompt, notification_rows
+from tokens import count_tokens
+
+HEADER = "Relatório de Indicações\nPeríodo: 2024-01-01 a 2024-01-10\n\nResumo de Pontos:\n{}"
+
+
+def _notifications(count: int) -> List[NotificationRecord]:
+    return [
+        NotificationRecord(
+            id=f"n{index}",
+            inviter_uid=f"u{index % 17}",
+            inviter_code=f"C{index % 17}",
+            invited_name=f"Convidado {index}",
+            points_awarded=50,
+            type="conversion" if index % 3 else "bonus",
+            created_at=f"2024-01-{1 + index % 10:02d}T12:{index % 60:02d}:00Z",
+        )
+        for index in range(count)
+    ]
+
+
+class _Summarizer:
+    """Resumos de tamanho fixo; separa as chamadas de map (blocos CSV) das de reduce."""
+
+    def __init__(self, words: int) -> None:
+        self.words = words
+        self.map_inputs: List[str] = []
+        self.reduce_inputs: List[str] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str) -> str:
+        with self._lock:
+            calls = self.map_inputs if text.startswith(_CSV_HEADER) else self.reduce_inputs
+            calls.append(text)
+            number = len(self.map_inputs) + len(self.reduce_inputs)
+        return f"resumo {number}: " + "ok " * self.words
+
+
+def test_cabe_no_orcamento_sem_resumir():
+    notifications = _notifications(20)
+    summarizer = _Summarizer(5)
+
+    prompt = build_report_prompt(HEADER, notifications, summarizer, budget=4000, chunk_tokens=500)
+
+    assert prompt["summarized_chunks"] == 0
+    assert summarizer.map_inputs == summarizer.reduce_inputs == []
+    assert all(row in prompt["content"] for row in notification_rows(notifications))
+    assert prompt["prompt_tokens"] == count_tokens(prompt["content"]) <= 4000
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_map_resume_blocos_quando_passa_do_orcamento(workers):
+    notifications = _notifications(600)
+    summarizer = _Summarizer(5)
+
+    prompt = build_report_prompt(HEADER, notifications, summarizer, budget=1500, chunk_tokens=400, workers=workers)
+
+    assert prompt["prompt_tokens"] == count_tokens(prompt["content"]) <= 1500
+    assert prompt["summarized_chunks"] == len(summarizer.map_inputs) > 1
+    # Cada linha vai para exatamente um bloco, na ordem, e nenhum bloco passa do tamanho pedido.
+    rows = [row for text in summarizer.map_inputs for row in text.splitlines()[1:]]
+    assert rows == notification_rows(notifications)
+    assert all(count_tokens(text) <= 400 + count_tokens(_CSV_HEADER) + 1 for text in summarizer.map_inputs)
+    # Os resumos couberam sem reduce e entram inteiros no prompt.
+    assert summarizer.reduce_inputs == []
+    assert "resumo 1: " in prompt["content"] and f"resumo {prompt['summarized_chunks']}: " in prompt["content"]
+    assert prompt["tokens_saved"] == prompt["raw_tokens"] - prompt["prompt_tokens"] > 0
+
+
+def test_reduce_combina_resumos_ate_caber():
+    notifications = _notifications(600)
+    summarizer = _Summarizer(60)
+
+    prompt = build_report_prompt(HEADER, notifications, summarizer, budget=1200, chunk_tokens=300, workers=1)
+
+    assert prompt["prompt_tokens"] <= 1200
+    assert summarizer.reduce_inputs
+    # Cada reduce recebe resumos anteriores, nunca linhas CSV.
+    assert all(text.startswith("resumo ") for text in summarizer.reduce_inputs)
+    # O conjunto final coube sem corte: o último resumo gerado aparece inteiro.
+    last = len(summarizer.map_inputs) + len(summarizer.reduce_inputs)
+    assert f"resumo {last}: " + "ok " * 60 in prompt["content"]
+    assert prompt["summarized_chunks"] == len(summarizer.map_inputs)
+
+
+def test_resumos_grandes_demais_ainda_respeitam_o_orcamento():
+    summarizer = _Summarizer(2000)
+
+    prompt = build_report_prompt(HEADER, _notifications(600), summarizer, budget=1000, chunk_tokens=300, workers=1)
+
+    assert prompt["prompt_tokens"] <= 1000
+    assert summarizer.reduce_inputs
+
+
+def test_orcamento_padrao(monkeypatch):
+    monkeypatch.setattr(report_prompt, "REPORT_TOKEN_BUDGET", 900)
+    monkeypatch.setattr(report_prompt, "REPORT_CHUNK_TOKENS", 250)
+
+    prompt = build_report_prompt(HEADER, _notifications(400), _Summarizer(5), workers=1)
+
+    assert prompt["summarized_chunks"] > 1
+    assert prompt["prompt_tokens"] <= report_prompt.REPORT_TOKEN_BUDGET
@@ -0,0 +1,24 @@
+import pytest
+
+from data_store import Snapshot
+
+
+@pytest.mark.parametrize("users", [
+    [],
+    [{'uid': 'u1'}],
+    [{'uid': 'ab', 'name': 'Jo', 'email': None, 'my_code': '7'}],
+    ['não é um objeto', 3, None],
+])
+def test_snapshot_sem_trigramas(users):
+    snapshot = Snapshot({'users': users, 'notifications': []})
+
+    assert snapshot.search_index.matches('xyz') == []
+    assert snapshot.search_index.search('xyz', 5) == (0, [])
+
+
+def test_campos_curtos_continuam_buscaveis():
+    snapshot = Snapshot({'users': [{'uid': 'u1', 'name': 'Jo'}], 'notifications': []})
+
+    total, top = snapshot.search_index.search('jo', 5)
+    assert total == 1 and top[0].uid == 'u1'
+    assert snapshot.search_index.matches('u1') == [0]
@@ -0,0 +1,59 @@
+from typing import Any, Dict
+
+import pytest
+
+import data_store
+from data_store import Snapshot
+
+
+def _export(points: int = 10, name: str = 'Ana') -> Dict[str, Any]:
+    return {
+        'users': [{'uid': 'u1', 'name': name, 'my_code': 'A1', 'updated_at': '2024-01-02T00:00:00Z'}],
+        'notifications': [
+            {'id': 'n1', 'inviter_uid': 'u1', 'type': 'conversion', 'points_awarded': points, 'created_at': '2024-01-01T00:00:00Z'},
+            {'id': 'n2', 'inviter_uid': 'u1', 'type': 'bonus', 'points_awarded': 5, 'created_at': '2024-01-03T00:00:00Z'},
+        ],
+    }
+
+
+def test_correcao_de_registro_antigo_muda_a_versao():
+    base = Snapshot(_export())
+
+    assert Snapshot(_export()).version == base.version
+    assert Snapshot(_export(points=20)).version != base.version
+    assert Snapshot(_export(name='Ana Maria')).version != base.version
+
+
+def test_delta_encadeia_a_versao_anterior():
+    delta = {'delta': True, 'users': [], 'notifications': [
+        {'id': 'n3', 'inviter_uid': 'u1', 'type': 'bonus', 'points_awarded': 5, 'created_at': '2024-01-04T00:00:00Z'},
+    ]}
+
+    merged = Snapshot(_export()).merged(delta)
+    assert merged.version != Snapshot(_export()).version
+    assert merged.version != Snapshot(_export(points=20)).merged(delta).version
+
+
+@pytest.mark.parametrize('headers', [{}, {'ETag': '"v1"'}, {'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}])
+def test_recarga_completa_com_correcao_muda_a_versao(session, headers):
+    session.respond(_export(), headers)
+    first = data_store.refresh_data(force=True).version
+
+    corrected = dict(headers)
+    if 'ETag' in corrected:
+        corrected['ETag'] = '"v2"'
+    if 'Last-Modified' in corrected:
+        corrected['Last-Modified'] = 'Tue, 02 Jan 2024 00:00:00 GMT'
+    session.respond(_export(points=20), corrected)
+    assert data_store.refresh_data(force=True).version != first
+
+
+def test_delta_fora_de_ordem_reconstroi_e_muda_a_versao():
+    delta = {'delta': True, 'users': [], 'notifications': [
+        {'id': 'n0', 'inviter_uid': 'u1', 'type': 'bonus', 'points_awarded': 5, 'created_at': '2023-12-31T00:00:00Z'},
+    ]}
+    base = Snapshot(_export())
+
+    merged = base.merged(delta)
+    assert [item.id for item in merged.notification_timeline.items] == ['n0', 'n1', 'n2']
+    assert merged.version != base.version
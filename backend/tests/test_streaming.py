@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel, GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+import pytest
+
+from chatagent import criar_agent
+from llm_cache import LLMResponseCache
+import relatorio_agent
+from streaming import AgentStreamHandler
+
+ANSWER = "Hoje é um bom dia para indicar."
+
+
+class _StreamingAgentModel(BaseChatModel):
+    """Primeiro pede a tool `get_actual_date`; depois responde `ANSWER`, um token por palavra."""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-agent"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "_StreamingAgentModel":
+        return self
+
+    def _chunks(self) -> List[AIMessageChunk]:
+        self.calls += 1
+        if self.calls == 1:
+            return [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": "get_actual_date", "args": "{}", "id": "call-1", "index": 0},
+            ])]
+        words = ANSWER.split(" ")
+        return [AIMessageChunk(content=word if i == 0 else " " + word) for i, word in enumerate(words)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        message = AIMessage(content="".join(chunk.content for chunk in self._chunks()))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for chunk in self._chunks():
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for chunk in self._chunks():
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content)
+            yield ChatGenerationChunk(message=chunk)
+
+
+def test_agente_repassa_tools_e_tokens_em_ordem():
+    events: List[Tuple[str, str]] = []
+    handler = AgentStreamHandler(
+        on_token=lambda token: events.append(("token", token)),
+        on_tool_start=lambda name, _: events.append(("tool_start", name)),
+        on_tool_end=lambda output: events.append(("tool_end", output)),
+    )
+    agent = criar_agent(llm=_StreamingAgentModel())
+
+    result = asyncio.run(agent.ainvoke({"input": "Que dia é hoje?", "chat_history": []}, config={"callbacks": [handler]}))
+
+    assert result["output"] == ANSWER
+    kinds = [kind for kind, _ in events]
+    assert kinds[:2] == ["tool_start", "tool_end"]
+    assert events[0] == ("tool_start", "get_actual_date")
+    assert "current_date" in events[1][1]
+    tokens = [value for kind, value in events if kind == "token"]
+    assert len(tokens) == len(ANSWER.split(" ")) and "".join(tokens) == ANSWER
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(relatorio_agent, "default_cache", lambda: cache)
+    return cache
+
+
+def test_relatorio_em_cache_sai_de_uma_vez(cache):
+    streamed = list(relatorio_agent.stream_analise_content("relatório", "v1", llm=GenericFakeChatModel(messages=iter(["uma análise longa"]))))
+    assert len(streamed) > 1
+
+    cached = list(relatorio_agent.stream_analise_content("relatório", "v1", llm=GenericFakeChatModel(messages=iter([]))))
+    assert cached == ["".join(streamed)]
+
+
+def test_stream_interrompido_nao_fica_no_cache(cache):
+    broken = FakeListChatModel(responses=["resposta que cai no meio"], error_on_chunk_number=5)
+    received: List[str] = []
+    with pytest.raises(Exception):
+        for part in relatorio_agent.stream_analise_content("relatório", "v1", llm=broken):
+            received.append(part)
+    assert received and "".join(received) != "resposta que cai no meio"
+
+    complete = list(relatorio_agent.stream_analise_content("relatório", "v1", llm=FakeListChatModel(responses=["resposta completa"])))
+    assert "".join(complete) == "resposta completa"
@@ -0,0 +1,51 @@
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+import columnar
+from data_store import Snapshot
+from report_engine import top_referrers
+
+
+def _export(shuffled: bool = False) -> Dict[str, Any]:
+    # u9 converte primeiro mas tem o id de convidador mais alto (aparece por último antes da janela).
+    users = [{'uid': f'u{i}', 'name': f'U{i}', 'my_code': f'C{i}', 'points_total': 10} for i in range(10)]
+    notifications: List[Dict[str, Any]] = [
+        {'id': f'old{i}', 'inviter_uid': f'u{i}', 'type': 'bonus', 'points_awarded': 1, 'created_at': f'2024-01-01T00:0{i}:00Z'}
+        for i in range(10)
+    ]
+    for minute, uid in enumerate(['u9', 'u3', 'u7', 'u1', 'u5', 'u9', 'u3', 'u7', 'u1', 'u5']):
+        notifications.append({
+            'id': f'c{minute}', 'inviter_uid': uid, 'type': 'conversion', 'points_awarded': 50,
+            'created_at': f'2024-02-01T00:{minute:02d}:00Z',
+        })
+    if shuffled:
+        # Export fora da ordem cronológica: o desempate segue a ordem da lista, não o horário.
+        random.Random(7).shuffle(notifications)
+    return {'users': users, 'notifications': notifications}
+
+
+def _baseline(export: Dict[str, Any], limit: int) -> List[str]:
+    """Ranking da implementação linear: contagens na ordem de aparição e sort estável."""
+    counts: Dict[str, int] = {}
+    for notification in export['notifications']:
+        if notification['type'] == 'conversion':
+            counts[notification['inviter_uid']] = counts.get(notification['inviter_uid'], 0) + 1
+    ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return [uid for uid, _ in ranked[:limit]]
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'python'])
+@pytest.mark.parametrize('limit', [1, 2, 3, 5])
+@pytest.mark.parametrize('shuffled', [False, True])
+def test_empates_no_corte_seguem_a_ordem_do_export(monkeypatch, backend, limit, shuffled):
+    if backend == 'python':
+        monkeypatch.setattr(columnar, 'np', None)
+    else:
+        pytest.importorskip('numpy')
+    export = _export(shuffled)
+    snapshot = Snapshot(export)
+
+    ranked = top_referrers(snapshot, None, None, limit)
+    assert [item['uid'] for item in ranked] == _baseline(export, limit)
@@ -31,7 +31,11 @@ Future<void> main(List<String> arguments) async {
     final path = request.uri.path;
     if (path == '/export' || path == 'export') {
       try {
-        final jsonDump = await _exportSnapshot(sourceDir);
+        final jsonDump = await _exportSnapshot(
+          sourceDir,
+          since: request.uri.queryParameters['since'],
+          sinceId: request.uri.queryParameters['since_id'],
+        );
         request.response
           ..statusCode = HttpStatus.ok
           ..headers.contentType = ContentType(
@@ -111,7 +115,11 @@ Directory _resolveLatestSimulatorAppDir(String simRootPath) {
   return bestSupportDir;
 }
 
-Future<String> _exportSnapshot(Directory sourceDir) async {
+Future<String> _exportSnapshot(
+  Directory sourceDir, {
+  String? since,
+  String? sinceId,
+}) async {
   final tempDir = await Directory.systemTemp.createTemp('mgm_hive_export');
   try {
     final files = sourceDir.listSync().whereType<File>().where(
@@ -132,10 +140,15 @@ Future<String> _exportSnapshot(Directory sourceDir) async {
     Hive.init(tempDir.path);
     final box = await Hive.openBox<dynamic>('mgm_data_box');
     final raw = box.get('root') ?? {};
-    final snapshot = jsonDecode(jsonEncode(raw)) as Map<String, dynamic>;
+    var snapshot = jsonDecode(jsonEncode(raw)) as Map<String, dynamic>;
     await box.close();
     await Hive.close();
 
+    final sinceDate = since != null ? DateTime.tryParse(since) : null;
+    if (sinceDate != null) {
+      snapshot = _deltaSince(snapshot, sinceDate, sinceId);
+    }
+
     const encoder = JsonEncoder.withIndent('  ');
     return encoder.convert(snapshot);
   } finally {
@@ -146,3 +159,38 @@ Future<String> _exportSnapshot(Directory sourceDir) async {
     }
   }
 }
+
+/// Keeps only records at or after [since]: notifications by `created_at`
+/// and users by `updated_at` (falling back to `created_at`). The record
+/// identified by [sinceId] was already delivered and is skipped.
+Map<String, dynamic> _deltaSince(
+  Map<String, dynamic> snapshot,
+  DateTime since,
+  String? sinceId,
+) {
+  bool isRecent(Object? raw) {
+    final parsed = raw is String ? DateTime.tryParse(raw) : null;
+    return parsed != null && !parsed.isBefore(since);
+  }
+
+  final users = (snapshot['users'] as List? ?? const [])
+      .whereType<Map>()
+      .where((user) => isRecent(user['updated_at'] ?? user['created_at']))
+      .toList();
+  final notifications = (snapshot['notifications'] as List? ?? const [])
+      .whereType<Map>()
+      .where(
+        (notification) =>
+            notification['id'] != sinceId &&
+            isRecent(notification['created_at']),
+      )
+      .toList();
+
+  return {
+    ...snapshot,
+    'delta': true,
+    'since': since.toUtc().toIso8601String(),
+    'users': users,
+    'notifications': notifications,
+  };
+}